@@ -0,0 +1,166 @@
+# benchmarks/helper_latency.py
+# Per-call latency of the hot economy helpers, before and after folding their
+# SELECT-then-write round trips into single upserts / conditional UPDATE ... RETURNING.
+# The "before" column replays the previous multi-statement versions against the same database.
+#
+# Usage: python -m benchmarks.helper_latency [--calls 2000] [--seed 1234]
+
+# Standard Library Imports
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# Local Imports
+import database.manager as manager
+
+# ----- Previous implementations (reference only) -----
+async def legacy_add_user(user_id, username):
+    conn = await manager.db.get_economy(user_id)
+    async with conn.execute("SELECT 1 FROM users WHERE user_id = ?", (user_id,)) as cursor:
+        if await cursor.fetchone():
+            return
+    await conn.execute("INSERT INTO users (user_id, username, balance) VALUES (?, ?, 0)", (user_id, username))
+    await conn.commit()
+
+async def legacy_atomic_deduct(user_id, amount):
+    conn = await manager.db.get_economy(user_id)
+    async with conn.execute("SELECT balance FROM users WHERE user_id = ?", (user_id,)) as cursor:
+        result = await cursor.fetchone()
+        if not result or result[0] < amount:
+            return False
+    row = await manager._execute_returning(
+        conn, "UPDATE users SET balance = balance - ? WHERE user_id = ? AND balance >= ? RETURNING balance",
+        (amount, user_id, amount)
+    )
+    await conn.commit()
+    if row:
+        manager.ledger.record(user_id, -amount, row[0], "deduct")
+    return row is not None
+
+async def legacy_consume_item(user_id, item_id):
+    conn = await manager.db.get_economy(user_id)
+    async with conn.execute("SELECT uses_left FROM user_items WHERE user_id = ? AND item_id = ?", (user_id, item_id)) as cursor:
+        result = await cursor.fetchone()
+    if not result or result[0] <= 0:
+        return False
+    if result[0] - 1 <= 0:
+        await manager.remove_item_from_user(user_id, item_id)
+    else:
+        await manager.update_item_uses(user_id, item_id, result[0] - 1)
+    return True
+
+async def legacy_buy_item(user_id, item_id, item_name, price):
+    conn = await manager.db.get_economy(user_id)
+    async with conn.execute("SELECT balance FROM users WHERE user_id = ?", (user_id,)) as cursor:
+        user = await cursor.fetchone()
+    if not user or user[0] < price:
+        return False
+    row = await manager._execute_returning(
+        conn, "UPDATE users SET balance = balance - ? WHERE user_id = ? RETURNING balance", (price, user_id)
+    )
+    await conn.commit()
+    manager.ledger.record(user_id, -price, row[0], f"shop: {item_name}")
+    await conn.execute("""
+        INSERT INTO user_items (user_id, item_id, item_name, uses_left, effect_modifier)
+        VALUES (?, ?, ?, 1, 0)
+        ON CONFLICT(user_id, item_id) DO UPDATE SET uses_left = user_items.uses_left + 1
+    """, (user_id, item_id, item_name))
+    await conn.commit()
+    return True
+
+async def legacy_gun_defense(victim_id):
+    if await manager.check_gun_defense(victim_id):
+        await manager.decrement_gun_use(victim_id)
+        return True
+    return False
+
+async def current_consume_item(user_id, item_id):
+    # Timed on an item without effects, so only the storage work differs between the columns
+    return not (await manager.use_item(user_id, item_id)).startswith("❌")
+
+async def current_gun_defense(victim_id):
+    return await manager.decrement_gun_use(victim_id) is not None
+
+# ----- Harness -----
+async def time_calls(fn, args_list):
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        await fn(*args)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return statistics.fmean(samples), samples[len(samples) // 2], samples[int(len(samples) * 0.99) - 1]
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Economy helper per-call latency, before and after")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+    calls = args.calls
+    item = manager.SHOP_ITEMS[0]
+
+    with tempfile.TemporaryDirectory() as scratch:
+        manager.ECONOMY_DB_PATH = os.path.join(scratch, "economy.db")
+        manager.MODERATOR_DB_PATH = os.path.join(scratch, "moderator.db")
+        manager.db = manager.DatabaseManager()
+        manager.leaderboard_cache = manager.LeaderboardCache()
+        await manager.init_databases()
+
+        async def seed_users(base, balance=0, uses=0, item_id=item["id"]):
+            for uid in range(base, base + calls):
+                await manager.add_user(uid, f"user{uid}")
+                if balance:
+                    await manager.update_balance(uid, balance)
+                if uses:
+                    await manager.add_user_item(uid, item_id, item["name"], uses_left=uses)
+
+        # Each case gets its own id range so the before and after runs see identical rows
+        cases = []
+        existing = [(uid, f"user{uid}") for uid in range(1, calls + 1)]
+        await seed_users(1)
+        cases.append(("add_user (existing)", legacy_add_user, manager.add_user, existing, existing))
+        fresh = [[(base + i, f"user{base + i}") for i in rng.sample(range(calls), calls)] for base in (100_000, 200_000)]
+        cases.append(("add_user (new)", legacy_add_user, manager.add_user, fresh[0], fresh[1]))
+
+        for base in (300_000, 400_000):
+            await seed_users(base, balance=1000)
+        deducts = [[(base + i, rng.choice((10, 2000))) for i in range(calls)] for base in (300_000, 400_000)]
+        cases.append(("atomic_deduct", legacy_atomic_deduct, manager.atomic_deduct, deducts[0], deducts[1]))
+
+        for base in (500_000, 600_000):
+            await seed_users(base, balance=100_000)
+        buys = [[(base + i, item["id"], item["name"], 10) for i in range(calls)] for base in (500_000, 600_000)]
+        cases.append(("buy_item", legacy_buy_item, manager.buy_item, buys[0], buys[1]))
+
+        for base in (700_000, 800_000):
+            await seed_users(base, uses=3, item_id=10)
+        guns = [[(base + i,) for i in range(calls)] for base in (700_000, 800_000)]
+        cases.append(("gun defense", legacy_gun_defense, current_gun_defense, guns[0], guns[1]))
+
+        # An item without ITEM_EFFECTS so use_item only does the storage work
+        plain = next(entry for entry in manager.SHOP_ITEMS if entry["id"] not in manager.ITEM_EFFECTS)
+        for base in (900_000, 1_000_000):
+            for uid in range(base, base + calls):
+                await manager.add_user(uid, f"user{uid}")
+                await manager.add_user_item(uid, plain["id"], plain["name"], uses_left=2)
+        uses = [[(base + i, plain["id"]) for i in range(calls)] for base in (900_000, 1_000_000)]
+        cases.append(("use_item", legacy_consume_item, current_consume_item, uses[0], uses[1]))
+
+        print(f"{'helper':<22} {'before us':>10} {'after us':>10} {'p99 before':>11} {'p99 after':>10} {'speedup':>8}")
+        for name, before_fn, after_fn, before_args, after_args in cases:
+            before_mean, _, before_p99 = await time_calls(before_fn, before_args)
+            after_mean, _, after_p99 = await time_calls(after_fn, after_args)
+            print(f"{name:<22} {before_mean:>10.1f} {after_mean:>10.1f} {before_p99:>11.1f} {after_p99:>10.1f} "
+                  f"{before_mean / after_mean:>7.2f}x")
+        await manager.flush_ledger()
+        await manager.db.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
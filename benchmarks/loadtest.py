@@ -0,0 +1,172 @@
+# benchmarks/loadtest.py
+# Load generator for the database layer: thousands of simulated users hammering the
+# economy and moderation operations concurrently, the way /gambling and /economy do.
+# Runs are reproducible for a given --seed and comparable across storage settings.
+#
+# Usage:
+#   python -m benchmarks.loadtest [--backend sqlite|memory|mysql] [--shards N]
+#       [--users 2000] [--ops 50000] [--mix deduct=40,payout=30,item=10,rob=15,case=5] [--seed 1234]
+
+# Standard Library Imports
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+# Local Imports
+import database.manager as manager
+from database.backends import get_backend
+
+DEFAULT_MIX = "deduct=40,payout=30,item=10,rob=15,case=5"
+LOADTEST_GUILDS = 20
+STARTING_BALANCE = 5000
+
+def parse_mix(text):
+    """"deduct=40,payout=30" -> {"deduct": 40, "payout": 30}"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = int(weight)
+    unknown = set(mix) - set(OPERATIONS)
+    if unknown:
+        raise ValueError(f"Unknown operations in mix: {', '.join(sorted(unknown))}")
+    return mix
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+# Each operation mirrors a bot command's database calls
+async def op_deduct(backend, rng, uid, users):
+    # /gambling: take the bet up front
+    await backend.atomic_deduct(uid, rng.randint(1, 200))
+
+async def op_payout(backend, rng, uid, users):
+    # /economy work or a gambling win
+    await backend.update_balance(uid, rng.randint(1, 400))
+
+async def op_item(backend, rng, uid, users):
+    # /shop use: top the item up now and then so uses never run dry
+    if await backend.consume_item(uid, 11) is None:
+        await backend.add_user_item(uid, 11, "Watermelon", uses_left=5)
+
+async def op_rob(backend, rng, uid, users):
+    target = rng.randint(1, users)
+    if target != uid:
+        await backend.transfer_balance(target, uid, rng.randint(1, 300))
+
+async def op_case(backend, rng, uid, users):
+    await backend.insert_case(rng.randint(1, LOADTEST_GUILDS), uid, f"user{uid}", "load test", "warn", 1)
+
+OPERATIONS = {
+    "deduct": op_deduct,
+    "payout": op_payout,
+    "item": op_item,
+    "rob": op_rob,
+    "case": op_case,
+}
+
+async def run_load(backend, users, ops, mix, seed):
+    """
+    Seeds `users` accounts, then runs `ops` operations spread over one task per user.
+
+    Returns:
+        dict: ops, seconds, ops_per_sec, latency percentiles (ms) per operation, busy and other error counts
+    """
+    for uid in range(1, users + 1):
+        await backend.add_user(uid, f"user{uid}")
+        await backend.update_balance(uid, STARTING_BALANCE)
+
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies = {name: [] for name in names}
+    errors = {"busy": 0, "other": 0}
+    error_kinds = {}  # "ExceptionType: message" -> count, for anything that isn't lock contention
+    per_user = [ops // users + (1 if uid <= ops % users else 0) for uid in range(1, users + 1)]
+
+    async def simulated_user(uid, count):
+        # Own generator per user keeps the sequence independent of task interleaving
+        rng = random.Random(seed * 1_000_003 + uid)
+        for _ in range(count):
+            name = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                await OPERATIONS[name](backend, rng, uid, users)
+            except Exception as e:
+                if isinstance(e, sqlite3.OperationalError) and ("locked" in str(e) or "busy" in str(e)):
+                    errors["busy"] += 1
+                else:
+                    errors["other"] += 1
+                    kind = f"{type(e).__name__}: {e}"[:120]
+                    error_kinds[kind] = error_kinds.get(kind, 0) + 1
+                continue
+            latencies[name].append(time.perf_counter() - started)
+            await asyncio.sleep(0)  # think time of zero, but let the other users in
+
+    started = time.perf_counter()
+    await asyncio.gather(*(simulated_user(uid, count) for uid, count in enumerate(per_user, start=1) if count))
+    elapsed = time.perf_counter() - started
+
+    everything = sorted(value for values in latencies.values() for value in values)
+    report = {
+        "ops": len(everything),
+        "seconds": elapsed,
+        "ops_per_sec": len(everything) / elapsed if elapsed else 0.0,
+        "errors": errors,
+        "error_kinds": error_kinds,
+        "latency_ms": {},
+    }
+    for name, values in [("all", everything)] + sorted(latencies.items()):
+        values = sorted(values)
+        report["latency_ms"][name] = {
+            "count": len(values),
+            "p50": percentile(values, 50) * 1000,
+            "p95": percentile(values, 95) * 1000,
+            "p99": percentile(values, 99) * 1000,
+            "max": (values[-1] if values else 0.0) * 1000,
+        }
+    return report
+
+def print_report(label, report):
+    print(f"\n== {label}: {report['ops']} ops in {report['seconds']:.2f}s -> {report['ops_per_sec']:.0f} ops/s")
+    print(f"   busy/locked errors: {report['errors']['busy']}, other errors: {report['errors']['other']}")
+    for kind, count in sorted(report["error_kinds"].items(), key=lambda kv: -kv[1])[:5]:
+        print(f"     {count:>6} x {kind}")
+    print(f"   {'op':<8} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, stats in report["latency_ms"].items():
+        print(f"   {name:<8} {stats['count']:>7} {stats['p50']:>8.2f} {stats['p95']:>8.2f} {stats['p99']:>8.2f} {stats['max']:>8.2f}")
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Database load test")
+    parser.add_argument("--backend", default=None, help="sqlite, memory or mysql (default: DB_BACKEND)")
+    parser.add_argument("--shards", type=int, default=1, help="economy shards for the sqlite and memory backends")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--ops", type=int, default=50000)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args(argv)
+    mix = parse_mix(args.mix)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        # Never touch the real data/ files
+        manager.ECONOMY_DB_PATH = os.path.join(scratch, "economy.db")
+        manager.MODERATOR_DB_PATH = os.path.join(scratch, "moderator.db")
+        manager.db = manager.DatabaseManager(shards=args.shards)
+        backend = get_backend(args.backend)
+        await backend.init()
+        try:
+            report = await run_load(backend, args.users, args.ops, mix, args.seed)
+        finally:
+            await backend.close()
+    label = f"{backend.name}" + (f", {args.shards} shards" if backend.name != "mysql" and args.shards > 1 else "")
+    print_report(f"{label}, {args.users} users, seed {args.seed}", report)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
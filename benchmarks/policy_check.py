@@ -0,0 +1,99 @@
+# benchmarks/policy_check.py
+# Per-interaction cost of the dashboard part of global_blacklist_check, before and after
+# compiling guild settings into a GuildPolicy and indexing command modules at tree sync.
+# The "before" column replays the previous per-call module resolution and linear override scan.
+#
+# Usage: python -m benchmarks.policy_check [--commands 120] [--calls 200000] [--seed 1234]
+
+# Standard Library Imports
+import argparse
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+# Local Imports
+from status import ConfigSync
+
+# ----- Previous implementation (reference only) -----
+def legacy_check(guild_cfg, cmd):
+    cmd_name = cmd.name
+    module_names = []
+    if cmd.root_parent:
+        module_names.append(cmd.root_parent.name.lower())
+    module_names.append(cmd.name.lower())
+    if hasattr(cmd, "binding"):
+        binding_name = cmd.binding.__class__.__name__.lower()
+        for suffix in ["commands", "cog", "commandsgroup"]:
+            if binding_name.endswith(suffix) and len(binding_name) > len(suffix):
+                binding_name = binding_name[:-len(suffix)]
+        module_names.append(binding_name)
+    enabled_modules = guild_cfg.get("enabled_modules", {})
+    for m in module_names:
+        if enabled_modules.get(m) is False:
+            return m
+    overrides = guild_cfg.get("command_overrides", [])
+    return next((o for o in overrides if o.get("name") in [cmd_name, cmd.qualified_name]), None)
+
+def current_check(settings, guild_id, cmd):
+    policy = settings.policy(guild_id)
+    blocked = policy.blocked_module(settings.modules_for(cmd))
+    if blocked:
+        return blocked
+    return policy.override_for(cmd.qualified_name, cmd.name)
+
+def make_commands(count, rng):
+    """Fake app commands shaped like the bot's: grouped under Group subclasses named *Commands."""
+    commands = []
+    for group_index in range(max(1, count // 8)):
+        binding = type(f"Group{group_index}Commands", (), {})()
+        group = SimpleNamespace(name=f"group{group_index}")
+        for sub in range(8):
+            name = f"cmd{sub}"
+            commands.append(SimpleNamespace(name=name, qualified_name=f"{group.name} {name}",
+                                            root_parent=group, binding=binding))
+    rng.shuffle(commands)
+    return commands[:count]
+
+def time_calls(fn, calls):
+    start = time.perf_counter()
+    for args in calls:
+        fn(*args)
+    return (time.perf_counter() - start) / len(calls) * 1e9
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dashboard policy check cost per interaction, before and after")
+    parser.add_argument("--commands", type=int, default=120)
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+    commands = make_commands(args.commands, rng)
+
+    print(f"{'overrides':>9} {'before ns':>10} {'after ns':>9} {'speedup':>8} {'compile us':>11}")
+    for override_count in (0, 10, 100, 1000, 5000):
+        # Overrides mostly name commands the bot doesn't have (other bots, removed commands)
+        overrides = [{"name": f"unknown{i}", "cooldown": 5} for i in range(override_count)]
+        for cmd in rng.sample(commands, min(len(commands) // 4, override_count)):
+            overrides.insert(rng.randrange(len(overrides) + 1), {"name": cmd.qualified_name, "cooldown": 3})
+        guild_cfg = {
+            "enabled_modules": {f"group{i}": i % 5 != 0 for i in range(0, len(commands) // 8, 2)},
+            "command_overrides": overrides,
+        }
+        settings = ConfigSync("http://localhost", "bench", bot=None)
+        started = time.perf_counter()
+        settings._store(1, guild_cfg)
+        compile_us = (time.perf_counter() - started) * 1e6
+        for cmd in commands:
+            settings.modules_for(cmd)
+
+        picks = [rng.choice(commands) for _ in range(args.calls)]
+        for cmd in commands:
+            assert legacy_check(guild_cfg, cmd) == current_check(settings, 1, cmd)
+        before = time_calls(legacy_check, [(guild_cfg, cmd) for cmd in picks])
+        after = time_calls(current_check, [(settings, 1, cmd) for cmd in picks])
+        print(f"{override_count:>9} {before:>10.0f} {after:>9.0f} {before / after:>7.1f}x {compile_us:>11.0f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
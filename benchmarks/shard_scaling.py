@@ -0,0 +1,72 @@
+# benchmarks/shard_scaling.py
+# Write-throughput load test for the sharded economy: runs the same seeded mix of balance
+# updates and transfers against 1, 2, 4 and 8 shards in a scratch directory.
+#
+# Usage: python -m benchmarks.shard_scaling [--users 2000] [--ops 20000] [--workers 64] [--shards 1 2 4 8]
+
+# Standard Library Imports
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Local Imports
+import database.manager as manager
+
+async def run_once(shards, users, ops, workers, seed):
+    """
+    Returns:
+        tuple: (ops_per_sec, failed_transfers)
+    """
+    manager.db = manager.DatabaseManager(shards=shards)
+    manager.leaderboard_cache = manager.LeaderboardCache()
+    await manager.init_databases()
+    for uid in range(1, users + 1):
+        await manager.add_user(uid, f"user{uid}")
+        await manager.update_balance(uid, 1000)
+
+    rng = random.Random(seed)
+    plan = [(rng.random() < 0.3, rng.randint(1, users), rng.randint(1, users), rng.randint(1, 50)) for _ in range(ops)]
+    queue = iter(plan)
+    failed = 0
+
+    async def worker():
+        nonlocal failed
+        for is_transfer, a, b, amount in queue:
+            if is_transfer and a != b:
+                if not await manager.transfer_balance(a, b, amount):
+                    failed += 1
+            else:
+                await manager.update_balance(a, amount)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    elapsed = time.perf_counter() - start
+    await manager.db.close()
+    return ops / elapsed, failed
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Economy shard write-throughput load test")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        manager.ECONOMY_DB_PATH = os.path.join(scratch, "economy.db")
+        manager.MODERATOR_DB_PATH = os.path.join(scratch, "moderator.db")
+        baseline = None
+        print(f"{'shards':>6} {'ops/s':>10} {'speedup':>8} {'failed':>7}")
+        for shards in args.shards:
+            rate, failed = await run_once(shards, args.users, args.ops, args.workers, args.seed)
+            baseline = baseline or rate
+            print(f"{shards:>6} {rate:>10.0f} {rate / baseline:>7.2f}x {failed:>7}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -7,86 +7,129 @@ import time
 
 import config
 from config import IS_ALPHA
-from database.manager import (
+from database import (
     init_databases,
-    ECONOMY_DB_PATH,
-    MODERATOR_DB_PATH,
     BACKUP_FOLDER_ID,
-    backup_all_dbs_to_gdrive_env,
-    restore_all_dbs_from_gdrive_env,
+    DEFAULT_DBS,
+    snapshot_databases_locally,
+    flush_ledger,
+    upload_pending_backup,
+    sync_databases_from_remote,
+    db,
 )
 from logging_modules.custom_logger import get_logger
 
 log = get_logger()
 
 # Import the bot instance and necessary tasks from main.py
-from main import bot, global_blacklist_check, kill_all_tasks
+from main import bot, global_blacklist_check
+
+SHUTDOWN_BUDGET = 25        # seconds between the shutdown signal and Railway's kill
+SHUTDOWN_MARGIN = 2         # seconds of the budget kept for closing the databases and the last log lines
+SHUTDOWN_DRAIN_TIMEOUT = 10 # most of the budget background jobs get to finish their current run
+
+@contextlib.contextmanager
+def _shutdown_phase(timings, name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - start
+        log.info(f"Shutdown phase '{name}' took {timings[name]:.2f}s")
 
 async def graceful_shutdown():
     log.info("Shutdown signal received — performing cleanup...")
+    timings = {}
+    started = time.perf_counter()
+    # Every phase's timeout comes out of one deadline, so together they stay inside the kill window
+    deadline = started + SHUTDOWN_BUDGET - SHUTDOWN_MARGIN
+
+    def remaining():
+        return max(0.0, deadline - time.perf_counter())
 
     # Prevent new interactions (optional but good practice)
     bot._is_shutting_down = True
 
-    # Let ongoing tasks wrap up
-    await asyncio.sleep(1)
-
-    # Final backup
-    if not IS_ALPHA:
+    # Let ongoing tasks wrap up: background jobs finish their current run and stop,
+    # so nothing writes behind the snapshot
+    with _shutdown_phase(timings, "drain"):
+        await bot.scheduler.shutdown(timeout=min(SHUTDOWN_DRAIN_TIMEOUT, remaining()))
         try:
-            log.info("Performing final database backup before shutdown...")
-            await asyncio.wait_for(
-                backup_all_dbs_to_gdrive_env(
-                    [
-                        (ECONOMY_DB_PATH, "economy.db"),
-                        (MODERATOR_DB_PATH, "moderator.db")
-                    ],
-                    BACKUP_FOLDER_ID
-                ),
-                timeout=25  # must complete before Railway kills us
-            )
-            log.info("Backup completed successfully.")
-        except asyncio.TimeoutError:
-            log.critical("Backup timed out — Railway may have killed us mid-upload.")
+            await flush_ledger()
         except Exception as e:
-            log.critical(f"Backup failed: {e}")
+            log.error(f"Failed to flush buffered ledger entries: {e}")
+
+    # Phase 1: local and durable, milliseconds. Survives even if we are killed right after.
+    if not IS_ALPHA:
+        with _shutdown_phase(timings, "snapshot"):
+            try:
+                await db.checkpoint()
+                await snapshot_databases_locally(BACKUP_FOLDER_ID)
+            except Exception as e:
+                log.critical(f"Local shutdown snapshot failed: {e}")
     else:
         log.warning("Skipping final backup as this is an alpha version.")
 
-    # Close shared HTTP session
-    if getattr(bot, "http_session", None) and not bot.http_session.closed:
-        await bot.http_session.close()
-        log.network("Closed shared HTTP session")
-        
-    # Close ConfigSync session
-    if hasattr(bot, "config_sync"):
-        await bot.config_sync.close()
-        
-    # Close bot connections
-    await kill_all_tasks()
+    with _shutdown_phase(timings, "close"):
+        # Close shared HTTP session
+        if getattr(bot, "http_session", None) and not bot.http_session.closed:
+            await bot.http_session.close()
+            log.network("Closed shared HTTP session")
+
+        # Close ConfigSync session
+        if hasattr(bot, "config_sync"):
+            await bot.config_sync.close()
+
+        # Close bot connections
+        with contextlib.suppress(Exception):
+            await bot.close()
+
+    # Phase 2: best effort. If it is cut off, the next boot uploads the pending snapshot first.
+    if not IS_ALPHA:
+        with _shutdown_phase(timings, "upload"):
+            budget = remaining()
+            if budget <= 0:
+                log.warning("No time left before the shutdown deadline for the backup upload; "
+                            "it will be retried on next boot.")
+            else:
+                try:
+                    await asyncio.wait_for(upload_pending_backup(BACKUP_FOLDER_ID), timeout=budget)
+                except asyncio.TimeoutError:
+                    log.warning(f"Backup upload abandoned at the shutdown deadline after {budget:.1f}s; "
+                                "it will be retried on next boot.")
+                except Exception as e:
+                    log.warning(f"Backup upload failed, it will be retried on next boot: {e}")
+
     with contextlib.suppress(Exception):
-        await bot.close()
+        await db.close()
 
-    log.info("Shutdown complete.")
+    phases = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items())
+    log.info(f"Shutdown complete in {time.perf_counter() - started:.2f}s ({phases}).")
     log.info("Flurazide says: Goodbye!")
 
-async def main():
-    # Attempt restore and surface any problem
-    try:
-        restored_ok = await restore_all_dbs_from_gdrive_env(BACKUP_FOLDER_ID,
-            {
-                "economy.db": ECONOMY_DB_PATH,
-                "moderator.db": MODERATOR_DB_PATH,
-            }
-        )
-        if restored_ok is False:
-            log.warning("Drive restore returned False (no files restored or an error occurred).")
-    except Exception:
-        log.exception("Exception while restoring databases from Drive")
+async def prepare_databases():
+    """Upload any snapshot the last shutdown left behind, restore from Drive if the remote backup is newer, then initialize tables."""
+    if not IS_ALPHA:
+        try:
+            if await upload_pending_backup(BACKUP_FOLDER_ID):
+                log.success("Uploaded the snapshot left pending by the last shutdown.")
+        except Exception as e:
+            log.warning(f"Could not upload pending snapshot: {e}")
+
+    restored = await sync_databases_from_remote(BACKUP_FOLDER_ID,
+        {member: path for path, member in DEFAULT_DBS}
+    )
+    if restored:
+        log.success("Databases restored from Drive backup.")
 
     # Initialize database tables
     await init_databases()
 
+async def main():
+    # The restore check runs alongside the gateway login; DB access waits for it through the gate
+    prepare_task = asyncio.create_task(prepare_databases())
+    db.hold(prepare_task)
+
     async with bot:
         bot.tree.interaction_check = global_blacklist_check
 
@@ -106,6 +149,13 @@ async def main():
             except Exception as e:
                 log.exception(f"Failed to register signal handler for {sig!r}: {e}")
 
+        def _on_databases_prepared(task):
+            # Same outcome as the old blocking init: no usable databases means no bot
+            if not task.cancelled() and task.exception():
+                log.critical(f"Database preparation failed: {task.exception()}")
+                _signal_handler()
+
+        prepare_task.add_done_callback(_on_databases_prepared)
         bot_task = asyncio.create_task(bot.start(config.BOT_TOKEN))
 
         try:
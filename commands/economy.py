@@ -17,14 +17,20 @@ from database import (
     add_user,
     get_user_items,
     get_robbery_modifier,
-    check_gun_defense,
     decrement_gun_use,
-    remove_item_from_user,
-    update_item_uses,
+    take_item_uses,
     add_item_to_user,
-    atomic_deduct
+    transfer_balance,
+    get_economy_stats,
+    get_leaderboard_page,
+    get_guild_leaderboard_page,
+    get_user_rank,
+    get_ledger_entries,
+    get_ledger_daily,
+    economy_locks,
 )
-from config import cooldown, check_cooldown, update_cooldown
+from config import cooldown
+from utils.ratelimit import rate_limits
 from logging_modules.custom_logger import get_logger
 
 log = get_logger()
@@ -53,8 +59,9 @@ class PlayAgainView(ui.View):
         cmd_name = self.callback.__name__
         cl_duration = cooldowns.get(cmd_name, 5) # default 5s
         
-        is_on_cooldown, retry_after = check_cooldown(self.user_id, cmd_name, cl_duration)
-        if is_on_cooldown:
+        # Taken here rather than after the edit below, so a double click can't slip through
+        retry_after = rate_limits.acquire(self.user_id, cmd_name, cl_duration)
+        if retry_after:
             return await interaction.response.send_message(
                 f"🕒 You're working too fast! Try again in {round(retry_after, 1)}s.",
                 ephemeral=True
@@ -70,9 +77,6 @@ class PlayAgainView(ui.View):
         except:
             pass  # Message might be deleted or inaccessible
         
-        # Update cooldown timestamp before running
-        update_cooldown(self.user_id, cmd_name)
-        
         # Run the callback with the new interaction (callback will respond)
         await self.callback(interaction, *self.args, **self.kwargs)
     
@@ -92,6 +96,73 @@ class PlayAgainView(ui.View):
             pass  # Message might be deleted or we don't have permission
 
 
+LEADERBOARD_PAGE_SIZE = 10
+LEDGER_HISTORY_SIZE = 15
+
+class LeaderboardView(ui.View):
+    """
+    Keyset-paginated leaderboard. Keeps a stack of page cursors so going back never re-scans.
+    The server scope snapshots the guild's non-bot member ids on first load; every page then
+    costs one IN query per LEADERBOARD_IN_QUERY_MAX members (see get_guild_leaderboard_page).
+    """
+
+    def __init__(self, user_id, scope, guild=None, footer=None):
+        super().__init__(timeout=120)
+        self.user_id = user_id
+        self.scope = scope
+        self.guild = guild
+        self.footer = footer
+        self.cursors = [None]  # cursor that produced each visited page
+        self.rows = []
+        self.member_ids = None
+
+    async def fetch(self, after):
+        # One extra row tells us whether a next page exists
+        if self.scope == "server" and self.guild:
+            if self.member_ids is None:
+                self.member_ids = [m.id for m in self.guild.members if not m.bot]
+            return await get_guild_leaderboard_page(self.member_ids, LEADERBOARD_PAGE_SIZE + 1, after)
+        return await get_leaderboard_page(LEADERBOARD_PAGE_SIZE + 1, after)
+
+    async def load(self):
+        rows = await self.fetch(self.cursors[-1])
+        self.rows = rows[:LEADERBOARD_PAGE_SIZE]
+        self.previous_page.disabled = len(self.cursors) == 1
+        self.next_page.disabled = len(rows) <= LEADERBOARD_PAGE_SIZE
+
+    def format_page(self):
+        title = f"🏆 {self.guild.name} Leaderboard" if self.scope == "server" and self.guild else "🏆 Global Leaderboard"
+        embed = discord.Embed(title=title, color=discord.Color.gold())
+        start = (len(self.cursors) - 1) * LEADERBOARD_PAGE_SIZE
+        lines = [
+            f"`#{start + i + 1:>4}` **{username or user_id}** — 💰 `{balance}`"
+            for i, (user_id, username, balance) in enumerate(self.rows)
+        ]
+        embed.description = "\n".join(lines) if lines else "Nobody here yet!"
+        if self.footer:
+            embed.set_footer(text=self.footer)
+        return embed
+
+    @ui.button(label="⬅️", style=discord.ButtonStyle.grey)
+    async def previous_page(self, interaction: discord.Interaction, button: ui.Button):
+        if interaction.user.id != self.user_id:
+            return await interaction.response.send_message("🚫 This isn't your command!", ephemeral=True)
+        if len(self.cursors) > 1:
+            self.cursors.pop()
+        await self.load()
+        await interaction.response.edit_message(embed=self.format_page(), view=self)
+
+    @ui.button(label="➡️", style=discord.ButtonStyle.grey)
+    async def next_page(self, interaction: discord.Interaction, button: ui.Button):
+        if interaction.user.id != self.user_id:
+            return await interaction.response.send_message("🚫 This isn't your command!", ephemeral=True)
+        if self.rows:
+            last_user, _, last_balance = self.rows[-1]
+            self.cursors.append((last_balance, last_user))
+        await self.load()
+        await interaction.response.edit_message(embed=self.format_page(), view=self)
+
+
 class EconomyCommands(app_commands.Group):
     def __init__(self):
         super().__init__(name="economy", description="Economy related commands")
@@ -120,30 +191,22 @@ class EconomyCommands(app_commands.Group):
         elif success_chance < 0.05:
             success_chance = 0.05  # Minimum 5%
         
-        # 2nd amendment rights in a nutshell
-        gun_defense = await check_gun_defense(target_id)
-        if gun_defense:
-            await decrement_gun_use(target_id)
-            await interaction.followup.send(
-            f"🔫 {target.mention} defended themselves with a gun! Your robbery failed.",
-            ephemeral=False
+        # Both balances are read, judged and written under the pair's locks so a concurrent
+        # gamble or transfer can't slip in between; the replies go out after release
+        async with economy_locks.hold(user_id, target_id):
+            outcome, amount = await self.settle_rob(user_id, target_id, success_chance)
+
+        if outcome == "gun":
+            return await interaction.followup.send(
+                f"🔫 {target.mention} defended themselves with a gun! Your robbery failed.",
+                ephemeral=False
             )
-            return
-
-        success = random.random() < success_chance
-
-        robber_balancer = await get_balance(user_id)
-        if robber_balancer < -50:
+        if outcome == "robber_broke":
             return await interaction.followup.send("💸 You can't afford risking another crime!")
-
-        target_balance = await get_balance(target_id)
-        if target_balance < 100:
+        if outcome == "target_broke":
             return await interaction.followup.send(f"💸 {target.mention} doesn't have enough coins to rob!", ephemeral=True)
 
-        if success:
-            amount = random.randint(50, min(300, target_balance))
-            await update_balance(user_id, amount)
-            await update_balance(target_id, -amount)
+        if outcome == "robbed":
             log.successtrace(f"User {user_id} robbed {target_id} for {amount} coins")
             messages = [
                 f"🦹 You successfully robbed {target.mention} and stole 💰 `{amount}` coins!",
@@ -151,21 +214,50 @@ class EconomyCommands(app_commands.Group):
                 f"🔪 You threatened {target.mention} and took `{amount}` coins!",
                 f"💵 You pickpocketed {target.mention} and made off with `{amount}` coins!",
             ]
-            msg_content = random.choice(messages)
         else:
-            penalty = random.randint(50, 400)
-            await update_balance(user_id, -penalty)
-            log.warningtrace(f"User {user_id} failed to rob {target_id} and lost {penalty} coins")
+            log.warningtrace(f"User {user_id} failed to rob {target_id} and lost {amount} coins")
             messages = [
-                f"🚨 You got caught trying to rob {target.mention}! You paid a fine of 💰 `{penalty}` coins.",
-                f"👮 The police stopped your robbery attempt. Lost 💰 `{penalty}` coins.",
-                f"😬 {target.mention} fought back! You lost 💰 `{penalty}` coins.",
-                f"🚓 {target.mention} made you trip and the police caught you! You lost 💰`{penalty} coins.`"
+                f"🚨 You got caught trying to rob {target.mention}! You paid a fine of 💰 `{amount}` coins.",
+                f"👮 The police stopped your robbery attempt. Lost 💰 `{amount}` coins.",
+                f"😬 {target.mention} fought back! You lost 💰 `{amount}` coins.",
+                f"🚓 {target.mention} made you trip and the police caught you! You lost 💰`{amount} coins.`"
             ]
-            msg_content = random.choice(messages)
-            
+        msg_content = random.choice(messages)
+
         await interaction.followup.send(msg_content, ephemeral=False)
 
+    async def settle_rob(self, user_id, target_id, success_chance):
+        """
+        Database side of a robbery; call with both users held.
+
+        Returns:
+            tuple: (outcome, amount), outcome being "gun", "robber_broke", "target_broke", "robbed" or "caught"
+        """
+        # 2nd amendment rights in a nutshell (check and spend the round in one statement)
+        if await decrement_gun_use(target_id) is not None:
+            return "gun", 0
+
+        success = random.random() < success_chance
+
+        robber_balancer = await get_balance(user_id)
+        if robber_balancer < -50:
+            return "robber_broke", 0
+
+        target_balance = await get_balance(target_id)
+        if target_balance < 100:
+            return "target_broke", 0
+
+        if success:
+            amount = random.randint(50, min(300, target_balance))
+            if not await transfer_balance(target_id, user_id, amount, reason="robbery"):
+                # Target spent it between the balance check and the heist
+                return "target_broke", 0
+            return "robbed", amount
+
+        penalty = random.randint(50, 400)
+        await update_balance(user_id, -penalty, reason="robbery fine")
+        return "caught", penalty
+
     @app_commands.command(name="rob", description="Rob someone for cash. Risky!")
     @cooldown(cl=600, tm=25.0, ft=3)
     async def rob(self, interaction: discord.Interaction, target: discord.Member):
@@ -184,7 +276,7 @@ class EconomyCommands(app_commands.Group):
         success = random.random() > 0.16  
         amount = random.randint(100, 600) if success else -random.randint(300, 600)
 
-        await update_balance(user_id, amount)
+        await update_balance(user_id, amount, reason="crime")
         if success:
             log.successtrace(f"User {user_id} committed crime successfully: {amount} coins")
         else:
@@ -226,7 +318,7 @@ class EconomyCommands(app_commands.Group):
         success = random.random() > 0.07
         amount = random.randint(50, 300) if success else -random.randint(100, 200)
 
-        await update_balance(user_id, amount)
+        await update_balance(user_id, amount, reason="slut")
 
         if success:
             messages = [
@@ -260,7 +352,7 @@ class EconomyCommands(app_commands.Group):
 
         success = random.random() > 0.03
         amount = random.randint(20, 250) if success else -random.randint(400, 800)
-        await update_balance(user_id, amount)
+        await update_balance(user_id, amount, reason="work")
 
         if success:
             messages = [
@@ -296,6 +388,69 @@ class EconomyCommands(app_commands.Group):
         balance = await get_balance(user_id)
         await interaction.followup.send(f"💰 Your balance: **{balance}** coins")
 
+    @app_commands.command(name="stats", description="Global economy statistics")
+    @cooldown(cl=10, tm=25.0, ft=3)
+    async def stats(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=False)
+        stats = await get_economy_stats()
+
+        embed = discord.Embed(title="📊 Economy Stats", color=discord.Color.gold())
+        embed.add_field(name="Coins in circulation", value=f"💰 `{stats['positive_total']}`", inline=True)
+        embed.add_field(name="Players", value=f"`{stats['user_count']}`", inline=True)
+        embed.add_field(name="In debt", value=f"`{stats['debtor_count']}` (💸 `{stats['debt_total']}`)", inline=True)
+
+        lines = []
+        for bucket, users in stats["histogram"].items():
+            label = "Debt" if bucket == 0 else f"{10 ** (bucket - 1) if bucket > 1 else 0}–{10 ** bucket - 1}"
+            lines.append(f"`{label:>15}` {users}")
+        if lines:
+            embed.add_field(name="Balance distribution", value="\n".join(lines), inline=False)
+        await interaction.followup.send(embed=embed)
+
+    @app_commands.command(name="leaderboard", description="Richest players, globally or in this server")
+    @app_commands.describe(scope="Rank everyone or only members of this server")
+    @app_commands.choices(scope=[
+        app_commands.Choice(name="Global", value="global"),
+        app_commands.Choice(name="Server", value="server"),
+    ])
+    @cooldown(cl=10, tm=25.0, ft=3)
+    async def leaderboard(self, interaction: discord.Interaction, scope: str = "global"):
+        await interaction.response.defer(ephemeral=False)
+        rank = await get_user_rank(interaction.user.id)
+        footer = f"Your global rank: #{rank[0]} with {rank[1]} coins" if rank else "You don't have an account yet!"
+
+        view = LeaderboardView(interaction.user.id, scope, interaction.guild, footer)
+        await view.load()
+        await interaction.followup.send(embed=view.format_page(), view=view)
+
+    @app_commands.command(name="history", description="Recent balance changes (moderators can look up anyone)")
+    @app_commands.describe(target="Whose history to show (needs Moderate Members for someone else)")
+    @cooldown(cl=5, tm=25.0, ft=3)
+    async def history(self, interaction: discord.Interaction, target: discord.Member = None):
+        await interaction.response.defer(ephemeral=True)
+        target = target or interaction.user
+        if target.id != interaction.user.id:
+            perms = getattr(interaction.user, "guild_permissions", None)
+            if not perms or not perms.moderate_members:
+                return await interaction.followup.send("❌ You can only view your own history.", ephemeral=True)
+
+        entries = await get_ledger_entries(target.id, limit=LEDGER_HISTORY_SIZE)
+        embed = discord.Embed(title=f"📒 Balance history of {target.name}", color=discord.Color.gold())
+        lines = [
+            f"<t:{ts}:R> `{delta:+}` → `{balance}` — {reason}" + (f" (/{command})" if command else "")
+            for _, delta, balance, reason, command, ts in entries
+        ]
+        embed.description = "\n".join(lines) if lines else "No recent balance changes."
+        days = await get_ledger_daily(target.id, limit=7)
+        if days:
+            embed.add_field(
+                name="Older activity (daily)",
+                value="\n".join(f"<t:{day}:d> `{net:+}` over {count} change(s), closed at `{closing}`"
+                                for day, net, count, closing in days),
+                inline=False
+            )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
     @app_commands.command(name="inventory", description="Check your inventory")
     @cooldown(cl=4, tm=25.0, ft=3)
     async def inventory(self, interaction: discord.Interaction):
@@ -336,12 +491,11 @@ class EconomyCommands(app_commands.Group):
             await interaction.followup.send("❌ Invalid amount!", ephemeral=True)
             return
 
-        success = await atomic_deduct(user_id, amount)
+        success = await transfer_balance(user_id, target_id, amount)
         if not success:
             await interaction.followup.send("❌ You don't have enough coins!", ephemeral=True)
             return
 
-        await update_balance(target_id, amount)
         log.successtrace(f"User {user_id} transferred {amount} coins to {target_id}")
 
         await interaction.followup.send(f"💸 You transferred {target.mention} 💰 `{amount}` coins!", ephemeral=False)
@@ -364,26 +518,15 @@ class EconomyCommands(app_commands.Group):
             await interaction.followup.send("❌ Invalid amount!", ephemeral=True)
             return
 
-        items = await get_user_items(user_id)
-        item = next((item for item in items if item['item_id'] == item_id), None)
-
-        if not item or item['uses_left'] < amount:
+        # Only the one inventory row is touched; the conditional UPDATE doubles as the ownership check
+        async with economy_locks.hold(user_id, target_id):
+            item = await take_item_uses(user_id, item_id, amount)
+            if item:
+                # Add the item to the target's inventory
+                await add_item_to_user(target_id, item_id, item["item_name"], uses_left=amount)
+        if not item:
             await interaction.followup.send("❌ You don't have enough of that item!", ephemeral=True)
             return
-
-        # Decrement the item's uses from the sender's inventory
-        item['uses_left'] -= amount
-
-        # Remove the item from sender if uses_left is 0
-        if item['uses_left'] == 0:
-            # Remove the item from the user's inventory in the database
-            await remove_item_from_user(user_id, item_id)
-        else:
-            # Update the item uses in the database
-            await update_item_uses(user_id, item_id, item['uses_left'])
-
-        # Add the item to the target's inventory
-        await add_item_to_user(target_id, item_id, amount)
         log.successtrace(f"User {user_id} gave {amount} of item {item_id} to {target_id}")
 
         await interaction.followup.send(f"🎁 You gave {target.mention} {amount} of item ID `{item_id}`!", ephemeral=False)
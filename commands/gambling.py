@@ -9,8 +9,9 @@ from discord import app_commands, Interaction, ui
 from discord.ui import Button, View
 
 # Local Imports
-from database import update_balance, get_balance, atomic_deduct
-from config import cooldown, check_cooldown, update_cooldown
+from database import update_balance, get_balance, atomic_deduct, economy_locks
+from config import cooldown
+from utils.ratelimit import rate_limits
 from logging_modules.custom_logger import get_logger
 
 log = get_logger()
@@ -43,8 +44,9 @@ class PlayAgainView(ui.View):
         cmd_name = self.callback.__name__
         cl_duration = cooldowns.get(cmd_name, 5) # default 5s
         
-        is_on_cooldown, retry_after = check_cooldown(self.user_id, cmd_name, cl_duration)
-        if is_on_cooldown:
+        # Taken here rather than after the edit below, so a double click can't slip through
+        retry_after = rate_limits.acquire(self.user_id, cmd_name, cl_duration)
+        if retry_after:
             return await interaction.response.send_message(
                 f"🕒 You're wagering too fast! Try again in {round(retry_after, 1)}s.",
                 ephemeral=True
@@ -60,9 +62,6 @@ class PlayAgainView(ui.View):
         except:
             pass  # Message might be deleted or inaccessible
         
-        # Update cooldown timestamp before running
-        update_cooldown(self.user_id, cmd_name)
-        
         # Run the callback with the new interaction (callback will respond)
         await self.callback(interaction, *self.args, **self.kwargs)
     
@@ -91,7 +90,7 @@ class HighLowView(ui.View):
     async def end_game(self, interaction, won, next_card):
         if won:
             win = self.bet * 2
-            await update_balance(self.user_id, win)
+            await update_balance(self.user_id, win, reason="highlow win")
             log.successtrace(f"HighLow win for {self.user_id}: {self.bet}")
             result = f"✨ **Correct!** Next card was **{next_card}**. You won `{self.bet}` coins! ✨"
             color = 0x00FF00
@@ -111,28 +110,26 @@ class HighLowView(ui.View):
 
     @ui.button(label="Higher ⬆️", style=discord.ButtonStyle.success)
     async def higher(self, interaction: discord.Interaction, button: ui.Button):
-        is_on_cooldown, retry_after = check_cooldown(self.user_id, "run_highlow", 5)
-        if is_on_cooldown:
+        retry_after = rate_limits.acquire(self.user_id, "run_highlow", 5)
+        if retry_after:
             return await interaction.response.send_message(
                 f"🕒 Slow down! Try again in {round(retry_after, 1)}s.",
                 ephemeral=True
             )
-        
-        update_cooldown(self.user_id, "run_highlow")
+
         next_card = random.randint(1, 13)
         won = next_card >= self.current_card
         await self.end_game(interaction, won, next_card)
 
     @ui.button(label="Lower ⬇️", style=discord.ButtonStyle.danger)
     async def lower(self, interaction: discord.Interaction, button: ui.Button):
-        is_on_cooldown, retry_after = check_cooldown(self.user_id, "run_highlow", 5)
-        if is_on_cooldown:
+        retry_after = rate_limits.acquire(self.user_id, "run_highlow", 5)
+        if retry_after:
             return await interaction.response.send_message(
                 f"🕒 Slow down! Try again in {round(retry_after, 1)}s.",
                 ephemeral=True
             )
-        
-        update_cooldown(self.user_id, "run_highlow")
+
         next_card = random.randint(1, 13)
         won = next_card <= self.current_card
         await self.end_game(interaction, won, next_card)
@@ -231,10 +228,16 @@ class GamblingCommands(app_commands.Group):
                 return await interaction.response.send_message("🚫 This isn't your game!", ephemeral=True)
             
             await interaction.response.defer()
-            self.player.append(self.deck.pop())
-            if self.hand_value(self.player) > 21:
-                self.ended = True
-                await update_balance(self.user_id, -self.bet)
+            # Settlement runs under the user's lock so a double click or the timeout can't settle twice
+            async with economy_locks.hold(self.user_id):
+                if self.ended:
+                    return
+                self.player.append(self.deck.pop())
+                busted = self.hand_value(self.player) > 21
+                if busted:
+                    self.ended = True
+                    await update_balance(self.user_id, -self.bet, reason="blackjack bust")
+            if busted:
                 log.successtrace(f"Blackjack bust for {self.user_id}: {self.bet}")
                 await self.update_embed("💀 **You busted! Dealer wins.**")
                 self.stop()
@@ -247,35 +250,42 @@ class GamblingCommands(app_commands.Group):
                 return await interaction.response.send_message("🚫 This isn't your game!", ephemeral=True)
             
             await interaction.response.defer()
-            self.ended = True
-            
-            # Dealer turn
-            while self.hand_value(self.dealer) < 17:
-                self.dealer.append(self.deck.pop())
-            
-            player_val = self.hand_value(self.player)
-            dealer_val = self.hand_value(self.dealer)
+            async with economy_locks.hold(self.user_id):
+                if self.ended:
+                    return
+                self.ended = True
+
+                # Dealer turn
+                while self.hand_value(self.dealer) < 17:
+                    self.dealer.append(self.deck.pop())
+
+                player_val = self.hand_value(self.player)
+                dealer_val = self.hand_value(self.dealer)
+
+                if dealer_val > 21 or player_val > dealer_val:
+                    await update_balance(self.user_id, self.bet * 2, reason="blackjack win") # They already lost the bet initially, so win is bet * 2
+                    log.successtrace(f"Blackjack win for {self.user_id}: {self.bet}")
+                    result = f"✨ **You win `{self.bet * 2}` coins!** ✨"
+                elif player_val < dealer_val:
+                    log.successtrace(f"Blackjack loss for {self.user_id}: {self.bet}")
+                    result = "💀 **Dealer wins!**"
+                else:
+                    await update_balance(self.user_id, self.bet, reason="blackjack push") # Bet returned
+                    log.successtrace(f"Blackjack push for {self.user_id}")
+                    result = "⚖️ **It's a tie! You get your bet back.**"
 
-            if dealer_val > 21 or player_val > dealer_val:
-                await update_balance(self.user_id, self.bet * 2) # They already lost the bet initially, so win is bet * 2
-                log.successtrace(f"Blackjack win for {self.user_id}: {self.bet}")
-                result = f"✨ **You win `{self.bet * 2}` coins!** ✨"
-            elif player_val < dealer_val:
-                log.successtrace(f"Blackjack loss for {self.user_id}: {self.bet}")
-                result = "💀 **Dealer wins!**"
-            else:
-                await update_balance(self.user_id, self.bet) # Bet returned
-                log.successtrace(f"Blackjack push for {self.user_id}")
-                result = "⚖️ **It's a tie! You get your bet back.**"
-                
             await self.update_embed(result)
             self.stop()
 
         async def on_timeout(self):
-            if not self.ended:
-                try:
-                    await update_balance(self.user_id, self.bet) 
-                except: pass
+            async with economy_locks.hold(self.user_id):
+                refund = not self.ended
+                self.ended = True
+                if refund:
+                    try:
+                        await update_balance(self.user_id, self.bet, reason="blackjack timeout refund")
+                    except: pass
+            if refund:
                 self.embed.description = f"⏰ **Floor! Clock on {self.user_id}.** (Timed out)"
                 self.embed.color = 0xFF0000
                 self.clear_items()
@@ -297,7 +307,7 @@ class GamblingCommands(app_commands.Group):
         user_id = interaction.user.id
         
         # Atomic deduction to prevent race conditions
-        success = await atomic_deduct(user_id, bet)
+        success = await atomic_deduct(user_id, bet, reason="blackjack bet")
         if not success:
             balance = await get_balance(user_id)
             if balance <= DEBT_FLOOR:
@@ -356,7 +366,7 @@ class GamblingCommands(app_commands.Group):
         user_id = interaction.user.id
         
         # Atomic deduction to prevent race conditions
-        success = await atomic_deduct(user_id, bet)
+        success = await atomic_deduct(user_id, bet, reason="slots bet")
         if not success:
             balance = await get_balance(user_id)
             if balance <= DEBT_FLOOR:
@@ -466,7 +476,7 @@ class GamblingCommands(app_commands.Group):
         net = win_amount - bet 
         
         if win_amount > 0:
-            await update_balance(user_id, win_amount)
+            await update_balance(user_id, win_amount, reason="slots win")
             
         log.successtrace(f"Slots result for {user_id}: net {net}")
 
@@ -511,7 +521,7 @@ class GamblingCommands(app_commands.Group):
         user_id = interaction.user.id
         
         # Atomic deduction to prevent race conditions
-        success = await atomic_deduct(user_id, bet)
+        success = await atomic_deduct(user_id, bet, reason="coinflip bet")
         if not success:
             balance = await get_balance(user_id)
             if balance <= DEBT_FLOOR:
@@ -527,7 +537,7 @@ class GamblingCommands(app_commands.Group):
         if won:
             win = bet * 2 # They won 2 times bet (original + profit)
             result = f"✨ It was **{outcome.title()}**! You won `{bet}` coins! ✨"
-            await update_balance(user_id, win)
+            await update_balance(user_id, win, reason="coinflip win")
             log.successtrace(f"Coinflip win for {user_id}: {bet}")
         else:
             result = f"❌ It was **{outcome.title()}**. You lost `{bet}` coins."
@@ -562,7 +572,7 @@ class GamblingCommands(app_commands.Group):
         user_id = interaction.user.id
         
         # Atomic deduction to prevent race conditions
-        success = await atomic_deduct(user_id, bet)
+        success = await atomic_deduct(user_id, bet, reason="war bet")
         if not success:
             balance = await get_balance(user_id)
             if balance <= DEBT_FLOOR:
@@ -586,7 +596,7 @@ class GamblingCommands(app_commands.Group):
             win = bet * 2
             result = f"✨ **You won!** `{bet}` coins! ✨"
             color = 0x00FF00
-            await update_balance(user_id, win)
+            await update_balance(user_id, win, reason="war win")
             log.successtrace(f"War win for {user_id}: {bet}")
         elif player_card < dealer_card:
             result = f"❌ **You lost!** `{bet}` coins."
@@ -595,7 +605,7 @@ class GamblingCommands(app_commands.Group):
         else:
             result = "⚖️ **It's a tie!** Bet returned."
             color = 0xFFFF00
-            await update_balance(user_id, bet)
+            await update_balance(user_id, bet, reason="war tie refund")
             log.successtrace(f"War tie for {user_id}")
             
         embed = discord.Embed(
@@ -622,7 +632,7 @@ class GamblingCommands(app_commands.Group):
         user_id = interaction.user.id
         
         # Atomic deduction to prevent race conditions
-        success = await atomic_deduct(user_id, bet)
+        success = await atomic_deduct(user_id, bet, reason="highlow bet")
         if not success:
             balance = await get_balance(user_id)
             if balance <= DEBT_FLOOR:
@@ -665,7 +675,7 @@ class GamblingCommands(app_commands.Group):
         user_id = interaction.user.id
         
         # Atomic deduction to prevent race conditions
-        success = await atomic_deduct(user_id, bet)
+        success = await atomic_deduct(user_id, bet, reason="roulette bet")
         if not success:
             balance = await get_balance(user_id)
             if balance <= DEBT_FLOOR:
@@ -743,7 +753,7 @@ class GamblingCommands(app_commands.Group):
             net_win = win_amount - bet
             
             payout = bet * multiplier # Add the multiplier correctly (bet already gone, we give them bet * multiplier)
-            await update_balance(user_id, payout)
+            await update_balance(user_id, payout, reason="roulette win")
             
             result_text = f"✨ **It landed on {result_color.title()} {result_num}!**\nYou won `{payout - bet}` coins! (Multiplier: {multiplier}x) ✨"
             color_hex = 0x00FF00
@@ -1,6 +1,5 @@
 
 # Standard Library Imports
-import asyncio
 import io
 import json
 import logging
@@ -1425,19 +1424,21 @@ class ImageCommands(app_commands.Group):
 class ImageCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.bot.loop.create_task(self._periodic_cleanup())
 
-    async def _periodic_cleanup(self):
-        while True:
-            now = time.time()
-            expired = [uid for uid, (_, exp) in USER_SELECTED.items() if exp < now]
-            for uid in expired:
-                del USER_SELECTED[uid]
-            await asyncio.sleep(300)
+    async def _cleanup_selections(self):
+        now = time.time()
+        expired = [uid for uid, (_, exp) in USER_SELECTED.items() if exp < now]
+        for uid in expired:
+            del USER_SELECTED[uid]
 
     async def cog_load(self):
         self.bot.tree.add_command(ImageCommands(self.bot))
         self.bot.tree.add_command(select_image)
+        self.bot.scheduler.every("image_selection_cleanup", 300, self._cleanup_selections, initial_delay=300)
+
+    async def cog_unload(self):
+        # Reloads register the job again
+        self.bot.scheduler.remove("image_selection_cleanup")
 
 async def setup(bot):
     await bot.add_cog(ImageCog(bot))
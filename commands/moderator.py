@@ -1,8 +1,13 @@
 # Standard Library Imports
 import asyncio
+import csv
 import datetime
+import gzip
+import io
+import json
 import re
 import sys
+import tempfile
 import time
 from collections import Counter
 from typing import Optional
@@ -14,7 +19,9 @@ from discord import app_commands, Interaction
 
 # Local Imports
 from database import (
-    get_cases_for_guild,
+    get_cases_page,
+    iter_guild_cases,
+    search_cases,
     get_cases_for_user,
     get_case,
     insert_case,
@@ -26,6 +33,73 @@ from logging_modules.custom_logger import get_logger
 
 log = get_logger()
 
+CASES_PER_PAGE = 10
+EXPORT_SPOOL_MAX = 8 * 1024 * 1024  # export parts larger than this spill to a temp file
+EXPORT_FLUSH_BYTES = 256 * 1024  # uncompressed bytes between compressor flushes, when part sizes are checked
+EXPORT_PART_HEADROOM = 512 * 1024  # room left in each part for what can be written between two checks
+EXPORT_BATCH_ROWS = 500  # rows handed to the worker thread per write
+EXPORT_FILES_PER_MESSAGE = 10  # Discord's attachment limit per message
+CASE_COLUMNS = ("case_number", "user_id", "username", "reason", "action_type", "timestamp", "moderator_id", "expiry")
+
+async def write_case_export(rows, open_part, fmt="csv", part_size=None):
+    """
+    Streams case rows from an async iterator into gzipped CSV or JSONL files.
+    open_part() returns a fresh binary file object; a new part (with its own CSV header)
+    is started once the current one nears part_size compressed bytes, so each part can be
+    attached on its own. Rows are encoded and compressed in batches on a worker thread so
+    a large export doesn't hold up the event loop.
+
+    Returns:
+        tuple: (cases written, list of part file objects)
+    """
+    count = 0
+    parts = []
+    gz = text = writer = None
+    pending = 0  # characters written since the last flush
+
+    def start_part():
+        nonlocal gz, text, writer
+        fileobj = open_part()
+        parts.append(fileobj)
+        gz = gzip.GzipFile(fileobj=fileobj, mode="wb")
+        text = io.TextIOWrapper(gz, encoding="utf-8", newline="")
+        writer = csv.writer(text) if fmt == "csv" else None
+        if writer:
+            writer.writerow(CASE_COLUMNS)
+
+    def finish_part():
+        text.flush()
+        text.detach()  # close the gzip stream but leave the part file open for sending
+        gz.close()
+
+    def write_batch(batch):
+        nonlocal pending
+        for row in batch:
+            if part_size and pending >= EXPORT_FLUSH_BYTES:
+                # The compressor holds back output until flushed, so only then is tell() the real size
+                text.flush()
+                gz.flush()
+                pending = 0
+                if parts[-1].tell() >= part_size - EXPORT_PART_HEADROOM:
+                    finish_part()
+                    start_part()
+            if writer:
+                pending += writer.writerow(row)
+            else:
+                pending += text.write(json.dumps(dict(zip(CASE_COLUMNS, row))) + "\n")
+
+    start_part()
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        count += 1
+        if len(batch) >= EXPORT_BATCH_ROWS:
+            await asyncio.to_thread(write_batch, batch)
+            batch = []
+    await asyncio.to_thread(write_batch, batch)
+    await asyncio.to_thread(finish_part)
+    return count, parts
+
 class ModeratorCommands(app_commands.Group):
     def __init__(self, bot):
         super().__init__(name="moderator", description="Moderation related commands")
@@ -261,9 +335,9 @@ class ModeratorCommands(app_commands.Group):
             log.error(f"[{interaction.guild.name}] Error banning user {user.id}: {e}", exc_info=True)
             return await interaction.followup.send("❌ An error occurred while trying to ban the user.", ephemeral=True)
 
-        # Log case to DB (expiry handled by your main unban task)
+        # Log case to DB and hand timed bans to the expiry scheduler
         try:
-            await insert_case(
+            case_num = await insert_case(
                 interaction.guild.id,
                 user.id,
                 user.name,
@@ -273,6 +347,9 @@ class ModeratorCommands(app_commands.Group):
                 int(time.time()),
                 expiry=expiry
             )
+            scheduler = getattr(self.bot, "expiry_scheduler", None)
+            if expiry and scheduler:
+                scheduler.schedule(interaction.guild.id, case_num, user.id, expiry)
         except Exception as db_error:
             log.error(f"Failed to log ban case to database: {db_error}", exc_info=True)
             # Still send success message since the ban succeeded
@@ -361,25 +438,28 @@ class ModeratorCommands(app_commands.Group):
             log.warningtrace(f"Cases used outside guild by {interaction.user.id}")
             return await interaction.followup.send("❌ This command must be used in a guild.", ephemeral=True)
         
+        guild = interaction.guild
+
+        async def fetch(before=None):
+            # One extra row tells us whether a next page exists
+            rows = await get_cases_page(guild.id, CASES_PER_PAGE + 1, before)
+            return rows[:CASES_PER_PAGE], len(rows) > CASES_PER_PAGE
+
         try:
-            cases = await get_cases_for_guild(interaction.guild.id)
+            first_page, has_more = await fetch()
         except Exception as e:
-            log.error(f"Error fetching cases for guild {interaction.guild.id}: {e}", exc_info=True)
+            log.error(f"Error fetching cases for guild {guild.id}: {e}", exc_info=True)
             return await interaction.followup.send("❌ An error occurred while fetching cases.", ephemeral=True)
-        
-        if not cases:
-            return await interaction.followup.send("No cases found for this server.", ephemeral=True)
 
-        CASES_PER_PAGE = 10
+        if not first_page:
+            return await interaction.followup.send("No cases found for this server.", ephemeral=True)
 
-        def get_page(page):
+        def get_page(page, cases):
             embed = discord.Embed(
-                title=f"Cases for {interaction.guild.name} (Page {page+1}/{(len(cases)-1)//CASES_PER_PAGE+1})",
+                title=f"Cases for {guild.name} (Page {page+1})",
                 color=discord.Color.blue()
             )
-            start = page * CASES_PER_PAGE
-            end = start + CASES_PER_PAGE
-            for case in cases[start:end]:
+            for case in cases:
                 embed.add_field(
                     name=f"Case #{case[0]}",
                     value=f"User: <@{case[1]}> ({case[2]})\n"
@@ -390,26 +470,35 @@ class ModeratorCommands(app_commands.Group):
             return embed
 
         class CasePaginator(discord.ui.View):
+            """Fetches each page on demand; keeps the case_number cursor of every visited page."""
+
             def __init__(self):
                 super().__init__(timeout=120)
-                self.page = 0
-                self.max_page = (len(cases) - 1) // CASES_PER_PAGE
+                self.cursors = [None]
+                self.cases = first_page
+                self.next.disabled = not has_more
+
+            async def show(self, interaction_btn):
+                try:
+                    self.cases, more = await fetch(self.cursors[-1])
+                except Exception as e:
+                    log.error(f"Error fetching cases page for guild {guild.id}: {e}", exc_info=True)
+                    return await interaction_btn.response.send_message("❌ An error occurred while fetching cases.", ephemeral=True)
+                self.previous.disabled = len(self.cursors) == 1
+                self.next.disabled = not more
+                await interaction_btn.response.edit_message(embed=get_page(len(self.cursors) - 1, self.cases), view=self)
 
             @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary, disabled=True)
             async def previous(self, interaction_btn: discord.Interaction, button: discord.ui.Button):
-                self.page -= 1
-                if self.page == 0:
-                    self.previous.disabled = True
-                self.next.disabled = False
-                await interaction_btn.response.edit_message(embed=get_page(self.page), view=self)
+                if len(self.cursors) > 1:
+                    self.cursors.pop()
+                await self.show(interaction_btn)
 
-            @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary, disabled=(len(cases) <= CASES_PER_PAGE))
+            @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
             async def next(self, interaction_btn: discord.Interaction, button: discord.ui.Button):
-                self.page += 1
-                if self.page == self.max_page:
-                    self.next.disabled = True
-                self.previous.disabled = False
-                await interaction_btn.response.edit_message(embed=get_page(self.page), view=self)
+                if self.cases:
+                    self.cursors.append(self.cases[-1][0])
+                await self.show(interaction_btn)
 
             async def on_timeout(self):
                 for item in self.children:
@@ -422,12 +511,142 @@ class ModeratorCommands(app_commands.Group):
 
         view = CasePaginator()
         try:
-            msg = await interaction.followup.send(embed=get_page(0), view=view, ephemeral=False)
+            msg = await interaction.followup.send(embed=get_page(0, first_page), view=view, ephemeral=False)
         except discord.HTTPException as e:
             log.error(f"Failed to send cases message: {e}")
             return await interaction.followup.send("❌ An error occurred while trying to display cases.", ephemeral=True)
         view.message = msg
 
+    @app_commands.command(name="export", description="Export every case of the server as a compressed file.")
+    @app_commands.describe(format="File format of the export")
+    @app_commands.choices(format=[
+        app_commands.Choice(name="CSV", value="csv"),
+        app_commands.Choice(name="JSON Lines", value="jsonl"),
+    ])
+    @app_commands.checks.has_permissions(view_audit_log=True)
+    @app_commands.checks.bot_has_permissions(attach_files=True)
+    @cooldown(cl=60, tm=120.0, ft=3)
+    async def export(self, interaction: Interaction, format: str = "csv"):
+        await interaction.response.defer(ephemeral=True)
+        log.trace(f"Export invoked by {interaction.user.id} ({format})")
+        if not interaction.guild:
+            return await interaction.followup.send("❌ This command must be used in a guild.", ephemeral=True)
+
+        guild = interaction.guild
+        parts = []
+        try:
+            count, parts = await write_case_export(
+                iter_guild_cases(guild.id),
+                lambda: tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX),
+                format,
+                part_size=guild.filesize_limit,
+            )
+            if not count:
+                return await interaction.followup.send("No cases found for this server.", ephemeral=True)
+
+            # Too large for one attachment: several standalone .gz parts, never an external host
+            if len(parts) == 1:
+                names = [f"cases_{guild.id}.{format}.gz"]
+            else:
+                names = [f"cases_{guild.id}.part{i}.{format}.gz" for i in range(1, len(parts) + 1)]
+            files = []
+            for part, name in zip(parts, names):
+                part.seek(0)
+                files.append(discord.File(part, filename=name))
+            for start in range(0, len(files), EXPORT_FILES_PER_MESSAGE):
+                batch = files[start:start + EXPORT_FILES_PER_MESSAGE]
+                note = f"📦 Exported **{count}** cases" + (f" in {len(files)} parts." if len(files) > 1 else ".")
+                await interaction.followup.send(note if start == 0 else None, files=batch, ephemeral=True)
+        except Exception as e:
+            log.error(f"Error exporting cases for guild {guild.id}: {e}", exc_info=True)
+            await interaction.followup.send("❌ An error occurred while exporting cases.", ephemeral=True)
+        finally:
+            for part in parts:
+                part.close()
+
+    @app_commands.command(name="searchcases", description="Search case reasons and usernames.")
+    @app_commands.describe(query="Words to search for (add * to a word for prefix matching)")
+    @app_commands.checks.has_permissions(view_audit_log=True)
+    @cooldown(cl=5, tm=15.0, ft=3)
+    async def searchcases(self, interaction: Interaction, query: str):
+        await interaction.response.defer(ephemeral=False)
+        log.trace(f"Searchcases invoked by {interaction.user.id}: {query!r}")
+        if not interaction.guild:
+            return await interaction.followup.send("❌ This command must be used in a guild.", ephemeral=True)
+
+        guild = interaction.guild
+
+        async def fetch(page):
+            # One extra row tells us whether a next page exists
+            rows = await search_cases(guild.id, query, CASES_PER_PAGE + 1, page * CASES_PER_PAGE)
+            return rows[:CASES_PER_PAGE], len(rows) > CASES_PER_PAGE
+
+        try:
+            results, has_more = await fetch(0)
+        except Exception as e:
+            log.error(f"Error searching cases for guild {guild.id}: {e}", exc_info=True)
+            return await interaction.followup.send("❌ An error occurred while searching cases.", ephemeral=True)
+
+        if not results:
+            return await interaction.followup.send(f"No cases match `{query}`.", ephemeral=True)
+
+        def get_page(page, cases):
+            embed = discord.Embed(
+                title=f"Cases matching \"{query[:100]}\" (Page {page+1})",
+                color=discord.Color.blue()
+            )
+            for case in cases:
+                embed.add_field(
+                    name=f"Case #{case[0]}",
+                    value=f"User: <@{case[1]}> ({case[2]})\n"
+                          f"Type: {case[4]}\n"
+                          f"Reason: {case[3]}\n",
+                    inline=False
+                )
+            return embed
+
+        class SearchPaginator(discord.ui.View):
+            def __init__(self):
+                super().__init__(timeout=120)
+                self.page = 0
+                self.next.disabled = not has_more
+
+            async def show(self, interaction_btn):
+                try:
+                    cases, more = await fetch(self.page)
+                except Exception as e:
+                    log.error(f"Error searching cases for guild {guild.id}: {e}", exc_info=True)
+                    return await interaction_btn.response.send_message("❌ An error occurred while searching cases.", ephemeral=True)
+                self.previous.disabled = self.page == 0
+                self.next.disabled = not more
+                await interaction_btn.response.edit_message(embed=get_page(self.page, cases), view=self)
+
+            @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary, disabled=True)
+            async def previous(self, interaction_btn: discord.Interaction, button: discord.ui.Button):
+                self.page = max(self.page - 1, 0)
+                await self.show(interaction_btn)
+
+            @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+            async def next(self, interaction_btn: discord.Interaction, button: discord.ui.Button):
+                self.page += 1
+                await self.show(interaction_btn)
+
+            async def on_timeout(self):
+                for item in self.children:
+                    item.disabled = True
+                try:
+                    await self.message.edit(view=self)
+                except Exception:
+                    pass
+
+        view = SearchPaginator()
+        try:
+            msg = await interaction.followup.send(embed=get_page(0, results), view=view, ephemeral=False)
+        except discord.HTTPException as e:
+            log.error(f"Failed to send case search message: {e}")
+            return await interaction.followup.send("❌ An error occurred while trying to display results.", ephemeral=True)
+        view.message = msg
+
     @app_commands.command(name="case", description="View details of a specific case.")
     @app_commands.describe(case_id="The ID of the case to view")
     @app_commands.checks.has_permissions(view_audit_log=True)
@@ -1,6 +1,5 @@
 # Standard Library Imports
 import asyncio
-import re
 
 
 # Third-Party Imports
@@ -17,8 +16,9 @@ from logging_modules.custom_logger import get_logger
 
 log = get_logger()
 
-from database.items import SHOP_ITEMS
+from database.items import CATALOG
 # absolutely overly redundant id system becuase fuck you that's why (i can't index for shit)
+# (CATALOG indexes it now: by id, by normalized name, and a prefix trie for autocomplete)
 
 SHOP_PAGE_TIMEOUT = 180
 
@@ -28,7 +28,7 @@ class ShopView(discord.ui.View):
         super().__init__(timeout=SHOP_PAGE_TIMEOUT)  # Buttons expire after timeout
         self.user_id = user_id
         self.page = page
-        self.pages = [SHOP_ITEMS[i:i + 4] for i in range(0, len(SHOP_ITEMS), 4)]
+        self.pages = [CATALOG.items[i:i + 4] for i in range(0, len(CATALOG), 4)]
 
     def format_shop_page(self):
         """Formats the current page of shop items into an embed"""
@@ -68,8 +68,7 @@ class ShopView(discord.ui.View):
                 if interaction.user.id != self.user_id:
                     return await interaction.response.send_message("❌ Not your modal!", ephemeral=True)
 
-                name = self.item_name.value.strip().lower()
-                item_data = next((item for item in SHOP_ITEMS if item["name"].lower() == name), None)
+                item_data = CATALOG.by_name(self.item_name.value)
                 if not item_data:
                     return await interaction.response.send_message(f"❌ '{self.item_name.value}' not found!", ephemeral=True)
 
@@ -101,13 +100,6 @@ class ShopView(discord.ui.View):
         await interaction.response.edit_message(content="🛑 **Shop session cancelled.**", embed=None, view=None)
         self.stop()
 
-    @staticmethod
-    def leetspeak_to_text(text):
-        """Convert l33tspeak to normal text for better item recognition"""
-        leet_dict = {"4": "a", "3": "e", "1": "i", "0": "o", "5": "s", "7": "t"}
-        return re.sub(r"[431057]", lambda x: leet_dict[x.group()], text)
-        # gen no idea why i made this func i am so sorry
-
 class ShopCommands(app_commands.Group):
     def __init__(self):
         super().__init__(name="shop", description="Shop related commands")
@@ -119,7 +111,7 @@ class ShopCommands(app_commands.Group):
         """Displays shop items using embeds and buttons"""
         await interaction.response.defer()
         log.info(f"Shop view invoked by {interaction.user.id}")
-        if not SHOP_ITEMS:
+        if not CATALOG:
             return await interaction.response.send_message("❌ The shop is empty!", ephemeral=True)
 
         view = ShopView(interaction.user.id)
@@ -132,8 +124,7 @@ class ShopCommands(app_commands.Group):
         """Handles using an item properly"""
         await interaction.response.defer()
         log.info(f"Use item invoked by {interaction.user.id}: {item_name}")
-        item_name = item_name.lower()
-        item_data = next((item for item in SHOP_ITEMS if item["name"].lower() == item_name), None)
+        item_data = CATALOG.by_name(item_name)
 
         if not item_data:
             return await interaction.response.send_message(f"❌ **'{item_name}' is not a valid item!**", ephemeral=True)
@@ -142,6 +133,10 @@ class ShopCommands(app_commands.Group):
         result_message = await use_item(interaction.user.id, item_data["id"])
         await interaction.followup.send(result_message, ephemeral=True)
 
+    @use.autocomplete("item_name")
+    async def use_autocomplete(self, interaction: discord.Interaction, current: str):
+        return [app_commands.Choice(name=item["name"], value=item["name"]) for item in CATALOG.complete(current)]
+
 class ShopCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -7,7 +7,6 @@ import functools
 import inspect
 import logging
 import os
-import time
 import random
 from functools import wraps
 from typing import Callable, Optional
@@ -19,6 +18,7 @@ from dotenv import load_dotenv
 
 # Ensure we import get_logger used below
 from logging_modules.custom_logger import get_logger
+from utils.ratelimit import RateLimit, rate_limits
 from extraconfig import (
     ALPHA,
     BOT_OWNER,
@@ -76,26 +76,8 @@ log.addHandler(fh)
 
 log.propagate = False
 
-# Use a dict to store cooldowns: {(user_id, command_name): timestamp}
-_user_command_cooldowns = {}
-_command_failures = {}
-
-def check_cooldown(user_id: int, command_name: str, cooldown_seconds: float) -> tuple[bool, float]:
-    """Check if a user is on cooldown for a command. Returns (is_on_cooldown, retry_after)"""
-    key = (user_id, command_name)
-    now = time.time()
-    if key in _user_command_cooldowns:
-        elapsed = now - _user_command_cooldowns[key]
-        if elapsed < cooldown_seconds:
-            return True, cooldown_seconds - elapsed
-    return False, 0.0
-
-def update_cooldown(user_id: int, command_name: str):
-    """Update the cooldown timestamp for a user and command."""
-    _user_command_cooldowns[(user_id, command_name)] = time.time()
-
 # reason we use equals to all three is so even if we forget one it still works with defaults, although that "none" error is annoying
-def cooldown(*, cl: int = 0, tm: float = None, ft: int = 3, nw: bool = False):
+def cooldown(*, cl: int = 0, tm: float = None, ft: int = 3, nw: bool = False, bs: int = 1):
     """
     Adds cooldown, timeout, and failure tracking to a command.
     When a user repeatedly fails a command, the owner gets a DM with logs.
@@ -105,7 +87,10 @@ def cooldown(*, cl: int = 0, tm: float = None, ft: int = 3, nw: bool = False):
     - tm: timeout in seconds for command execution (None = no timeout)
     - ft: failure threshold before alerting owner/user (3 = default)
     - nw: check if command is nsfw (default: False)
+    - bs: burst, uses that can be saved up; with bs > 1, cl is the refill time per use (token bucket)
     """
+    limit = RateLimit(cl, burst=bs) if cl > 0 else None
+
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
@@ -120,9 +105,9 @@ def cooldown(*, cl: int = 0, tm: float = None, ft: int = 3, nw: bool = False):
             key = (user_id, command_name)
             
             # --- cooldown check ---
-            if cl > 0:
-                is_on_cooldown, retry_after = check_cooldown(user_id, command_name, cl)
-                if is_on_cooldown:
+            if limit:
+                retry_after = rate_limits.acquire(user_id, command_name, limit)
+                if retry_after:
                     await interaction.response.send_message(
                         f"🕒 That command's on cooldown! Try again in {round(retry_after, 1)}s.",
                         ephemeral=True,
@@ -130,8 +115,6 @@ def cooldown(*, cl: int = 0, tm: float = None, ft: int = 3, nw: bool = False):
                     log.warningtrace(f"[Cooldown] {command_name} by {user_id} (wait {round(retry_after, 1)}s)")
                     return
 
-            update_cooldown(user_id, command_name)
-
             # --- main run + timeout ---
             if nw:
                 if interaction.channel.type == discord.ChannelType.text and interaction.channel.is_nsfw():
@@ -147,7 +130,7 @@ def cooldown(*, cl: int = 0, tm: float = None, ft: int = 3, nw: bool = False):
                 else:
                     result = await func(*args, **kwargs)
 
-                _command_failures[key] = 0
+                rate_limits.clear_failures(user_id, command_name)
                 log.successtrace(f"[CommandSuccess] {command_name} executed by {user_id}")
                 return result
 
@@ -169,13 +152,12 @@ async def _handle_failure(interaction: Interaction, key: tuple, message: str,
                           ft: int, exc: Exception | None):
     """Increment failure count, notify user, and optionally DM owner."""
     user_id, command_name = key
-    _command_failures[key] = _command_failures.get(key, 0) + 1
-    count = _command_failures[key]
+    count = rate_limits.count_failure(user_id, command_name)
 
     # when threshold hit, reset and alert owner
     if count >= ft:
         message += "\n\n⚠️ **Found a bug? Report it to the developer!**"
-        _command_failures[key] = 0
+        rate_limits.clear_failures(user_id, command_name)
         await _alert_owner(interaction, command_name, exc)
 
     # send error to user
@@ -4,3 +4,4 @@
 # Or: from database import manager as db_module
 
 from database.manager import *
+from database.backup import *
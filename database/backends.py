@@ -0,0 +1,430 @@
+# database/backends.py
+# Storage backends for the hot economy and moderation operations behind one interface,
+# so the same workload can run on SQLite files (what the bot uses), on in-memory SQLite
+# through the same code (fast tests and benchmarks) or on MySQL, and be compared head to head.
+#
+# Pick one with DB_BACKEND=sqlite|memory|mysql (default sqlite):
+#     backend = get_backend()
+#     await backend.init()
+#     await backend.update_balance(user_id, 100)
+
+# Standard Library Imports
+import asyncio
+import os
+import time
+from abc import ABC, abstractmethod
+
+# Local Imports
+import database.manager as manager
+from database.manager import DEBT_FLOOR
+from logging_modules.custom_logger import get_logger
+
+log = get_logger()
+
+DB_BACKEND = os.getenv("DB_BACKEND", "sqlite").lower()
+
+CASE_COLUMNS = "case_number, user_id, username, reason, action_type, timestamp, moderator_id, expiry"
+
+class StorageBackend(ABC):
+    """
+    Economy and moderation operations every backend provides. Balances follow the bot's
+    rules: update_balance clamps at DEBT_FLOOR, atomic_deduct and transfer_balance never
+    take a user below 0. Case numbers are allocated per guild starting at 1.
+    """
+
+    name = "backend"
+
+    async def init(self):
+        """Creates whatever schema the backend needs. Safe to call twice."""
+
+    async def close(self):
+        """Releases connections."""
+
+    # ----- Economy -----
+    @abstractmethod
+    async def add_user(self, user_id, username):
+        """Creates the user with a 0 balance unless they exist."""
+
+    @abstractmethod
+    async def get_balance(self, user_id):
+        """Returns the balance, 0 for unknown users."""
+
+    @abstractmethod
+    async def update_balance(self, user_id, amount):
+        """Adds amount (clamped to DEBT_FLOOR). Returns the new balance, None for unknown users."""
+
+    @abstractmethod
+    async def atomic_deduct(self, user_id, amount):
+        """Takes amount if the balance covers it. Returns True on success."""
+
+    @abstractmethod
+    async def transfer_balance(self, from_user, to_user, amount):
+        """Moves a positive amount between existing users. Returns True on success."""
+
+    @abstractmethod
+    async def get_leaderboard_page(self, limit=10, after=None):
+        """(user_id, username, balance) rows, richest first; after is a (balance, user_id) keyset cursor."""
+
+    @abstractmethod
+    async def add_user_item(self, user_id, item_id, item_name, uses_left=1):
+        """Adds uses of an item, creating the inventory row if needed."""
+
+    @abstractmethod
+    async def get_user_items(self, user_id):
+        """List of {"item_id", "item_name", "uses_left"} dicts."""
+
+    @abstractmethod
+    async def consume_item(self, user_id, item_id):
+        """Uses one charge, dropping the row at 0. Returns the uses left, or None if the user had none."""
+
+    # ----- Moderation -----
+    @abstractmethod
+    async def insert_case(self, guild_id, user_id, username, reason, action_type, moderator_id, timestamp=None, expiry=0):
+        """Stores a case and returns its per-guild case number."""
+
+    @abstractmethod
+    async def get_case(self, guild_id, case_number):
+        """(case_number, user_id, username, reason, action_type, timestamp, moderator_id, expiry) or None."""
+
+    @abstractmethod
+    async def get_cases_page(self, guild_id, limit=10, before=None):
+        """Case rows newest first, numbered below `before`."""
+
+    @abstractmethod
+    async def remove_case(self, guild_id, case_number):
+        """Deletes a case."""
+
+
+# ===================== SQLite =====================
+class SqliteBackend(StorageBackend):
+    """The bot's own storage: database.manager on aiosqlite (paths, shards and caches included)."""
+
+    name = "sqlite"
+
+    async def init(self):
+        await manager.init_databases()
+
+    async def close(self):
+        await manager.db.close()
+
+    async def add_user(self, user_id, username):
+        await manager.add_user(user_id, username)
+
+    async def get_balance(self, user_id):
+        return await manager.get_balance(user_id)
+
+    async def update_balance(self, user_id, amount):
+        return await manager.update_balance(user_id, amount)
+
+    async def atomic_deduct(self, user_id, amount):
+        return await manager.atomic_deduct(user_id, amount)
+
+    async def transfer_balance(self, from_user, to_user, amount):
+        return await manager.transfer_balance(from_user, to_user, amount)
+
+    async def get_leaderboard_page(self, limit=10, after=None):
+        return await manager.get_leaderboard_page(limit, after)
+
+    async def add_user_item(self, user_id, item_id, item_name, uses_left=1):
+        await manager.add_user_item(user_id, item_id, item_name, uses_left)
+
+    async def get_user_items(self, user_id):
+        # user_items.item_id is a TEXT column in the bot's schema
+        return [dict(item, item_id=int(item["item_id"])) for item in await manager.get_user_items(user_id)]
+
+    async def consume_item(self, user_id, item_id):
+        row = await manager.take_item_uses(user_id, item_id, 1)
+        return row["uses_left"] if row else None
+
+    async def insert_case(self, guild_id, user_id, username, reason, action_type, moderator_id, timestamp=None, expiry=0):
+        return await manager.insert_case(guild_id, user_id, username, reason, action_type, moderator_id, timestamp, expiry)
+
+    async def get_case(self, guild_id, case_number):
+        return await manager.get_case(guild_id, case_number)
+
+    async def get_cases_page(self, guild_id, limit=10, before=None):
+        return await manager.get_cases_page(guild_id, limit, before)
+
+    async def remove_case(self, guild_id, case_number):
+        await manager.remove_case(guild_id, case_number)
+
+
+# ===================== In-Memory =====================
+class MemoryBackend(SqliteBackend):
+    """
+    The same database.manager code on ":memory:" SQLite databases, nothing persisted.
+    init() swaps an ephemeral DatabaseManager (with its own leaderboard cache and ledger
+    buffer) in for the module's one; close() puts the previous ones back.
+    """
+
+    name = "memory"
+
+    def __init__(self, shards=None):
+        self.shards = shards
+        self._previous = None
+
+    async def init(self):
+        if self._previous is None:
+            self._previous = (manager.db, manager.leaderboard_cache, manager.ledger)
+            manager.db = manager.DatabaseManager(shards=self.shards or manager.db.economy_shards, ephemeral=True)
+            manager.leaderboard_cache = manager.LeaderboardCache()
+            manager.ledger = manager.LedgerBuffer()
+        await manager.init_databases()
+
+    async def close(self):
+        await manager.db.close()
+        if self._previous is not None:
+            (manager.db, manager.leaderboard_cache, manager.ledger), self._previous = self._previous, None
+
+
+# ===================== MySQL =====================
+MYSQL_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id BIGINT PRIMARY KEY,
+        username VARCHAR(255) NOT NULL,
+        balance BIGINT NOT NULL DEFAULT 0,
+        KEY idx_users_balance (balance, user_id)
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_items (
+        user_id BIGINT NOT NULL,
+        item_id INT NOT NULL,
+        item_name VARCHAR(255) NOT NULL,
+        uses_left INT NOT NULL DEFAULT 1,
+        PRIMARY KEY (user_id, item_id)
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS cases (
+        guild_id BIGINT NOT NULL,
+        case_number INT NOT NULL,
+        user_id BIGINT NOT NULL,
+        username VARCHAR(255),
+        reason TEXT NOT NULL,
+        action_type VARCHAR(32) NOT NULL,
+        timestamp BIGINT NOT NULL,
+        moderator_id BIGINT NOT NULL,
+        expiry BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (guild_id, case_number)
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS case_counters (
+        guild_id BIGINT PRIMARY KEY,
+        last_case_number INT NOT NULL
+    ) ENGINE=InnoDB
+    """,
+]
+
+class MySQLBackend(StorageBackend):
+    """
+    InnoDB over aiomysql (optional dependency, imported on first use). Connection settings
+    come from MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD and MYSQL_DATABASE.
+    """
+
+    name = "mysql"
+
+    def __init__(self, **settings):
+        self.settings = {
+            "host": os.getenv("MYSQL_HOST", "localhost"),
+            "port": int(os.getenv("MYSQL_PORT", 3306)),
+            "user": os.getenv("MYSQL_USER", "root"),
+            "password": os.getenv("MYSQL_PASSWORD", ""),
+            "db": os.getenv("MYSQL_DATABASE", "flurazide"),
+            **settings,
+        }
+        self._pool = None
+        self._pool_lock = asyncio.Lock()
+
+    async def _get_pool(self):
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    try:
+                        import aiomysql
+                    except ImportError as e:
+                        raise RuntimeError("DB_BACKEND=mysql needs the aiomysql package (pip install aiomysql)") from e
+                    self._pool = await aiomysql.create_pool(autocommit=False, minsize=1, maxsize=10, **self.settings)
+        return self._pool
+
+    async def _run(self, sql, params=(), fetch=None):
+        """One statement in its own transaction. fetch is None, "one", "all" or "rowcount"."""
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(sql, params)
+                if fetch == "one":
+                    result = await cursor.fetchone()
+                elif fetch == "all":
+                    result = await cursor.fetchall()
+                else:
+                    result = cursor.rowcount
+            await conn.commit()
+        return result
+
+    async def init(self):
+        for statement in MYSQL_SCHEMA:
+            await self._run(statement)
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+
+    async def add_user(self, user_id, username):
+        await self._run("INSERT IGNORE INTO users (user_id, username, balance) VALUES (%s, %s, 0)", (user_id, username))
+
+    async def get_balance(self, user_id):
+        row = await self._run("SELECT balance FROM users WHERE user_id = %s", (user_id,), "one")
+        return row[0] if row else 0
+
+    async def update_balance(self, user_id, amount):
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    "UPDATE users SET balance = GREATEST(balance + %s, %s) WHERE user_id = %s",
+                    (amount, DEBT_FLOOR, user_id)
+                )
+                await cursor.execute("SELECT balance FROM users WHERE user_id = %s", (user_id,))
+                row = await cursor.fetchone()
+            await conn.commit()
+        return row[0] if row else None
+
+    async def atomic_deduct(self, user_id, amount):
+        changed = await self._run(
+            "UPDATE users SET balance = balance - %s WHERE user_id = %s AND balance >= %s",
+            (amount, user_id, amount), "rowcount"
+        )
+        return changed > 0
+
+    async def transfer_balance(self, from_user, to_user, amount):
+        if amount <= 0:
+            return False
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                # Lock both rows in user_id order so opposite transfers can't deadlock
+                await cursor.execute(
+                    "SELECT user_id FROM users WHERE user_id IN (%s, %s) ORDER BY user_id FOR UPDATE",
+                    (from_user, to_user)
+                )
+                found = len(await cursor.fetchall())
+                if found == (1 if from_user == to_user else 2):
+                    await cursor.execute(
+                        "UPDATE users SET balance = balance - %s WHERE user_id = %s AND balance >= %s",
+                        (amount, from_user, amount)
+                    )
+                    debited = cursor.rowcount > 0
+                else:
+                    debited = False
+                if debited:
+                    await cursor.execute("UPDATE users SET balance = balance + %s WHERE user_id = %s", (amount, to_user))
+            if debited:
+                await conn.commit()
+            else:
+                await conn.rollback()
+        return debited
+
+    async def get_leaderboard_page(self, limit=10, after=None):
+        if after is None:
+            rows = await self._run(
+                "SELECT user_id, username, balance FROM users ORDER BY balance DESC, user_id DESC LIMIT %s",
+                (limit,), "all"
+            )
+        else:
+            rows = await self._run("""
+                SELECT user_id, username, balance FROM users
+                WHERE (balance, user_id) < (%s, %s)
+                ORDER BY balance DESC, user_id DESC LIMIT %s
+            """, (*after, limit), "all")
+        return [tuple(row) for row in rows]
+
+    async def add_user_item(self, user_id, item_id, item_name, uses_left=1):
+        await self._run("""
+            INSERT INTO user_items (user_id, item_id, item_name, uses_left) VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE uses_left = uses_left + VALUES(uses_left)
+        """, (user_id, item_id, item_name, uses_left))
+
+    async def get_user_items(self, user_id):
+        rows = await self._run(
+            "SELECT item_id, item_name, uses_left FROM user_items WHERE user_id = %s", (user_id,), "all"
+        )
+        return [{"item_id": row[0], "item_name": row[1], "uses_left": row[2]} for row in rows]
+
+    async def consume_item(self, user_id, item_id):
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    "SELECT uses_left FROM user_items WHERE user_id = %s AND item_id = %s FOR UPDATE",
+                    (user_id, item_id)
+                )
+                row = await cursor.fetchone()
+                left = row[0] - 1 if row and row[0] > 0 else None
+                if left is not None and left > 0:
+                    await cursor.execute(
+                        "UPDATE user_items SET uses_left = %s WHERE user_id = %s AND item_id = %s", (left, user_id, item_id)
+                    )
+                elif left is not None:
+                    await cursor.execute("DELETE FROM user_items WHERE user_id = %s AND item_id = %s", (user_id, item_id))
+            await conn.commit()
+        return left
+
+    async def insert_case(self, guild_id, user_id, username, reason, action_type, moderator_id, timestamp=None, expiry=0):
+        if timestamp is None:
+            timestamp = int(time.time())
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                # The counter row lock serialises allocation per guild; LAST_INSERT_ID(expr) hands the value back
+                await cursor.execute("""
+                    INSERT INTO case_counters (guild_id, last_case_number) VALUES (%s, 1)
+                    ON DUPLICATE KEY UPDATE last_case_number = LAST_INSERT_ID(last_case_number + 1)
+                """, (guild_id,))
+                if cursor.rowcount == 1:
+                    number = 1
+                else:
+                    await cursor.execute("SELECT LAST_INSERT_ID()")
+                    number = (await cursor.fetchone())[0]
+                await cursor.execute(f"""
+                    INSERT INTO cases (guild_id, {CASE_COLUMNS}) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, (guild_id, number, user_id, username, reason or "No reason provided", action_type,
+                      timestamp, moderator_id, expiry))
+            await conn.commit()
+        return number
+
+    async def get_case(self, guild_id, case_number):
+        row = await self._run(
+            f"SELECT {CASE_COLUMNS} FROM cases WHERE guild_id = %s AND case_number = %s", (guild_id, case_number), "one"
+        )
+        return tuple(row) if row else None
+
+    async def get_cases_page(self, guild_id, limit=10, before=None):
+        rows = await self._run(f"""
+            SELECT {CASE_COLUMNS} FROM cases
+            WHERE guild_id = %s AND case_number < %s
+            ORDER BY case_number DESC LIMIT %s
+        """, (guild_id, before if before is not None else 2**31 - 1, limit), "all")
+        return [tuple(row) for row in rows]
+
+    async def remove_case(self, guild_id, case_number):
+        await self._run("DELETE FROM cases WHERE guild_id = %s AND case_number = %s", (guild_id, case_number))
+
+
+BACKENDS = {
+    SqliteBackend.name: SqliteBackend,
+    MemoryBackend.name: MemoryBackend,
+    MySQLBackend.name: MySQLBackend,
+}
+
+def get_backend(name=None, **kwargs):
+    """Instantiates the backend named by `name`, or DB_BACKEND when omitted."""
+    name = (name or DB_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown DB_BACKEND {name!r}, expected one of: {', '.join(BACKENDS)}")
+    log.database(f"Using {name} storage backend")
+    return BACKENDS[name](**kwargs)
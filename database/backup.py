@@ -0,0 +1,636 @@
+# database/backup.py
+# Backup pipeline for the Flurazide databases: consistent snapshots, change
+# detection, and pluggable storage backends (Google Drive or a local directory).
+
+# Standard Library Imports
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import zipfile
+from abc import ABC, abstractmethod
+
+# Third-Party Imports
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload
+
+# Local Imports
+from logging_modules.custom_logger import get_logger
+from extraconfig import BACKUP_GDRIVE_FOLDER_ID
+from database.manager import DATA_DIR, ECONOMY_SHARDS, MODERATOR_DB_PATH, economy_shard_path
+from database import manager as db_module
+
+log = get_logger()
+
+# ===================== Constants =====================
+ARCHIVE_NAME = "Databases_Flurazide.zip"
+MANIFEST_NAME = "Databases_Flurazide.manifest.json"  # generation metadata stored next to the archive
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "snapshots")
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", 24))  # local archives kept, one per changed backup run
+BACKUP_FOLDER_ID = BACKUP_GDRIVE_FOLDER_ID
+BACKUP_LOCAL_DIR = os.getenv("BACKUP_LOCAL_DIR")  # Set to back up into a directory instead of Drive
+# (local path, archive member); every economy shard is its own member
+DEFAULT_DBS = [
+    (economy_shard_path(i), os.path.basename(economy_shard_path(i))) for i in range(ECONOMY_SHARDS)
+] + [(MODERATOR_DB_PATH, "moderator.db")]
+ARCHIVE_SPOOL_MAX = 32 * 1024 * 1024  # archives up to this size never touch the disk
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# ===================== Google Drive Backup Settings =====================
+TOKEN_ENV = "DRIVE_TOKEN_B64"
+CREDENTIALS_ENV = "DRIVE_CREDENTIALS_B64"
+SCOPES = ['https://www.googleapis.com/auth/drive.file']
+
+def load_creds_local():
+    with open("token.json", "r") as f:
+        token_info = json.load(f)
+    return Credentials.from_authorized_user_info(token_info, SCOPES)
+
+def load_creds_from_env():
+    # Try the user's requested 'DRIVE_' prefix first, then fallback to 'GDRIVE_'
+    token_b64 = os.environ.get(TOKEN_ENV) or os.environ.get(f"G{TOKEN_ENV}")
+    if not token_b64:
+        raise RuntimeError(f"Neither {TOKEN_ENV} nor G{TOKEN_ENV} found in environment.")
+    token_json = base64.b64decode(token_b64).decode()
+    token_info = json.loads(token_json)
+    if ("client_id" not in token_info or "client_secret" not in token_info):
+        creds_b64 = os.environ.get(CREDENTIALS_ENV) or os.environ.get(f"G{CREDENTIALS_ENV}")
+        if creds_b64:
+            creds_json = base64.b64decode(creds_b64).decode()
+            creds_info = json.loads(creds_json)
+            client_block = creds_info.get("installed") or creds_info.get("web") or {}
+            token_info.setdefault("client_id", client_block.get("client_id"))
+            token_info.setdefault("client_secret", client_block.get("client_secret"))
+            token_info.setdefault("token_uri", client_block.get("token_uri") or "https://oauth2.googleapis.com/token")
+    creds = Credentials.from_authorized_user_info(token_info, SCOPES)
+    if creds.expired and creds.refresh_token:
+        try:
+            creds.refresh(Request())
+            log.network("Refreshed OAuth access token successfully.")
+        except Exception as e:
+            log.network(f"Failed to refresh token: {e}. Token may be revoked; you'll need to re-run the local helper.")
+    return creds
+
+def build_drive_service():
+    if os.getenv("RAILWAY_PROJECT_ID"):
+        log.trace("Running on Railway, using env-based credentials.")
+        creds = load_creds_from_env()
+    else:
+        try:
+            creds = load_creds_local()
+        except Exception:
+            log.info("token.json not found, falling back to env-based credentials.")
+            creds = load_creds_from_env()
+    return build("drive", "v3", credentials=creds, cache_discovery=False)
+
+_drive_service = None
+_drive_service_lock = threading.Lock()
+
+def get_drive_service():
+    """Returns the shared Drive client, authenticating on first use. The credentials refresh themselves."""
+    global _drive_service
+    with _drive_service_lock:
+        if _drive_service is None:
+            _drive_service = build_drive_service()
+        return _drive_service
+
+# ===================== Snapshots =====================
+# One step: the copy runs inside a single WAL read transaction, so writers are never blocked.
+# Smaller steps would restart from page 0 every time another connection commits in between.
+SNAPSHOT_PAGES_PER_STEP = -1
+SNAPSHOT_STEP_SLEEP = 0.005    # seconds yielded to writers between steps (only with pages > 0)
+
+def _format_size(num_bytes):
+    for unit in ("B", "KB", "MB"):
+        if num_bytes < 1024:
+            return f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} GB"
+
+def snapshot_db_sync(src_path, dest_path, pages=SNAPSHOT_PAGES_PER_STEP, compact=True):
+    """
+    Copies a live database into dest_path with the SQLite online backup API.
+    The copy is transactionally consistent (includes committed WAL frames); with the
+    databases in WAL mode the single-step copy reads alongside writers instead of blocking them.
+
+    Args:
+        src_path (str): Live database file
+        dest_path (str): Snapshot file to create (overwritten)
+        pages (int): Pages copied per step, -1 for all at once
+        compact (bool): VACUUM the snapshot afterwards, it is private so this never blocks the bot
+
+    Returns:
+        dict: path, bytes and seconds taken
+    """
+    start = time.perf_counter()
+    if os.path.exists(dest_path):
+        os.remove(dest_path)
+    src = sqlite3.connect(src_path)
+    dst = sqlite3.connect(dest_path)
+    try:
+        src.backup(dst, pages=pages, sleep=SNAPSHOT_STEP_SLEEP)
+        if compact:
+            dst.execute("VACUUM")
+    finally:
+        dst.close()
+        src.close()
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(dest_path)
+    log.database(f"Snapshot {os.path.basename(src_path)}: {_format_size(size)} in {elapsed:.2f}s")
+    return {"path": dest_path, "bytes": size, "seconds": elapsed}
+
+def compact_snapshot_sync(path):
+    """VACUUMs a private snapshot file in place. Returns its new size."""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    return os.path.getsize(path)
+
+def fingerprint_file(path):
+    """
+    sha256 of a database file, ignoring the header counters SQLite bumps on every
+    write transaction (offsets 24-27 and 92-99) and the schema cookie the backup API
+    bumps on every copy (offsets 40-43), so identical content hashes the same.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        header = bytearray(f.read(100))
+        if len(header) == 100:
+            header[24:28] = bytes(4)
+            header[40:44] = bytes(4)
+            header[92:100] = bytes(8)
+        digest.update(header)
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# ===================== Storage Backends =====================
+class BackupBackend(ABC):
+    """Where backup archives live. Methods block and are called from worker threads."""
+
+    name = "backend"
+
+    @abstractmethod
+    def upload(self, name, fileobj, size):
+        """Store (overwrite) the archive `name` from a readable file object positioned at 0."""
+
+    @abstractmethod
+    def download(self, name, fileobj):
+        """Write the archive `name` into fileobj. Returns False if it does not exist."""
+
+
+class DriveBackend(BackupBackend):
+    """Google Drive folder. Reuses the shared client and remembers file ids between runs."""
+
+    name = "drive"
+
+    def __init__(self, folder_id, service_factory=get_drive_service):
+        self.folder_id = folder_id
+        self._service_factory = service_factory
+        self._file_ids = {}
+
+    def _find(self, service, name):
+        if name in self._file_ids:
+            return self._file_ids[name]
+        query = f"'{self.folder_id}' in parents and name='{name}' and trashed=false"
+        files = service.files().list(q=query, fields="files(id, name)").execute().get("files", [])
+        file_id = files[0]["id"] if files else None
+        if file_id:
+            self._file_ids[name] = file_id
+        return file_id
+
+    def upload(self, name, fileobj, size):
+        service = self._service_factory()
+        mimetype = {".zip": "application/zip", ".json": "application/json"}.get(os.path.splitext(name)[1], "application/octet-stream")
+        media = MediaIoBaseUpload(fileobj, mimetype=mimetype, chunksize=UPLOAD_CHUNK_SIZE, resumable=True)
+        file_id = self._find(service, name)
+        if file_id:
+            try:
+                service.files().update(fileId=file_id, media_body=media).execute()
+                log.success(f"Updated existing backup '{name}' ({_format_size(size)}).")
+                return
+            except HttpError as e:
+                if e.resp.status != 404:
+                    raise
+                # Deleted on the Drive side since we cached the id
+                self._file_ids.pop(name, None)
+                fileobj.seek(0)
+                media = MediaIoBaseUpload(fileobj, mimetype=mimetype, chunksize=UPLOAD_CHUNK_SIZE, resumable=True)
+        meta = {"name": name, "parents": [self.folder_id]}
+        created = service.files().create(body=meta, media_body=media, fields="id").execute()
+        self._file_ids[name] = created["id"]
+        log.success(f"Created new backup '{name}' ({_format_size(size)}).")
+
+    def download(self, name, fileobj):
+        service = self._service_factory()
+        file_id = self._find(service, name)
+        if not file_id:
+            log.warning(f"No backup found with name {name} on Google Drive.")
+            return False
+        downloader = MediaIoBaseDownload(fileobj, service.files().get_media(fileId=file_id))
+        done = False
+        while not done:
+            status, done = downloader.next_chunk()
+            if status:
+                log.info(f"Download progress: {int(status.progress() * 100)}%")
+        return True
+
+
+class LocalDirBackend(BackupBackend):
+    """Plain directory, for offline runs and tests. Writes are atomic."""
+
+    name = "local"
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def upload(self, name, fileobj, size):
+        dest = os.path.join(self.directory, name)
+        tmp = f"{dest}.partial"
+        with open(tmp, "wb") as out:
+            shutil.copyfileobj(fileobj, out)
+        os.replace(tmp, dest)
+        log.success(f"Stored backup '{name}' in {self.directory} ({_format_size(size)}).")
+
+    def download(self, name, fileobj):
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            log.warning(f"No backup found with name {name} in {self.directory}.")
+            return False
+        with open(path, "rb") as src:
+            shutil.copyfileobj(src, fileobj)
+        return True
+
+# ===================== Local Snapshot Store =====================
+class SnapshotStore:
+    """
+    Local tier of the backup pipeline: rotating generation archives plus a manifest
+    recording which generation the live database files are at.
+
+    Manifest keys: generation, created_at, fingerprints, uploaded
+    """
+
+    def __init__(self, directory=SNAPSHOT_DIR, keep=SNAPSHOT_KEEP):
+        self.directory = directory
+        self.keep = keep
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        os.makedirs(directory, exist_ok=True)
+
+    def read_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            log.warning(f"Unreadable snapshot manifest {self.manifest_path}: {e}")
+            return {}
+
+    def write_manifest(self, manifest):
+        tmp = f"{self.manifest_path}.partial"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self.manifest_path)
+
+    def path_for(self, generation):
+        return os.path.join(self.directory, f"gen-{generation:08d}.zip")
+
+    def save(self, generation, fileobj):
+        """Stores an archive for generation and prunes the oldest ones beyond keep. Returns its path."""
+        dest = self.path_for(generation)
+        tmp = f"{dest}.partial"
+        with open(tmp, "wb") as out:
+            shutil.copyfileobj(fileobj, out)
+        os.replace(tmp, dest)
+        for old in self.archives()[:-self.keep]:
+            try:
+                os.remove(old)
+            except OSError as e:
+                log.warning(f"Could not prune old snapshot {old}: {e}")
+        return dest
+
+    def archives(self):
+        """Archive paths, oldest first."""
+        return sorted(
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.startswith("gen-") and name.endswith(".zip")
+        )
+
+# ===================== Backup Pipeline =====================
+class BackupPipeline:
+    """
+    Snapshot -> fingerprint -> (skip if unchanged) -> zip in memory -> upload.
+
+    Usage:
+        pipeline = BackupPipeline(LocalDirBackend("backups"), DEFAULT_DBS)
+        report = pipeline.run()  # blocking, call through asyncio.to_thread
+    """
+
+    def __init__(self, backend, dbs, archive_name=ARCHIVE_NAME, store=None):
+        self.backend = backend
+        self.dbs = list(dbs)
+        self.archive_name = archive_name
+        self.store = store
+        self._fingerprints = {}  # archive member -> fingerprint of what the backend currently holds
+        self._generation = 0
+        self._lock = threading.Lock()
+        if store:
+            manifest = store.read_manifest()
+            self._generation = manifest.get("generation", 0)
+            if manifest.get("uploaded"):
+                self._fingerprints = manifest.get("fingerprints", {})
+
+    def run(self, force=False):
+        """
+        Backs up every database once. Returns a timing/size report, or None when there was nothing to back up.
+
+        Args:
+            force (bool): Upload even if no database changed since the last upload
+        """
+        with self._lock:
+            return self._run(upload=True, force=force)
+
+    def snapshot_local(self):
+        """
+        Shutdown fast path: stores a new local generation if anything changed, without uploading.
+        The snapshots are neither vacuumed nor compressed; upload_pending compresses before uploading.
+        """
+        with self._lock:
+            return self._run(upload=False)
+
+    def upload_pending(self):
+        """
+        Uploads the newest local snapshot if it never reached the backend
+        (e.g. the shutdown upload was cut off). Returns True if one was uploaded.
+        """
+        with self._lock:
+            if not self.store:
+                return False
+            manifest = self.store.read_manifest()
+            if not manifest or manifest.get("uploaded", True):
+                return False
+            self._upload_stored(manifest)
+            return True
+
+    def _upload_stored(self, manifest):
+        path = self.store.path_for(manifest["generation"])
+        started = time.perf_counter()
+        with open(path, "rb") as stored, zipfile.ZipFile(stored) as zipf:
+            repack = any(info.compress_type == zipfile.ZIP_STORED for info in zipf.infolist())
+        if repack:
+            # Left uncompressed by the shutdown snapshot; deflate it now rather than upload it raw
+            with tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_MAX) as archive:
+                with zipfile.ZipFile(path) as src, zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as dst:
+                    for info in src.infolist():
+                        with src.open(info) as member, dst.open(info.filename, "w") as out:
+                            shutil.copyfileobj(member, out, 1024 * 1024)
+                size = archive.tell()
+                archive.seek(0)
+                self.backend.upload(self.archive_name, archive, size)
+        else:
+            with open(path, "rb") as archive:
+                self.backend.upload(self.archive_name, archive, os.path.getsize(path))
+        self._upload_manifest(manifest)
+        self._fingerprints = manifest["fingerprints"]
+        log.info(f"Uploaded snapshot generation {manifest['generation']} in {time.perf_counter() - started:.2f}s")
+
+    def _run(self, upload, force=False):
+        started = time.perf_counter()
+        with tempfile.TemporaryDirectory(prefix="flurazide_backup_") as workdir:
+            # Snapshot stage: never read the live files directly, they may be mid-write
+            snapshots = []
+            for local_path, member in self.dbs:
+                if not os.path.exists(local_path):
+                    log.warning(f"File not found: {local_path}, skipping.")
+                    continue
+                # Fingerprint the raw copy so shutdown (uncompacted) and periodic snapshots compare equal
+                snap = snapshot_db_sync(local_path, os.path.join(workdir, member), compact=False)
+                snap["fingerprint"] = fingerprint_file(snap["path"])
+                snapshots.append((member, snap))
+            if not snapshots:
+                log.warning("No databases to back up.")
+                return None
+
+            fingerprints = {member: snap["fingerprint"] for member, snap in snapshots}
+            report = {
+                "snapshots": {member: {"bytes": snap["bytes"], "seconds": snap["seconds"]} for member, snap in snapshots},
+                "snapshot_seconds": sum(snap["seconds"] for _, snap in snapshots),
+                "archive_bytes": 0,
+                "generation": self._generation,
+                "uploaded": False,
+            }
+            local = self.store.read_manifest() if self.store else {}
+            stored = local.get("fingerprints") == fingerprints and os.path.exists(self.store.path_for(local["generation"]))
+
+            if not force and fingerprints == self._fingerprints:
+                report["total_seconds"] = time.perf_counter() - started
+                log.info(f"Databases unchanged since the last backup, skipping upload ({report['total_seconds']:.2f}s).")
+                return report
+            if stored and (not upload or not force):
+                # Already captured locally; at most the upload is outstanding
+                if upload:
+                    self._upload_stored(local)
+                    report["uploaded"] = True
+                report["total_seconds"] = time.perf_counter() - started
+                return report
+
+            generation = self._generation + 1
+            manifest = {"generation": generation, "created_at": time.time(), "fingerprints": fingerprints, "uploaded": False}
+            report["generation"] = generation
+            if upload:
+                for member, snap in snapshots:
+                    snap["bytes"] = report["snapshots"][member]["bytes"] = compact_snapshot_sync(snap["path"])
+            # Shutdown stores the archive uncompressed; it is deflated when it gets uploaded
+            compression = zipfile.ZIP_DEFLATED if upload else zipfile.ZIP_STORED
+            with tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_MAX) as archive:
+                with zipfile.ZipFile(archive, "w", compression) as zipf:
+                    for member, snap in snapshots:
+                        zipf.write(snap["path"], arcname=member)
+                report["archive_bytes"] = archive.tell()
+                if self.store:
+                    # Local tier first: the snapshot is durable even if the upload below fails
+                    archive.seek(0)
+                    self.store.save(generation, archive)
+                    self.store.write_manifest(manifest)
+                self._generation = generation
+                if upload:
+                    archive.seek(0)
+                    self.backend.upload(self.archive_name, archive, report["archive_bytes"])
+            if upload:
+                self._upload_manifest(manifest)
+                self._fingerprints = fingerprints
+                report["uploaded"] = True
+
+        report["total_seconds"] = time.perf_counter() - started
+        log.info(
+            f"{'Backup' if upload else 'Local snapshot'} generation {generation} finished in {report['total_seconds']:.2f}s "
+            f"(snapshots {report['snapshot_seconds']:.2f}s, archive {_format_size(report['archive_bytes'])})"
+        )
+        return report
+
+    def restore(self, restore_map):
+        """
+        Replaces local databases with the ones in the stored archive.
+
+        Args:
+            restore_map (dict): archive member -> local path
+
+        Returns:
+            bool: True if the archive was found and extracted
+        """
+        with self._lock:
+            with tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_MAX) as archive:
+                if not self.backend.download(self.archive_name, archive):
+                    return False
+                archive.seek(0)
+                log.info(f"Downloaded {self.archive_name}, extracting...")
+                fingerprints = {}
+                with zipfile.ZipFile(archive, "r") as zipf:
+                    for member in zipf.namelist():
+                        if member not in restore_map:
+                            log.warning(f"Skipping unknown file in ZIP: {member}")
+                            continue
+                        dest_path = restore_map[member]
+                        tmp_path = f"{dest_path}.restore"
+                        with zipf.open(member) as src, open(tmp_path, "wb") as out:
+                            shutil.copyfileobj(src, out)
+                        fingerprints[member] = fingerprint_file(tmp_path)
+                        # A journal left next to the old file would be replayed onto the new one
+                        for suffix in ("-wal", "-shm", "-journal"):
+                            if os.path.exists(dest_path + suffix):
+                                os.remove(dest_path + suffix)
+                        os.replace(tmp_path, dest_path)
+                        log.success(f"Restored {member} -> {dest_path}")
+            # The backend now holds exactly what we have locally
+            self._fingerprints = fingerprints
+            log.success("All databases restored successfully.")
+            return True
+
+    def _upload_manifest(self, manifest):
+        manifest = dict(manifest, uploaded=True)
+        payload = json.dumps(manifest).encode()
+        self.backend.upload(MANIFEST_NAME, io.BytesIO(payload), len(payload))
+        if self.store:
+            self.store.write_manifest(manifest)
+
+    def fetch_remote_manifest(self):
+        """Returns the manifest stored next to the remote archive, or None (missing, or a pre-manifest backup)."""
+        buffer = io.BytesIO()
+        if not self.backend.download(MANIFEST_NAME, buffer):
+            return None
+        try:
+            return json.loads(buffer.getvalue())
+        except ValueError as e:
+            log.warning(f"Remote backup manifest is unreadable: {e}")
+            return None
+
+    def sync_from_remote(self, restore_map):
+        """
+        Startup check: restores from the backend only when it holds a strictly newer generation
+        than the local files. Missing local files always lose.
+
+        Returns:
+            bool: True if databases were restored
+        """
+        local = self.store.read_manifest() if self.store else {}
+        have_local = all(os.path.exists(path) for path in restore_map.values())
+        local_gen = local.get("generation", 0) if have_local else -1
+        remote = self.fetch_remote_manifest()
+        # Archives uploaded before manifests existed count as generation 0
+        remote_gen = remote.get("generation", 0) if remote else 0
+
+        if remote_gen <= local_gen:
+            log.info(f"Local databases are current (generation {local_gen}, remote {remote_gen}), skipping restore.")
+            return False
+
+        log.info(f"Remote backup is newer (generation {remote_gen}, local {local_gen}), restoring.")
+        if not self.restore(restore_map):
+            return False
+        with self._lock:
+            self._generation = remote_gen
+            if self.store:
+                self.store.write_manifest({
+                    "generation": remote_gen,
+                    "created_at": (remote or {}).get("created_at", time.time()),
+                    "fingerprints": self._fingerprints,
+                    "uploaded": True,
+                })
+        return True
+
+_pipelines = {}
+
+def get_backup_pipeline(folder_id=BACKUP_FOLDER_ID, dbs=None):
+    """Returns the long-lived pipeline for a destination, so fingerprints and the client survive between runs."""
+    pipeline = _pipelines.get(folder_id)
+    if pipeline is None:
+        backend = LocalDirBackend(BACKUP_LOCAL_DIR) if BACKUP_LOCAL_DIR else DriveBackend(folder_id)
+        pipeline = BackupPipeline(backend, dbs or DEFAULT_DBS, store=SnapshotStore())
+        _pipelines[folder_id] = pipeline
+    elif dbs:
+        pipeline.dbs = list(dbs)
+    return pipeline
+
+# ===================== Google Drive Backup / Restore =====================
+async def backup_all_dbs_to_gdrive_env(dbs: list[tuple[str, str]], folder_id: str, force: bool = False):
+    """Snapshot multiple .db files and upload them as one .zip, unless nothing changed. Returns a timing/size report."""
+    pipeline = get_backup_pipeline(folder_id, dbs)
+    # In-memory economy shards only reach their files at a checkpoint
+    await db_module.db.checkpoint_memory()
+    return await asyncio.to_thread(pipeline.run, force)
+
+async def restore_all_dbs_from_gdrive_env(folder_id, restore_map: dict[str, str]):
+    """Restore all databases from the fixed ZIP on Google Drive."""
+    pipeline = get_backup_pipeline(folder_id)
+    log.info(f"Searching for {pipeline.archive_name} in {pipeline.backend.name} backend...")
+    try:
+        return await asyncio.to_thread(pipeline.restore, restore_map)
+    except HttpError as e:
+        log.exception(f"Failed to restore from Drive: {e}")
+        return False
+    except Exception as e:
+        log.exception(f"Unexpected error during restore: {e}")
+        return False
+
+async def sync_databases_from_remote(folder_id, restore_map: dict[str, str]):
+    """Startup restore: only pulls the remote backup when it is strictly newer than the local files."""
+    pipeline = get_backup_pipeline(folder_id)
+    started = time.perf_counter()
+    try:
+        return await asyncio.to_thread(pipeline.sync_from_remote, restore_map)
+    except Exception as e:
+        log.exception(f"Startup restore check failed, keeping local databases: {e}")
+        return False
+    finally:
+        log.info(f"Startup restore check took {time.perf_counter() - started:.2f}s")
+
+async def snapshot_databases_locally(folder_id=BACKUP_FOLDER_ID):
+    """Local-only snapshot used at shutdown. Fast and touches no network."""
+    pipeline = get_backup_pipeline(folder_id)
+    await db_module.db.checkpoint_memory()
+    return await asyncio.to_thread(pipeline.snapshot_local)
+
+async def upload_pending_backup(folder_id=BACKUP_FOLDER_ID):
+    """Uploads a local snapshot left behind by an interrupted upload. Returns True if one was uploaded."""
+    pipeline = get_backup_pipeline(folder_id)
+    return await asyncio.to_thread(pipeline.upload_pending)
+
+# ===================== Periodic Backup =====================
+async def run_scheduled_backup():
+    """One periodic backup of the economy and moderator databases to Google Drive; run by the backup job."""
+    report = await backup_all_dbs_to_gdrive_env(DEFAULT_DBS, BACKUP_FOLDER_ID)
+    if report and report["uploaded"]:
+        log.success("Backup task completed.")
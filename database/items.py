@@ -1,5 +1,10 @@
 # database/items.py
 # Centralized definition of all shop items, making stats easily tweakable.
+# CATALOG indexes them once at import: by id, by normalized name, and a prefix trie for autocomplete.
+
+# Standard Library Imports
+import re
+from types import MappingProxyType
 
 SHOP_ITEMS = [
     {'id': 1, 'name': 'Bragging Rights', 'price': 10000, 'effect': 'Nothing. Just flex.', 'uses_left': 1},
@@ -15,20 +20,101 @@ SHOP_ITEMS = [
     {'id': 11, 'name': 'Watermelon', 'price': 500, 'effect': 'Doctors approve! Does nothing', 'uses_left': 500}
 ]
 
+_LEET = str.maketrans({"4": "a", "3": "e", "1": "i", "0": "o", "5": "s", "7": "t"})
+
+def normalize_item_name(text: str) -> str:
+    """Lower-cases, folds l33tspeak and collapses whitespace so typed names match catalog names."""
+    return re.sub(r"\s+", " ", text.lower().translate(_LEET)).strip()
+
+
+class ItemNameTrie:
+    """
+    Prefix trie over normalized item names. Every word of a name is indexed,
+    so "gun" completes to "Loaded Gun" as well as "loa" does.
+    Each node keeps the ids below it, so a lookup is one walk down the prefix.
+    """
+
+    def __init__(self):
+        self._root = {"ids": [], "next": {}}
+
+    def insert(self, name: str, item_id: int):
+        words = name.split(" ")
+        for start in range(len(words)):
+            node = self._root
+            for char in " ".join(words[start:]):
+                node = node["next"].setdefault(char, {"ids": [], "next": {}})
+                if item_id not in node["ids"]:
+                    node["ids"].append(item_id)
+
+    def search(self, prefix: str) -> list:
+        """Returns item ids whose name (or a word in it) starts with the normalized prefix, in insertion order."""
+        node = self._root
+        for char in normalize_item_name(prefix):
+            node = node["next"].get(char)
+            if node is None:
+                return []
+        return list(node["ids"])
+
+
+class ItemCatalog:
+    """
+    Read-only index over the shop items, built once at import.
+
+    Usage:
+        CATALOG.by_id(10)
+        CATALOG.by_name("L0aded gun")
+        CATALOG.complete("gu")  # -> [item, ...] for autocomplete
+    """
+
+    def __init__(self, items):
+        self.items = tuple(MappingProxyType(dict(item)) for item in items)
+        ids, names = {}, {}
+        self._trie = ItemNameTrie()
+        for item in self.items:
+            name = normalize_item_name(item["name"])
+            if item["id"] in ids or name in names:
+                raise ValueError(f"Duplicate shop item: {item['id']} / {item['name']}")
+            ids[item["id"]] = item
+            names[name] = item
+            self._trie.insert(name, item["id"])
+        self._by_id = MappingProxyType(ids)
+        self._by_name = MappingProxyType(names)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def by_id(self, item_id: int):
+        return self._by_id.get(item_id)
+
+    def by_name(self, name: str):
+        return self._by_name.get(normalize_item_name(name))
+
+    def complete(self, prefix: str, limit: int = 25) -> list:
+        """Items matching a partially typed name; an empty prefix lists the catalog."""
+        if not prefix.strip():
+            return list(self.items[:limit])
+        return [self._by_id[item_id] for item_id in self._trie.search(prefix)[:limit]]
+
+
+CATALOG = ItemCatalog(SHOP_ITEMS)
+
 def get_item_by_id(item_id: int):
-    for item in SHOP_ITEMS:
-        if item['id'] == item_id:
-            return item
-    return None
+    return CATALOG.by_id(item_id)
+
+def get_item_by_name(name: str):
+    return CATALOG.by_name(name)
 
 def get_all_items():
-    return SHOP_ITEMS
+    return CATALOG.items
 
 ITEM_EFFECTS = {
-    2: {"drain_percent": 1},
+    2: {"drain_percent": 1, "duration": 86400, "interval": 3600}, # 1% per hour for a day
     3: {"robbery_modifier": 50},
     4: {"robbery_modifier": -50}, # Protective
-    5: {"taser": True, "robbery_modifier": -100},
+    5: {"taser": True, "robbery_modifier": -100, "duration": 3600},
     6: {"gambling_placebo": True},
     8: {"robbery_modifier": 20},
     9: {"robbery_modifier": 50, "temporary_effect": True, "duration": 3600},
@@ -3,32 +3,28 @@
 # Ported from src/database.py with bug fixes and modular structure.
 
 # Standard Library Imports
+import array
 import asyncio
-import base64
-import io
-import json
+import contextlib
+import contextvars
 import os
+import re
 import shutil
 import sqlite3
 import sys
-import tempfile
 import time
-import zipfile
+import uuid
 from functools import wraps
 
 # Third-Party Imports
 import aiosqlite
 from dotenv import load_dotenv
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
 
 # Local Imports
 from logging_modules.custom_logger import get_logger
-from extraconfig import BACKUP_GDRIVE_FOLDER_ID, BOT_OWNER
-from database.items import SHOP_ITEMS, ITEM_EFFECTS
+from extraconfig import BOT_OWNER
+from database.items import SHOP_ITEMS, ITEM_EFFECTS, CATALOG
+from database.memory_store import MemoryEconomyStore, MEMORY_CHECKPOINT_INTERVAL
 
 log = get_logger()
 
@@ -44,6 +40,30 @@ os.makedirs(DATA_DIR, exist_ok=True)
 ECONOMY_DB_PATH = os.path.join(DATA_DIR, "economy.db")
 MODERATOR_DB_PATH = os.path.join(DATA_DIR, "moderator.db")
 
+# Optional sharded economy: users are spread over N files by user_id hash, each with its own writer thread.
+# 1 keeps the single economy.db. Split an existing database with `python -m database.shards split N`.
+ECONOMY_SHARDS = max(1, int(os.getenv("ECONOMY_SHARDS", 1)))
+
+# Optional RAM-resident economy: shards run in memory, journaled to disk and checkpointed back
+# into their .db files (see database/memory_store.py). The moderator database always stays on disk.
+ECONOMY_IN_MEMORY = os.getenv("ECONOMY_IN_MEMORY", "0").lower() in ("1", "true", "yes")
+
+def economy_shard_path(index, shards=None, base_path=None):
+    """File of one economy shard (next to base_path, default economy.db). With a single shard this is base_path itself."""
+    base_path = base_path or ECONOMY_DB_PATH
+    if (shards or ECONOMY_SHARDS) == 1:
+        return base_path
+    base, ext = os.path.splitext(base_path)
+    return f"{base}_shard{index}{ext}"
+
+def shard_for(user_id, shards=None):
+    """Shard index of a user. Snowflakes are mixed first, their low bits are far from uniform."""
+    shards = shards or ECONOMY_SHARDS
+    if shards == 1:
+        return 0
+    mixed = (user_id * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    return (mixed >> 32) % shards
+
 # ===================== Decorators =====================
 def log_db_call(func):
     @wraps(func)
@@ -59,205 +79,31 @@ def log_mod_call(func):
         return await func(*args, **kwargs)
     return wrapper
 
-# ===================== Google Drive Backup Settings =====================
-TOKEN_ENV = "DRIVE_TOKEN_B64"
-CREDENTIALS_ENV = "DRIVE_CREDENTIALS_B64"
-SCOPES = ['https://www.googleapis.com/auth/drive.file']
-
-def load_creds_local():
-    with open("token.json", "r") as f:
-        token_info = json.load(f)
-    return Credentials.from_authorized_user_info(token_info, SCOPES)
-
-def load_creds_from_env():
-    # Try the user's requested 'DRIVE_' prefix first, then fallback to 'GDRIVE_'
-    token_b64 = os.environ.get(TOKEN_ENV) or os.environ.get(f"G{TOKEN_ENV}")
-    if not token_b64:
-        raise RuntimeError(f"Neither {TOKEN_ENV} nor G{TOKEN_ENV} found in environment.")
-    token_json = base64.b64decode(token_b64).decode()
-    token_info = json.loads(token_json)
-    if ("client_id" not in token_info or "client_secret" not in token_info):
-        creds_b64 = os.environ.get(CREDENTIALS_ENV) or os.environ.get(f"G{CREDENTIALS_ENV}")
-        if creds_b64:
-            creds_json = base64.b64decode(creds_b64).decode()
-            creds_info = json.loads(creds_json)
-            client_block = creds_info.get("installed") or creds_info.get("web") or {}
-            token_info.setdefault("client_id", client_block.get("client_id"))
-            token_info.setdefault("client_secret", client_block.get("client_secret"))
-            token_info.setdefault("token_uri", client_block.get("token_uri") or "https://oauth2.googleapis.com/token")
-    creds = Credentials.from_authorized_user_info(token_info, SCOPES)
-    if creds.expired and creds.refresh_token:
-        try:
-            creds.refresh(Request())
-            log.network("Refreshed OAuth access token successfully.")
-        except Exception as e:
-            log.network(f"Failed to refresh token: {e}. Token may be revoked; you'll need to re-run the local helper.")
-    return creds
-
-def build_drive_service():
-    if os.getenv("RAILWAY_PROJECT_ID"):
-        log.trace("Running on Railway, using env-based credentials.")
-        creds = load_creds_from_env()
-    else:
-        try:
-            creds = load_creds_local()
-        except Exception:
-            log.info("token.json not found, falling back to env-based credentials.")
-            creds = load_creds_from_env()
-    return build("drive", "v3", credentials=creds, cache_discovery=False)
-
-# ===================== Google Drive Backup / Restore =====================
-def _backup_db_to_gdrive_sync(local_path, drive_filename, folder_id):
-    log.info(f"Backing up {local_path} -> {drive_filename}")
-    service = build_drive_service()
-    query = f"'{folder_id}' in parents and name='{drive_filename}' and trashed=false"
-    res = service.files().list(q=query, fields="files(id, name)").execute()
-    files = res.get("files", [])
-    media = MediaFileUpload(local_path, mimetype="application/x-sqlite3", resumable=True)
-    if files:
-        file_id = files[0]["id"]
-        service.files().update(fileId=file_id, media_body=media).execute()
-        log.success("Updated existing backup.")
-    else:
-        meta = {"name": drive_filename, "parents": [folder_id]}
-        service.files().create(body=meta, media_body=media, fields="id").execute()
-        log.success("Created new backup.")
-
-async def backup_db_to_gdrive_env(local_path, drive_filename, folder_id):
-    await asyncio.to_thread(_backup_db_to_gdrive_sync, local_path, drive_filename, folder_id)
-
-def _backup_all_dbs_sync(dbs, folder_id):
-    zip_filename = "Databases_Flurazide.zip"
-    temp_zip_path = os.path.join(tempfile.gettempdir(), zip_filename)
-    log.info(f"Creating combined backup: {temp_zip_path}")
-    with zipfile.ZipFile(temp_zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-        for local_path, drive_filename in dbs:
-            if not os.path.exists(local_path):
-                log.warning(f"File not found: {local_path}, skipping.")
-                continue
-            zipf.write(local_path, arcname=drive_filename)
-    log.info("All databases zipped successfully.")
-    service = build_drive_service()
-    query = f"'{folder_id}' in parents and name='{zip_filename}' and trashed=false"
-    res = service.files().list(q=query, fields="files(id, name)").execute()
-    files = res.get("files", [])
-    media = MediaFileUpload(temp_zip_path, mimetype="application/zip", resumable=True)
-    try:
-        if files:
-            file_id = files[0]["id"]
-            service.files().update(fileId=file_id, media_body=media).execute()
-            log.success(f"Updated existing backup '{zip_filename}'.")
-        else:
-            meta = {"name": zip_filename, "parents": [folder_id]}
-            service.files().create(body=meta, media_body=media, fields="id").execute()
-            log.success(f"Created new backup '{zip_filename}'.")
-    finally:
-        if 'media' in locals():
-            del media
-        for i in range(5):
-            try:
-                if os.path.exists(temp_zip_path):
-                    os.remove(temp_zip_path)
-                break
-            except OSError as e:
-                if i == 4:
-                    log.warning(f"Could not remove temp backup file after retries: {e}")
-                time.sleep(0.5)
-
-async def backup_all_dbs_to_gdrive_env(dbs: list[tuple[str, str]], folder_id: str):
-    """Combine multiple .db files into one .zip and upload (overwrite) it to Drive."""
-    await asyncio.to_thread(_backup_all_dbs_sync, dbs, folder_id)
-
-def _restore_db_sync(local_path, drive_filename, folder_id):
-    log.info(f"Restoring {drive_filename} -> {local_path}")
-    service = build_drive_service()
-    if folder_id:
-        q = f"'{folder_id}' in parents and name='{drive_filename}' and trashed=false"
-    else:
-        q = f"name='{drive_filename}' and trashed=false"
-    res = service.files().list(q=q, fields="files(id, name)").execute()
-    files = res.get("files", [])
-    if not files:
-        log.warning(f"No backup found on Google Drive with name: {drive_filename}")
-        return False
-    file_id = files[0]["id"]
-    request = service.files().get_media(fileId=file_id)
-    try:
-        with io.FileIO(local_path, 'wb') as fh:
-            downloader = MediaIoBaseDownload(fh, request)
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-        log.info(f"Restored database from Google Drive: {drive_filename}")
-        return True
-    except HttpError as e:
-        log.exception(f"Failed to download {drive_filename}: {e}")
-        return False
-    except Exception as e:
-        log.exception(f"Unexpected error while restoring {drive_filename}: {e}")
-        return False
-
-async def restore_db_from_gdrive_env(local_path, drive_filename, folder_id=None):
-    return await asyncio.to_thread(_restore_db_sync, local_path, drive_filename, folder_id)
-
-def _restore_all_dbs_sync(folder_id, restore_map):
-    zip_filename = "Databases_Flurazide.zip"
-    service = build_drive_service()
-    log.info(f"Searching for {zip_filename} in Google Drive folder {folder_id}...")
-    query = f"'{folder_id}' in parents and name='{zip_filename}' and trashed=false"
-    res = service.files().list(q=query, fields="files(id, name)").execute()
-    files = res.get("files", [])
-    if not files:
-        log.warning(f"No backup found with name {zip_filename} on Google Drive.")
-        return False
-    file_id = files[0]["id"]
-    temp_zip = os.path.join(tempfile.gettempdir(), zip_filename)
-    request = service.files().get_media(fileId=file_id)
-    try:
-        with io.FileIO(temp_zip, 'wb') as fh:
-            downloader = MediaIoBaseDownload(fh, request)
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-                if status:
-                    log.info(f"Download progress: {int(status.progress() * 100)}%")
-        log.info(f"Downloaded {zip_filename}, extracting...")
-        with zipfile.ZipFile(temp_zip, "r") as zipf:
-            for member in zipf.namelist():
-                if member in restore_map:
-                    dest_path = restore_map[member]
-                    zipf.extract(member, path=os.path.dirname(dest_path))
-                    os.replace(os.path.join(os.path.dirname(dest_path), member), dest_path)
-                    log.success(f"Restored {member} -> {dest_path}")
-                else:
-                    log.warning(f"Skipping unknown file in ZIP: {member}")
-        log.success("All databases restored successfully.")
-        try:
-            os.remove(temp_zip)
-        except OSError as e:
-            log.warning(f"Could not remove temp backup file: {e}")
-        return True
-    except HttpError as e:
-        log.exception(f"Failed to restore from Drive: {e}")
-        return False
-    except Exception as e:
-        log.exception(f"Unexpected error during restore: {e}")
-        return False
-
-async def restore_all_dbs_from_gdrive_env(folder_id, restore_map: dict[str, str]):
-    """Restore all databases from the fixed ZIP on Google Drive."""
-    return await asyncio.to_thread(_restore_all_dbs_sync, folder_id, restore_map)
+async def _execute_returning(conn, sql, params=()):
+    """
+    Runs an INSERT/UPDATE ... RETURNING and returns its first row (or None). Executing and
+    fetching happen in one call on the connection thread; split across awaits, the statement
+    stays in progress and a concurrent commit on the shared connection fails with
+    "cannot commit transaction - SQL statements in progress".
+    """
+    rows = await conn.execute_fetchall(sql, params)
+    return rows[0] if rows else None
 
 # ===================== Database Manager =====================
 class DatabaseManager:
-    def __init__(self):
-        self._economy_conn = None
+    def __init__(self, shards=None, in_memory=None, ephemeral=False):
+        self.economy_shards = shards or ECONOMY_SHARDS
+        self.in_memory = ECONOMY_IN_MEMORY if in_memory is None else in_memory
+        # Plain ":memory:" databases, nothing read from or written to disk (tests and benchmarks)
+        self.ephemeral = ephemeral
+        self._economy_conns = [None] * self.economy_shards
+        self._memory_stores = {}  # shard index -> MemoryEconomyStore, in memory mode
         self._moderator_conn = None
         self._init_lock = asyncio.Lock()
         self._economy_lock = asyncio.Lock()
-        self._moderator_lock = asyncio.Lock()
         self.health_ok = True
         self._bot = None  # Set by bot.py during startup for DM notifications
+        self._gate = None  # Startup task (restore + init) that must finish before anyone else connects
 
     def set_bot(self, bot):
         """Called during bot startup so we can DM the owner on DB failure."""
@@ -273,27 +119,122 @@ class DatabaseManager:
         except Exception as e:
             log.error(f"Failed to DM owner about DB issue: {e}")
 
-    async def get_economy(self):
-        if not self._economy_conn:
-            async with self._init_lock:
-                if not self._economy_conn:
-                    try:
-                        self._economy_conn = await aiosqlite.connect(ECONOMY_DB_PATH)
-                        await self._economy_conn.execute("PRAGMA foreign_keys = ON")
-                    except Exception as e:
-                        self.health_ok = False
-                        msg = f"CRITICAL: Failed to connect to Economy database at {ECONOMY_DB_PATH}: {e}"
-                        log.critical(msg)
-                        await self._notify_owner(msg)
-                        raise
-        return self._economy_conn
+    def hold(self, task):
+        """
+        Makes connection requests wait for task to finish first, so the bot can log in
+        while the startup restore runs. The task itself (and anything it awaits) is let through.
+        """
+        self._gate = task
+
+    async def _wait_for_gate(self):
+        gate = self._gate
+        if gate is None or gate.done() or asyncio.current_task() is gate:
+            return
+        try:
+            await asyncio.shield(gate)
+        except Exception:
+            pass  # The gate task reports its own failure; carry on with whatever is on disk
+
+    @staticmethod
+    async def _configure(conn):
+        # Only takes effect on a brand-new file; older files are converted by the maintenance task
+        await conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        # WAL lets snapshots and readers run alongside writers; NORMAL is durable across app crashes in WAL mode
+        await conn.execute("PRAGMA journal_mode = WAL")
+        await conn.execute("PRAGMA synchronous = NORMAL")
+
+    async def checkpoint(self):
+        """
+        Folds the WAL back into the main database files and truncates it.
+        In-memory shards are written back to their files instead.
+
+        Returns:
+            dict: database name -> (busy, wal_frames, checkpointed_frames), or the
+                  MemoryEconomyStore.checkpoint report for in-memory shards
+        """
+        results = {}
+        for name, _, conn in self.open_connections():
+            store = self.memory_store_of(conn)
+            if store:
+                results[name] = await store.checkpoint()
+                continue
+            async with conn.execute("PRAGMA wal_checkpoint(TRUNCATE)") as cursor:
+                results[name] = tuple(await cursor.fetchone())
+            if results[name][0]:
+                log.warning(f"WAL checkpoint of {name} database was blocked by an open reader.")
+        return results
+
+    def open_connections(self):
+        """(name, path, connection) of every database connected so far."""
+        named = [
+            (f"economy{i}" if self.economy_shards > 1 else "economy", economy_shard_path(i, self.economy_shards), conn)
+            for i, conn in enumerate(self._economy_conns)
+        ]
+        named.append(("moderator", MODERATOR_DB_PATH, self._moderator_conn))
+        return [entry for entry in named if entry[2]]
+
+    def memory_store_of(self, conn):
+        """The MemoryEconomyStore behind a connection, or None for on-disk databases."""
+        return next((store for store in self._memory_stores.values() if store.conn is conn), None)
+
+    async def checkpoint_memory(self):
+        """Writes every in-memory economy shard back to its file."""
+        for store in self._memory_stores.values():
+            await store.checkpoint()
+
+    def memory_store_metrics(self):
+        """Journal and checkpoint figures per in-memory shard; empty in disk mode."""
+        return {f"economy{index}": store.metrics() for index, store in sorted(self._memory_stores.items())}
+
+    async def get_economy(self, user_id=None):
+        """
+        Connection of the economy shard holding user_id. Without a user_id (or unsharded) this is
+        shard 0; queries spanning every user must go through get_economy_shards instead.
+        """
+        index = shard_for(user_id, self.economy_shards) if user_id is not None else 0
+        return self._economy_conns[index] or await self._open_shard(index)
+
+    async def get_economy_shards(self):
+        """Every economy shard connection, in shard order."""
+        return [self._economy_conns[i] or await self._open_shard(i) for i in range(self.economy_shards)]
+
+    async def _open_shard(self, index):
+        await self._wait_for_gate()
+        async with self._init_lock:
+            if not self._economy_conns[index]:
+                path = economy_shard_path(index, self.economy_shards)
+                try:
+                    if self.ephemeral:
+                        conn = await aiosqlite.connect(":memory:")
+                        await conn.execute("PRAGMA foreign_keys = ON")
+                    elif self.in_memory:
+                        store = MemoryEconomyStore(path)
+                        conn = await store.open()
+                        self._memory_stores[index] = store
+                    else:
+                        conn = await aiosqlite.connect(path)
+                        await conn.execute("PRAGMA foreign_keys = ON")
+                        await self._configure(conn)
+                    self._economy_conns[index] = conn
+                except Exception as e:
+                    self.health_ok = False
+                    msg = f"CRITICAL: Failed to connect to Economy database at {path}: {e}"
+                    log.critical(msg)
+                    await self._notify_owner(msg)
+                    raise
+        return self._economy_conns[index]
 
     async def get_moderator(self):
         if not self._moderator_conn:
+            await self._wait_for_gate()
             async with self._init_lock:
                 if not self._moderator_conn:
                     try:
-                        self._moderator_conn = await aiosqlite.connect(MODERATOR_DB_PATH)
+                        if self.ephemeral:
+                            self._moderator_conn = await aiosqlite.connect(":memory:")
+                        else:
+                            self._moderator_conn = await aiosqlite.connect(MODERATOR_DB_PATH)
+                            await self._configure(self._moderator_conn)
                     except Exception as e:
                         self.health_ok = False
                         msg = f"CRITICAL: Failed to connect to Moderator database at {MODERATOR_DB_PATH}: {e}"
@@ -303,37 +244,295 @@ class DatabaseManager:
         return self._moderator_conn
 
     async def close(self):
-        if self._economy_conn:
-            await self._economy_conn.close()
+        for conn in self._economy_conns:
+            if conn:
+                await conn.close()
         if self._moderator_conn:
             await self._moderator_conn.close()
 
 db = DatabaseManager()
 
+# ===================== Schema Migrations =====================
+# Each entry is (version, [statements]), applied in order on top of the base tables
+# and tracked with PRAGMA user_version, so old .db files restored from Drive get
+# upgraded in place on the next boot.
+ECONOMY_MIGRATIONS = [
+    (1, [
+        # Timed item effects, persisted so they survive restarts and are applied in bulk
+        """
+        CREATE TABLE IF NOT EXISTS active_effects (
+            effect_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            magnitude INTEGER NOT NULL,
+            expires_at INTEGER NOT NULL,
+            next_tick INTEGER,
+            tick_interval INTEGER
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_active_effects_expiry ON active_effects(expires_at)",
+        "CREATE INDEX IF NOT EXISTS idx_active_effects_tick ON active_effects(next_tick) WHERE next_tick IS NOT NULL",
+    ]),
+    (2, [
+        # Economy aggregates kept current by triggers, so stats never scan the users table.
+        # Histogram bucket 0 holds debtors, bucket n holds balances with n decimal digits.
+        """
+        CREATE TABLE IF NOT EXISTS economy_stats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            user_count INTEGER NOT NULL DEFAULT 0,
+            positive_total INTEGER NOT NULL DEFAULT 0,
+            debt_total INTEGER NOT NULL DEFAULT 0,
+            debtor_count INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS economy_histogram (
+            bucket INTEGER PRIMARY KEY,
+            users INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        INSERT OR REPLACE INTO economy_stats (id, user_count, positive_total, debt_total, debtor_count)
+        SELECT 1, COUNT(*),
+               COALESCE(SUM(CASE WHEN balance > 0 THEN balance END), 0),
+               COALESCE(SUM(CASE WHEN balance < 0 THEN balance END), 0),
+               COUNT(CASE WHEN balance < 0 THEN 1 END)
+        FROM users
+        """,
+        "DELETE FROM economy_histogram",
+        """
+        INSERT INTO economy_histogram (bucket, users)
+        SELECT CASE WHEN balance < 0 THEN 0 ELSE length(balance) END, COUNT(*) FROM users GROUP BY 1
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_users_stats_insert AFTER INSERT ON users
+        BEGIN
+            UPDATE economy_stats SET
+                user_count = user_count + 1,
+                positive_total = positive_total + MAX(NEW.balance, 0),
+                debt_total = debt_total + MIN(NEW.balance, 0),
+                debtor_count = debtor_count + (NEW.balance < 0)
+            WHERE id = 1;
+            INSERT INTO economy_histogram (bucket, users)
+            VALUES (CASE WHEN NEW.balance < 0 THEN 0 ELSE length(NEW.balance) END, 1)
+            ON CONFLICT(bucket) DO UPDATE SET users = users + 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_users_stats_delete AFTER DELETE ON users
+        BEGIN
+            UPDATE economy_stats SET
+                user_count = user_count - 1,
+                positive_total = positive_total - MAX(OLD.balance, 0),
+                debt_total = debt_total - MIN(OLD.balance, 0),
+                debtor_count = debtor_count - (OLD.balance < 0)
+            WHERE id = 1;
+            UPDATE economy_histogram SET users = users - 1
+            WHERE bucket = CASE WHEN OLD.balance < 0 THEN 0 ELSE length(OLD.balance) END;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_users_stats_update AFTER UPDATE OF balance ON users
+        WHEN OLD.balance IS NOT NEW.balance
+        BEGIN
+            UPDATE economy_stats SET
+                positive_total = positive_total - MAX(OLD.balance, 0) + MAX(NEW.balance, 0),
+                debt_total = debt_total - MIN(OLD.balance, 0) + MIN(NEW.balance, 0),
+                debtor_count = debtor_count - (OLD.balance < 0) + (NEW.balance < 0)
+            WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_users_histogram_update AFTER UPDATE OF balance ON users
+        WHEN (CASE WHEN OLD.balance < 0 THEN 0 ELSE length(OLD.balance) END)
+          != (CASE WHEN NEW.balance < 0 THEN 0 ELSE length(NEW.balance) END)
+        BEGIN
+            UPDATE economy_histogram SET users = users - 1
+            WHERE bucket = CASE WHEN OLD.balance < 0 THEN 0 ELSE length(OLD.balance) END;
+            INSERT INTO economy_histogram (bucket, users)
+            VALUES (CASE WHEN NEW.balance < 0 THEN 0 ELSE length(NEW.balance) END, 1)
+            ON CONFLICT(bucket) DO UPDATE SET users = users + 1;
+        END
+        """,
+    ]),
+    (3, [
+        # Leaderboard order (balance DESC, user_id DESC) is a reverse scan of this index
+        "CREATE INDEX IF NOT EXISTS idx_users_balance ON users(balance)",
+    ]),
+    (4, [
+        # Two-phase transfers between shards: the debit side records its intent in
+        # pending_transfers, the credit side remembers what it applied so replays are no-ops
+        """
+        CREATE TABLE IF NOT EXISTS pending_transfers (
+            transfer_id TEXT PRIMARY KEY,
+            from_user INTEGER NOT NULL,
+            to_user INTEGER NOT NULL,
+            amount INTEGER NOT NULL,
+            created_at INTEGER NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS applied_transfers (
+            transfer_id TEXT PRIMARY KEY,
+            applied_at INTEGER NOT NULL
+        )
+        """,
+    ]),
+    (5, [
+        # Timed robbery modifiers live on the user row; writing them into every user_items row
+        # multiplied them by the number of items and broke the revert on expiry
+        "ALTER TABLE users ADD COLUMN robbery_modifier INTEGER NOT NULL DEFAULT 0",
+        """
+        UPDATE users SET robbery_modifier = MAX(MIN(m.value, 100), -100)
+        FROM (
+            SELECT user_id, CASE WHEN MAX(effect_modifier) > 0 THEN MAX(effect_modifier) ELSE MIN(effect_modifier) END AS value
+            FROM user_items GROUP BY user_id
+        ) AS m
+        WHERE users.user_id = m.user_id
+        """,
+        "UPDATE user_items SET effect_modifier = 0 WHERE effect_modifier != 0",
+    ]),
+    (6, [
+        # Append-only audit trail of balance changes. delta is what was asked for, balance is
+        # where the user ended up (the debt floor can absorb part of a loss).
+        """
+        CREATE TABLE IF NOT EXISTS ledger (
+            entry_id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            delta INTEGER NOT NULL,
+            balance INTEGER,
+            reason TEXT NOT NULL,
+            command TEXT,
+            ts INTEGER NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_ledger_user_ts ON ledger(user_id, ts)",
+        "CREATE INDEX IF NOT EXISTS idx_ledger_ts ON ledger(ts)",
+        # Entries older than the retention window are rolled up here, one row per user and day
+        """
+        CREATE TABLE IF NOT EXISTS ledger_daily (
+            user_id INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            net INTEGER NOT NULL,
+            entries INTEGER NOT NULL,
+            closing_balance INTEGER,
+            PRIMARY KEY (user_id, day)
+        ) WITHOUT ROWID
+        """,
+    ]),
+]
+
+MODERATOR_MIGRATIONS = [
+    (1, [
+        # Per-guild case counter, bumped by trigger so allocation is a single PK lookup
+        """
+        CREATE TABLE IF NOT EXISTS case_counters (
+            guild_id INTEGER PRIMARY KEY,
+            last_case_number INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        INSERT OR IGNORE INTO case_counters (guild_id, last_case_number)
+        SELECT guild_id, MAX(case_number) FROM cases GROUP BY guild_id
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_cases_counter AFTER INSERT ON cases
+        BEGIN
+            INSERT INTO case_counters (guild_id, last_case_number)
+            VALUES (NEW.guild_id, NEW.case_number)
+            ON CONFLICT(guild_id) DO UPDATE
+            SET last_case_number = MAX(last_case_number, excluded.last_case_number);
+        END
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_cases_guild_user ON cases(guild_id, user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_cases_expiry ON cases(action_type, expiry) WHERE expiry > 0",
+    ]),
+    (2, [
+        # Lets the expiry scheduler lift each timed sanction exactly once
+        "ALTER TABLE cases ADD COLUMN resolved INTEGER NOT NULL DEFAULT 0",
+        """
+        CREATE INDEX IF NOT EXISTS idx_cases_pending_expiry ON cases(action_type, expiry)
+        WHERE expiry > 0 AND resolved = 0
+        """,
+    ]),
+    (3, [
+        # Full-text index over reasons and usernames. External content: the text lives
+        # only in cases, the triggers keep the index in step with it.
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS cases_fts USING fts5(
+            reason, username,
+            content = 'cases', content_rowid = 'case_id',
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+        """,
+        "INSERT INTO cases_fts(cases_fts) VALUES ('rebuild')",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_cases_fts_insert AFTER INSERT ON cases BEGIN
+            INSERT INTO cases_fts(rowid, reason, username) VALUES (NEW.case_id, NEW.reason, NEW.username);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_cases_fts_delete AFTER DELETE ON cases BEGIN
+            INSERT INTO cases_fts(cases_fts, rowid, reason, username) VALUES ('delete', OLD.case_id, OLD.reason, OLD.username);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_cases_fts_update AFTER UPDATE OF reason, username ON cases BEGIN
+            INSERT INTO cases_fts(cases_fts, rowid, reason, username) VALUES ('delete', OLD.case_id, OLD.reason, OLD.username);
+            INSERT INTO cases_fts(rowid, reason, username) VALUES (NEW.case_id, NEW.reason, NEW.username);
+        END
+        """,
+    ]),
+]
+
+async def apply_migrations(conn, migrations, label):
+    """Applies any migrations newer than the database's PRAGMA user_version."""
+    async with conn.execute("PRAGMA user_version") as cursor:
+        current = (await cursor.fetchone())[0]
+    for version, statements in migrations:
+        if version <= current:
+            continue
+        try:
+            await conn.execute("BEGIN")
+            for statement in statements:
+                await conn.execute(statement)
+            await conn.execute(f"PRAGMA user_version = {int(version)}")
+            await conn.commit()
+        except Exception as e:
+            await conn.rollback()
+            log.critical(f"{label} database migration to v{version} failed: {e}")
+            raise
+        log.database(f"{label} database migrated to schema v{version}")
+
 # ===================== Init =====================
+async def _init_economy_schema(conn):
+    """Creates the economy tables on one shard and brings it up to date."""
+    await conn.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INTEGER PRIMARY KEY,
+        username TEXT NOT NULL,
+        balance INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    await conn.execute("""
+    CREATE TABLE IF NOT EXISTS user_items (
+        user_id INTEGER,
+        item_id TEXT,
+        item_name TEXT NOT NULL,
+        uses_left INTEGER DEFAULT 0,
+        effect_modifier INTEGER DEFAULT 0,
+        PRIMARY KEY (user_id, item_id)
+    )
+    """)
+    await conn.commit()
+    await apply_migrations(conn, ECONOMY_MIGRATIONS, "Economy")
+
 async def init_databases():
     """Initialize database tables using aiosqlite"""
     try:
-        conn = await db.get_economy()
-        await conn.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            user_id INTEGER PRIMARY KEY,
-            username TEXT NOT NULL,
-            balance INTEGER NOT NULL DEFAULT 0
-        )
-        """)
-        await conn.execute("""
-        CREATE TABLE IF NOT EXISTS user_items (
-            user_id INTEGER,
-            item_id TEXT,
-            item_name TEXT NOT NULL,
-            uses_left INTEGER DEFAULT 0,
-            effect_modifier INTEGER DEFAULT 0,
-            PRIMARY KEY (user_id, item_id)
-        )
-        """)
-        await conn.commit()
-        log.database("Economy database initialized successfully")
+        for conn in await db.get_economy_shards():
+            await _init_economy_schema(conn)
+        log.database(f"Economy database initialized successfully ({db.economy_shards} shard(s))")
 
         mod_conn = await db.get_moderator()
         await mod_conn.execute("""
@@ -355,7 +554,9 @@ async def init_databases():
         CREATE INDEX IF NOT EXISTS idx_cases_guild_id ON cases(guild_id)
         """)
         await mod_conn.commit()
+        await apply_migrations(mod_conn, MODERATOR_MIGRATIONS, "Moderator")
         log.database("Moderator database initialized successfully")
+        await recover_pending_transfers()
         log.success("Databases initialized successfully")
     except Exception as e:
         log.critical(f"Failed while initializing databases: {e}")
@@ -374,45 +575,399 @@ async def modify_robber_multiplier(user_id, change, duration=None):
     """
     current_modifier = await get_robbery_modifier(user_id)
     new_modifier = max(min(current_modifier + change, 100), -100)
-    conn = await db.get_economy()
-    await conn.execute("UPDATE user_items SET effect_modifier = ? WHERE user_id = ?",
-                      (new_modifier, user_id))
+    conn = await db.get_economy(user_id)
+    await conn.execute("UPDATE users SET robbery_modifier = robbery_modifier + ? WHERE user_id = ?",
+                      (new_modifier - current_modifier, user_id))
     await conn.commit()
     log.trace(f"Updated robbery modifier for {user_id}: {new_modifier}%")
     if duration:
-        asyncio.create_task(schedule_effect_decay(user_id, current_modifier, duration))
+        # Revert exactly what was applied (after clamping) once the effect expires
+        await add_active_effect(user_id, "robbery_modifier", new_modifier - current_modifier, duration)
 
 @log_db_call
 async def get_robbery_modifier(user_id):
-    """Gets the total robbery modifier for a user (from items)."""
-    conn = await db.get_economy()
-    async with conn.execute("SELECT SUM(effect_modifier) FROM user_items WHERE user_id = ?", (user_id,)) as cursor:
-        result = await cursor.fetchone()
-        return result[0] if result and result[0] else 0
+    """Gets the total robbery modifier for a user (timed effects plus items)."""
+    conn = await db.get_economy(user_id)
+    rows = await conn.execute_fetchall("""
+        SELECT COALESCE((SELECT robbery_modifier FROM users WHERE user_id = ?), 0)
+             + COALESCE((SELECT SUM(effect_modifier) FROM user_items WHERE user_id = ?), 0)
+    """, (user_id, user_id))
+    return max(min(rows[0][0], 100), -100) if rows and rows[0][0] else 0
+
+# ===================== Timed Effects =====================
+EFFECTS_MAX_SLEEP = 3600  # re-check at least hourly even with nothing scheduled
+_effects_wakeup = asyncio.Event()
+
+@log_db_call
+async def add_active_effect(user_id, kind, magnitude, duration, interval=None):
+    """
+    Persists a timed effect for the effects scheduler.
+
+    Args:
+        user_id (int): The user's ID
+        kind (str): "robbery_modifier" (reverted on expiry) or "drain" (percent of balance per tick)
+        magnitude (int): Modifier delta, or drain percent
+        duration (int): Seconds until the effect expires
+        interval (int): Optional tick interval in seconds for recurring effects
+    """
+    now = int(time.time())
+    next_tick = now + interval if interval else None
+    conn = await db.get_economy(user_id)
+    await conn.execute("""
+        INSERT INTO active_effects (user_id, kind, magnitude, expires_at, next_tick, tick_interval)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (user_id, kind, magnitude, now + duration, next_tick, interval))
+    await conn.commit()
+    _effects_wakeup.set()
 
 @log_db_call
-async def schedule_effect_decay(user_id, original_value, duration):
-    """Waits for the effect duration to expire and then reverts the modifier."""
-    await asyncio.sleep(duration)
-    conn = await db.get_economy()
-    await conn.execute("UPDATE user_items SET effect_modifier = ? WHERE user_id = ?",
-                      (original_value, user_id))
+async def get_active_effects(user_id):
+    """Fetches a user's pending timed effects."""
+    conn = await db.get_economy(user_id)
+    async with conn.execute("""
+        SELECT kind, magnitude, expires_at FROM active_effects WHERE user_id = ? ORDER BY expires_at
+    """, (user_id,)) as cursor:
+        rows = await cursor.fetchall()
+        return [{"kind": row[0], "magnitude": row[1], "expires_at": row[2]} for row in rows]
+
+# Do not log, runs from the scheduler loop
+async def process_due_effects(now=None):
+    """
+    Applies every due effect tick and expiry as set-based UPDATEs across all users.
+
+    Returns:
+        int | None: Timestamp of the next pending tick/expiry, or None if nothing is scheduled.
+    """
+    if now is None:
+        now = int(time.time())
+    next_due = None
+    for conn in await db.get_economy_shards():
+        due = await _process_due_effects_shard(conn, now)
+        if due is not None and (next_due is None or due < next_due):
+            next_due = due
+    return next_due
+
+async def _process_due_effects_shard(conn, now):
+    # Recurring drains: one pass per missed tick, never ticking past the effect's expiry
+    while True:
+        # Ledger rows first, from the same balances the UPDATE below is about to drain
+        await conn.execute("""
+            INSERT INTO ledger (user_id, delta, balance, reason, ts)
+            SELECT users.user_id, -MAX(balance * d.pct / 100, 1), balance - MAX(balance * d.pct / 100, 1), 'financial drain', ?
+            FROM users JOIN (
+                SELECT user_id, SUM(magnitude) AS pct FROM active_effects
+                WHERE kind = 'drain' AND next_tick <= ? AND next_tick <= expires_at
+                GROUP BY user_id
+            ) AS d ON users.user_id = d.user_id
+            WHERE users.balance > 0
+        """, (now, now))
+        drained = await conn.execute_fetchall("""
+            UPDATE users
+            SET balance = balance - MAX(balance * d.pct / 100, 1)
+            FROM (
+                SELECT user_id, SUM(magnitude) AS pct FROM active_effects
+                WHERE kind = 'drain' AND next_tick <= ? AND next_tick <= expires_at
+                GROUP BY user_id
+            ) AS d
+            WHERE users.user_id = d.user_id AND users.balance > 0
+            RETURNING users.user_id, users.balance
+        """, (now,))
+        for user_id, balance in drained:
+            leaderboard_cache.note_write(user_id, balance)
+        async with conn.execute("""
+            UPDATE active_effects SET next_tick = next_tick + tick_interval
+            WHERE kind = 'drain' AND next_tick <= ? AND next_tick <= expires_at
+        """, (now,)) as cursor:
+            ticked = cursor.rowcount
+        if drained:
+            log.trace(f"Financial Drain ticked for {len(drained)} user(s)")
+        if not ticked:
+            break
+
+    # Expired robbery modifiers: take back exactly the delta each one applied
+    await conn.execute("""
+        UPDATE users
+        SET robbery_modifier = robbery_modifier - e.delta
+        FROM (
+            SELECT user_id, SUM(magnitude) AS delta FROM active_effects
+            WHERE kind = 'robbery_modifier' AND expires_at <= ?
+            GROUP BY user_id
+        ) AS e
+        WHERE users.user_id = e.user_id
+    """, (now,))
+    async with conn.execute("DELETE FROM active_effects WHERE expires_at <= ?", (now,)) as cursor:
+        expired = cursor.rowcount
     await conn.commit()
-    log.trace(f"Restored robbery modifier for {user_id} to {original_value}%")
+    if expired:
+        log.trace(f"Expired {expired} timed effect(s)")
+
+    async with conn.execute("""
+        SELECT MIN(due) FROM (
+            SELECT MIN(expires_at) AS due FROM active_effects
+            UNION ALL
+            SELECT MIN(next_tick) FROM active_effects WHERE next_tick IS NOT NULL AND next_tick <= expires_at
+        )
+    """) as cursor:
+        row = await cursor.fetchone()
+    return row[0] if row else None
+
+async def run_effects_scheduler():
+    """Single loop driving every timed effect; sleeps until the next tick or expiry."""
+    log.info("Started effects scheduler")
+    while True:
+        _effects_wakeup.clear()
+        try:
+            next_due = await process_due_effects()
+            delay = EFFECTS_MAX_SLEEP if next_due is None else max(0, next_due - time.time())
+        except Exception as e:
+            log.error(f"Effects scheduler pass failed: {e}")
+            delay = 60
+        try:
+            await asyncio.wait_for(_effects_wakeup.wait(), timeout=min(delay, EFFECTS_MAX_SLEEP))
+        except asyncio.TimeoutError:
+            pass
+
+# ===================== Ledger =====================
+LEDGER_BATCH_SIZE = 200          # buffered entries that trigger a write
+LEDGER_FLUSH_INTERVAL = 5        # seconds a buffered entry waits at most
+LEDGER_RETENTION_DAYS = 30       # raw entries kept before being rolled into ledger_daily
+LEDGER_COMPACT_INTERVAL = 3600   # seconds between compaction passes
+
+# Slash command behind the current task's balance writes, set by the global interaction check
+ledger_command = contextvars.ContextVar("ledger_command", default=None)
+
+class LedgerBuffer:
+    """
+    Collects ledger entries in memory and writes them in batches, one executemany per shard,
+    so the audit trail adds no statement or commit to a balance update.
+    """
+
+    def __init__(self, batch_size=LEDGER_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._pending = []
+        self._lock = asyncio.Lock()
+        self._flush_task = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def record(self, user_id, delta, balance, reason, command=None):
+        """
+        Queues one entry; a full batch is written by a background flush. Never raises for the
+        write, which callers make after their balance update has already been committed.
+        """
+        self._pending.append((user_id, delta, balance, reason, command or ledger_command.get(), int(time.time())))
+        if len(self._pending) >= self.batch_size and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self._flush_in_background())
+
+    async def _flush_in_background(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            # The entries went back to the queue; the ledger_flush job retries them
+            log.error(f"Ledger batch flush failed, {len(self._pending)} entries kept for retry: {e}")
+
+    async def flush(self):
+        """Writes every queued entry. Returns how many were written."""
+        async with self._lock:
+            entries, self._pending = self._pending, []
+            if not entries:
+                return 0
+            by_shard = {}
+            for entry in entries:
+                by_shard.setdefault(shard_for(entry[0], db.economy_shards), []).append(entry)
+            for index, rows in list(by_shard.items()):
+                try:
+                    conn = await db.get_economy(rows[0][0])
+                    await conn.executemany("""
+                        INSERT INTO ledger (user_id, delta, balance, reason, command, ts) VALUES (?, ?, ?, ?, ?, ?)
+                    """, rows)
+                    await conn.commit()
+                except Exception:
+                    # Shards already written keep their rows; the rest is retried on the next flush
+                    self._pending[:0] = [row for rows in by_shard.values() for row in rows]
+                    raise
+                del by_shard[index]
+        return len(entries)
+
+ledger = LedgerBuffer()
+
+async def flush_ledger():
+    """Writes buffered ledger entries; run by the ledger_flush job and before shutdown snapshots."""
+    return await ledger.flush()
+
+async def compact_ledger(now=None, retention_days=None):
+    """
+    Rolls ledger entries older than the retention window (whole UTC days) into ledger_daily
+    and deletes them. Returns how many entries were compacted.
+    """
+    if now is None:
+        now = int(time.time())
+    if retention_days is None:
+        retention_days = LEDGER_RETENTION_DAYS
+    cutoff = (now // 86400 - retention_days) * 86400
+    compacted = 0
+    for conn in await db.get_economy_shards():
+        # MAX(entry_id) makes the bare closing_balance column come from each day's last entry
+        await conn.execute("""
+            INSERT INTO ledger_daily (user_id, day, net, entries, closing_balance)
+            SELECT user_id, day, net, entries, closing_balance FROM (
+                SELECT user_id, ts / 86400 AS day, SUM(delta) AS net, COUNT(*) AS entries,
+                       balance AS closing_balance, MAX(entry_id)
+                FROM ledger WHERE ts < ?
+                GROUP BY user_id, ts / 86400
+            ) WHERE true
+            ON CONFLICT(user_id, day) DO UPDATE SET
+                net = net + excluded.net,
+                entries = entries + excluded.entries,
+                closing_balance = excluded.closing_balance
+        """, (cutoff,))
+        async with conn.execute("DELETE FROM ledger WHERE ts < ?", (cutoff,)) as cursor:
+            compacted += cursor.rowcount
+        await conn.commit()
+    if compacted:
+        log.database(f"Compacted {compacted} ledger entries into daily summaries")
+    return compacted
+
+@log_db_call
+async def get_ledger_entries(user_id, limit=25, since=None, until=None, before=None):
+    """
+    Gets a user's ledger entries, newest first, from the (user_id, ts) index.
+
+    Args:
+        user_id (int): The user's ID
+        limit (int): Entries per page
+        since (int): Optional lower bound on ts (inclusive)
+        until (int): Optional upper bound on ts (exclusive)
+        before (tuple): Optional (ts, entry_id) of the last entry of the previous page (keyset cursor)
+
+    Returns:
+        list[tuple]: (entry_id, delta, balance, reason, command, ts) rows
+    """
+    await ledger.flush()
+    where, params = ["user_id = ?"], [user_id]
+    if since is not None:
+        where.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        where.append("ts < ?")
+        params.append(until)
+    if before is not None:
+        where.append("(ts, entry_id) < (?, ?)")
+        params.extend(before)
+    conn = await db.get_economy(user_id)
+    async with conn.execute(f"""
+        SELECT entry_id, delta, balance, reason, command, ts FROM ledger
+        WHERE {' AND '.join(where)}
+        ORDER BY ts DESC, entry_id DESC
+        LIMIT ?
+    """, (*params, limit)) as cursor:
+        return await cursor.fetchall()
+
+@log_db_call
+async def get_ledger_daily(user_id, limit=30):
+    """
+    Gets a user's compacted daily summaries, most recent day first.
+
+    Returns:
+        list[tuple]: (day_start_ts, net, entries, closing_balance) rows
+    """
+    conn = await db.get_economy(user_id)
+    async with conn.execute("""
+        SELECT day * 86400, net, entries, closing_balance FROM ledger_daily
+        WHERE user_id = ? ORDER BY day DESC LIMIT ?
+    """, (user_id, limit)) as cursor:
+        return await cursor.fetchall()
+
+# ===================== User Locks =====================
+ECONOMY_LOCK_STRIPES = 256  # fixed lock pool; users hash onto it, so memory does not grow with the user count
+
+class UserLocks:
+    """
+    Striped async locks serializing read-decide-write sequences per user.
+
+    A user hashes onto one of a fixed number of stripes, so two users occasionally share a lock
+    but memory stays bounded. Multi-user holds take their stripes in ascending order, which
+    rules out deadlocks between them. A task already holding a stripe passes through it again,
+    so a command can hold its users while calling transfer_balance, which holds them too.
+    Nested holds must not add users the outer hold did not cover, and work handed to another
+    task (create_task, wait_for) does not inherit the hold.
+
+    Keep holds short: no Discord calls or sleeps inside, everyone on the stripe waits for them.
+
+    Usage:
+        async with economy_locks.hold(robber_id, victim_id):
+            ...
+    """
+
+    def __init__(self, stripes: int = ECONOMY_LOCK_STRIPES):
+        self._locks = [asyncio.Lock() for _ in range(stripes)]
+        self._owners = [None] * stripes
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def stripe(self, user_id) -> int:
+        # Fibonacci hashing: snowflakes share their low bits, so spread them before the modulo
+        return ((int(user_id) * 0x9E3779B97F4A7C15) >> 32) % len(self._locks)
+
+    @contextlib.asynccontextmanager
+    async def hold(self, *user_ids):
+        task = asyncio.current_task()
+        taken = []
+        started = time.perf_counter()
+        waited = False
+        try:
+            for index in sorted({self.stripe(user_id) for user_id in user_ids}):
+                if self._owners[index] is task:
+                    continue
+                lock = self._locks[index]
+                waited = waited or lock.locked()
+                await lock.acquire()
+                self._owners[index] = task
+                taken.append(index)
+            if taken:
+                wait = time.perf_counter() - started
+                self.acquisitions += 1
+                self.contended += waited
+                self.wait_total += wait
+                self.wait_max = max(self.wait_max, wait)
+            yield
+        finally:
+            for index in reversed(taken):
+                self._owners[index] = None
+                self._locks[index].release()
+
+    def metrics(self) -> dict:
+        return {
+            "stripes": len(self._locks),
+            "held": sum(lock.locked() for lock in self._locks),
+            "acquisitions": self.acquisitions,
+            "contended": self.contended,
+            "wait_avg_ms": round(self.wait_total * 1000 / self.acquisitions, 3) if self.acquisitions else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
+economy_locks = UserLocks()
 
 # ===================== Economy Functions =====================
 @log_db_call
-async def update_balance(user_id, amount):
+async def update_balance(user_id, amount, reason="adjustment"):
     """
     Updates user balance, clamped to DEBT_FLOOR.
 
     Args:
         user_id (int): The user's ID
         amount (int): The amount to add (or subtract if negative)
+        reason (str): Why the balance changed, kept in the ledger
+
+    Returns:
+        int | None: The new balance, or None if the user has no account
     """
     log.trace(f"Updating balance for {user_id}: {amount} coins")
-    conn = await db.get_economy()
-    await conn.execute("""
+    conn = await db.get_economy(user_id)
+    row = await _execute_returning(conn, """
         UPDATE users
         SET balance = CASE
             WHEN balance + ? < ?
@@ -420,69 +975,384 @@ async def update_balance(user_id, amount):
             ELSE balance + ?
         END
         WHERE user_id = ?
+        RETURNING balance
     """, (amount, DEBT_FLOOR, DEBT_FLOOR, amount, user_id))
     await conn.commit()
+    if row:
+        leaderboard_cache.note_write(user_id, row[0])
+        ledger.record(user_id, amount, row[0], reason)
+    return row[0] if row else None
 
 @log_db_call
-async def atomic_deduct(user_id, amount):
+async def atomic_deduct(user_id, amount, reason="deduct"):
     """
     Atomically deducts a positive amount from user's balance.
     Fails (returns False) if their balance is below 0 or if removing it would put them in debt (below 0).
     Allows running gambling commands concurrently without race conditions over funds.
     """
-    conn = await db.get_economy()
-    # Check current balance first to guarantee we only deduct if strictly positive balance >= amount
-    async with conn.execute("SELECT balance FROM users WHERE user_id = ?", (user_id,)) as cursor:
-        result = await cursor.fetchone()
-        if not result or result[0] < amount:
+    conn = await db.get_economy(user_id)
+    # One conditional UPDATE: 'balance >= amount' both checks the funds and ensures no debt caused
+    row = await _execute_returning(
+        conn, "UPDATE users SET balance = balance - ? WHERE user_id = ? AND balance >= ? RETURNING balance",
+        (amount, user_id, amount)
+    )
+    await conn.commit()
+    if not row:
+        return False
+    leaderboard_cache.note_write(user_id, row[0])
+    ledger.record(user_id, -amount, row[0], reason)
+    return True
+
+# ===================== Transfers =====================
+TRANSFER_APPLIED_RETENTION = 86400  # seconds applied transfer ids are remembered for replay protection
+
+@log_db_call
+async def transfer_balance(from_user, to_user, amount, reason="transfer"):
+    """
+    Moves a positive amount between two users. Fails (returns False) if the sender can't cover it.
+    Both users must already exist (add_user). Each side gets a ledger entry naming the other.
+
+    Same shard: one transaction. Across shards: the debit and a pending_transfers record are
+    committed together on the sender's shard, then the credit is applied exactly once on the
+    receiver's shard (recorded in applied_transfers), then the pending record is dropped.
+    A crash in between is finished by recover_pending_transfers on the next boot.
+    """
+    if amount <= 0:
+        return False
+    async with economy_locks.hold(from_user, to_user):
+        return await _transfer_balance(from_user, to_user, amount, reason)
+
+async def _transfer_balance(from_user, to_user, amount, reason):
+    src = await db.get_economy(from_user)
+    dst = await db.get_economy(to_user)
+
+    # Ledger entries are queued only once both sides are committed, so nothing can commit half a transfer
+    if src is dst:
+        # Debit and credit in one statement: both rows change or neither does (short on funds,
+        # or no account to credit). A rollback would also undo other coroutines' pending
+        # statements on the shared connection.
+        rows = await src.execute_fetchall("""
+            UPDATE users
+            SET balance = balance
+                - CASE WHEN user_id = ? THEN ? ELSE 0 END
+                + CASE WHEN user_id = ? THEN ? ELSE 0 END
+            WHERE user_id IN (?, ?)
+              AND (SELECT balance FROM users WHERE user_id = ?) >= ?
+              AND EXISTS (SELECT 1 FROM users WHERE user_id = ?)
+            RETURNING user_id, balance
+        """, (from_user, amount, to_user, amount, from_user, to_user, from_user, amount, to_user))
+        await src.commit()
+        if not rows:
+            return False
+        balances = dict(rows)
+        debited, credited = (balances[from_user],), (balances[to_user],)
+    else:
+        async with dst.execute("SELECT 1 FROM users WHERE user_id = ?", (to_user,)) as cursor:
+            if await cursor.fetchone() is None:
+                return False
+        debited = await _execute_returning(
+            src, "UPDATE users SET balance = balance - ? WHERE user_id = ? AND balance >= ? RETURNING balance",
+            (amount, from_user, amount)
+        )
+        if not debited:
+            await src.commit()
+            return False
+        transfer_id = uuid.uuid4().hex
+        await src.execute("""
+            INSERT INTO pending_transfers (transfer_id, from_user, to_user, amount, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (transfer_id, from_user, to_user, amount, int(time.time())))
+        await src.commit()
+        credited = await _apply_transfer(dst, transfer_id, to_user, amount)
+        if credited is None:
+            # The recipient's account went away between the check and the credit
+            await _refund_transfer(src, transfer_id, from_user, amount)
             return False
+        await src.execute("DELETE FROM pending_transfers WHERE transfer_id = ?", (transfer_id,))
+        await src.commit()
+
+    leaderboard_cache.note_write(from_user, debited[0])
+    ledger.record(from_user, -amount, debited[0], f"{reason} to {to_user}")
+    if credited:
+        leaderboard_cache.note_write(to_user, credited[0])
+        ledger.record(to_user, amount, credited[0], f"{reason} from {from_user}")
+    return True
 
-    # Perform atomic update. 'balance >= amount' ensures no debt caused.
-    async with conn.execute(
-        "UPDATE users SET balance = balance - ? WHERE user_id = ? AND balance >= ?",
-        (amount, user_id, amount)
-    ) as cursor:
+async def _apply_transfer(conn, transfer_id, to_user, amount):
+    """
+    Credits one transfer on the receiving shard; a replay of the same transfer_id does nothing.
+
+    Returns:
+        tuple | None: the (balance,) row after the credit, () if the transfer was already
+        applied, or None if the recipient has no account (nothing is written)
+    """
+    # The id is only remembered when there is an account to credit
+    async with conn.execute("""
+        INSERT OR IGNORE INTO applied_transfers (transfer_id, applied_at)
+        SELECT ?, ? WHERE EXISTS (SELECT 1 FROM users WHERE user_id = ?)
+    """, (transfer_id, int(time.time()), to_user)) as cursor:
+        fresh = cursor.rowcount > 0
+    if not fresh:
         await conn.commit()
-        return cursor.rowcount > 0
+        async with conn.execute("SELECT 1 FROM applied_transfers WHERE transfer_id = ?", (transfer_id,)) as cursor:
+            return () if await cursor.fetchone() else None
+    credited = await _execute_returning(
+        conn, "UPDATE users SET balance = balance + ? WHERE user_id = ? RETURNING balance", (amount, to_user)
+    )
+    await conn.commit()
+    return credited
+
+async def _refund_transfer(conn, transfer_id, from_user, amount):
+    """Gives a pending transfer back to its sender and drops it, in one commit."""
+    refunded = await _execute_returning(
+        conn, "UPDATE users SET balance = balance + ? WHERE user_id = ? RETURNING balance", (amount, from_user)
+    )
+    await conn.execute("DELETE FROM pending_transfers WHERE transfer_id = ?", (transfer_id,))
+    await conn.commit()
+    if refunded:
+        leaderboard_cache.note_write(from_user, refunded[0])
+    log.warning(f"Refunded transfer {transfer_id} of {amount} coins to {from_user}: the recipient has no account")
+
+async def recover_pending_transfers():
+    """Finishes cross-shard transfers interrupted between their debit and credit. Returns how many."""
+    recovered = 0
+    shards = await db.get_economy_shards()
+    for conn in shards:
+        async with conn.execute("SELECT transfer_id, from_user, to_user, amount FROM pending_transfers") as cursor:
+            pending = await cursor.fetchall()
+        for transfer_id, from_user, to_user, amount in pending:
+            credited = await _apply_transfer(await db.get_economy(to_user), transfer_id, to_user, amount)
+            if credited is None:
+                await _refund_transfer(conn, transfer_id, from_user, amount)
+                continue
+            await conn.execute("DELETE FROM pending_transfers WHERE transfer_id = ?", (transfer_id,))
+            await conn.commit()
+            if credited:
+                leaderboard_cache.note_write(to_user, credited[0])
+                ledger.record(to_user, amount, credited[0], f"recovered transfer from {from_user}")
+            recovered += 1
+    # Only forget applied ids once no shard can still hold a pending record for them
+    for conn in shards:
+        await conn.execute(
+            "DELETE FROM applied_transfers WHERE applied_at < ?",
+            (int(time.time()) - TRANSFER_APPLIED_RETENTION,)
+        )
+        await conn.commit()
+    if recovered:
+        log.warning(f"Recovered {recovered} interrupted transfer(s)")
+    return recovered
 
 @log_db_call
 async def get_balance(user_id):
     """Fetches user balance."""
     log.trace(f"Getting balance for {user_id}")
-    conn = await db.get_economy()
-    async with conn.execute("SELECT balance FROM users WHERE user_id = ?", (user_id,)) as cursor:
-        result = await cursor.fetchone()
-        return result[0] if result else 0
+    conn = await db.get_economy(user_id)
+    rows = await conn.execute_fetchall("SELECT balance FROM users WHERE user_id = ?", (user_id,))
+    return rows[0][0] if rows else 0
 
 @log_db_call
 async def add_user(user_id, username):
-    """Adds a user to the economy database if they don't exist."""
+    """
+    Adds a user to the economy database if they don't exist.
+
+    Returns:
+        bool: True if the account was created, False if it already existed
+    """
     log.trace(f"Adding user {user_id} in economy database, {username}")
-    conn = await db.get_economy()
-    async with conn.execute("SELECT 1 FROM users WHERE user_id = ?", (user_id,)) as cursor:
-        exists = await cursor.fetchone()
-    if exists:
-        return
-    await conn.execute(
-        "INSERT INTO users (user_id, username, balance) VALUES (?, ?, 0)",
-        (user_id, username)
-    )
+    conn = await db.get_economy(user_id)
+    created = await _execute_returning(conn, """
+        INSERT INTO users (user_id, username, balance) VALUES (?, ?, 0)
+        ON CONFLICT(user_id) DO NOTHING
+        RETURNING balance
+    """, (user_id, username))
     await conn.commit()
+    if created:
+        leaderboard_cache.note_write(user_id, 0)
+    return created is not None
 
 @log_db_call
 async def get_total_economy_sum():
-    """Calculates the sum of all non-negative user balances in the economy."""
-    conn = await db.get_economy()
-    async with conn.execute("SELECT SUM(balance) FROM users WHERE balance > 0") as cursor:
-        result = await cursor.fetchone()
-        return result[0] if result and result[0] else 0
+    """Returns the sum of all non-negative user balances in the economy (trigger-maintained, O(1))."""
+    total = 0
+    for conn in await db.get_economy_shards():
+        async with conn.execute("SELECT positive_total FROM economy_stats WHERE id = 1") as cursor:
+            result = await cursor.fetchone()
+            total += result[0] if result and result[0] else 0
+    return total
+
+@log_db_call
+async def get_economy_stats():
+    """
+    Returns the trigger-maintained economy aggregates.
+
+    Returns:
+        dict: user_count, positive_total, debt_total, debtor_count and a histogram
+              mapping bucket -> users (0 = in debt, n = balances with n digits).
+    """
+    row = [0, 0, 0, 0]
+    histogram = {}
+    for conn in await db.get_economy_shards():
+        async with conn.execute("""
+            SELECT user_count, positive_total, debt_total, debtor_count FROM economy_stats WHERE id = 1
+        """) as cursor:
+            shard_row = await cursor.fetchone() or (0, 0, 0, 0)
+        row = [total + value for total, value in zip(row, shard_row)]
+        async with conn.execute("SELECT bucket, users FROM economy_histogram WHERE users > 0") as cursor:
+            for bucket, users in await cursor.fetchall():
+                histogram[bucket] = histogram.get(bucket, 0) + users
+    histogram = dict(sorted(histogram.items()))
+    return {
+        "user_count": row[0],
+        "positive_total": row[1],
+        "debt_total": row[2],
+        "debtor_count": row[3],
+        "histogram": histogram,
+    }
+
+@log_db_call
+async def get_balance_column():
+    """
+    Every balance across all shards as one flat column, for vectorized analytics.
+
+    Returns:
+        array.array: signed 64-bit balances ('q'), usable without copying via numpy.frombuffer
+    """
+    column = array.array("q")
+    for conn in await db.get_economy_shards():
+        column.extend(row[0] for row in await conn.execute_fetchall("SELECT balance FROM users"))
+    return column
+
+# ===================== Leaderboard =====================
+LEADERBOARD_CACHE_SIZE = 100  # rows kept in the cached top-N
+LEADERBOARD_CACHE_TTL = 30    # seconds
+LEADERBOARD_IN_QUERY_MAX = 900  # member ids per IN (...) lookup, under SQLite's bound parameter limit
+
+class LeaderboardCache:
+    """Caches the global top-N. Dropped on TTL or when a cached user's balance changes."""
+
+    def __init__(self, size=LEADERBOARD_CACHE_SIZE, ttl=LEADERBOARD_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._rows = None
+        self._user_ids = frozenset()
+        self._floor = None
+        self._expires = 0.0
+
+    def get(self):
+        if self._rows is not None and time.monotonic() < self._expires:
+            return self._rows
+        return None
+
+    def store(self, rows):
+        self._rows = rows
+        self._user_ids = frozenset(row[0] for row in rows)
+        # With a full page, anyone reaching the lowest cached balance may have entered the top-N
+        self._floor = rows[-1][2] if len(rows) >= self.size else None
+        self._expires = time.monotonic() + self.ttl
+
+    def note_write(self, user_id, new_balance=None):
+        """
+        Called on balance writes with the balance after the write (RETURNING balance);
+        invalidates only when the write can affect the cached page. Without a balance the
+        write is assumed to matter.
+        """
+        if self._rows is None:
+            return
+        if (user_id in self._user_ids or self._floor is None
+                or new_balance is None or new_balance >= self._floor):
+            self._rows = None
+
+leaderboard_cache = LeaderboardCache()
+
+# Do not log, leaderboards are browsed a lot
+async def get_leaderboard_page(limit=10, after=None):
+    """
+    Gets one page of the global leaderboard, richest first.
+
+    Args:
+        limit (int): Rows per page
+        after (tuple): Optional (balance, user_id) of the last row of the previous page (keyset cursor)
+
+    Returns:
+        list[tuple]: (user_id, username, balance) rows
+    """
+    if after is None and limit <= leaderboard_cache.size:
+        cached = leaderboard_cache.get()
+        if cached is None:
+            cached = await _fetch_leaderboard(leaderboard_cache.size, None)
+            leaderboard_cache.store(cached)
+        return cached[:limit]
+    return await _fetch_leaderboard(limit, after)
+
+async def _fetch_leaderboard(limit, after, member_ids=None):
+    where, params = [], []
+    if after is not None:
+        where.append("(balance, user_id) < (?, ?)")
+        params.extend(after)
+    if member_ids is not None:
+        where.append(f"user_id IN ({','.join('?' * len(member_ids))})")
+        params.extend(member_ids)
+    clause = f"WHERE {' AND '.join(where)}" if where else ""
+    sql = f"""
+        SELECT user_id, username, balance FROM users
+        {clause}
+        ORDER BY balance DESC, user_id DESC
+        LIMIT ?
+    """
+    rows = []
+    # Every shard returns its own top `limit`; the global page is the best of those
+    for conn in await db.get_economy_shards():
+        async with conn.execute(sql, (*params, limit)) as cursor:
+            rows.extend(await cursor.fetchall())
+    if db.economy_shards > 1:
+        rows.sort(key=lambda row: (row[2], row[0]), reverse=True)
+    return rows[:limit]
+
+async def get_guild_leaderboard_page(member_ids, limit=10, after=None):
+    """
+    Gets one leaderboard page restricted to a guild's members.
+    Members are looked up by primary key in IN (...) chunks of LEADERBOARD_IN_QUERY_MAX,
+    each returning its own best `limit` rows after the cursor; the page is the best of those.
+    Each call therefore runs ceil(len(member_ids) / LEADERBOARD_IN_QUERY_MAX) queries.
+    """
+    member_ids = list(member_ids)
+    rows = []
+    for start in range(0, len(member_ids), LEADERBOARD_IN_QUERY_MAX):
+        rows.extend(await _fetch_leaderboard(limit, after, member_ids[start:start + LEADERBOARD_IN_QUERY_MAX]))
+    if len(member_ids) > LEADERBOARD_IN_QUERY_MAX:
+        rows.sort(key=lambda row: (row[2], row[0]), reverse=True)
+    return rows[:limit]
+
+@log_db_call
+async def get_user_rank(user_id):
+    """
+    Gets a user's global leaderboard position.
+
+    Returns:
+        tuple | None: (rank, balance), or None if the user has no account
+    """
+    conn = await db.get_economy(user_id)
+    async with conn.execute("SELECT balance FROM users WHERE user_id = ?", (user_id,)) as cursor:
+        row = await cursor.fetchone()
+    if not row:
+        return None
+    balance = row[0]
+    # Two index range counts per shard; ties are ordered by user_id DESC like the leaderboard pages
+    ahead = 0
+    for shard in await db.get_economy_shards():
+        async with shard.execute("""
+            SELECT (SELECT COUNT(*) FROM users WHERE balance > ?)
+                 + (SELECT COUNT(*) FROM users WHERE balance = ? AND user_id > ?)
+        """, (balance, balance, user_id)) as cursor:
+            ahead += (await cursor.fetchone())[0]
+    return ahead + 1, balance
 
 # ===================== Item Handling Functions =====================
 @log_db_call
 async def add_user_item(user_id, item_id, item_name, uses_left=1, effect_modifier=0):
     """Adds an item to the user's inventory."""
     log.trace(f"Adding item {item_name} (ID: {item_id}) to {user_id}'s inventory")
-    conn = await db.get_economy()
+    conn = await db.get_economy(user_id)
     await conn.execute("""
         INSERT INTO user_items (user_id, item_id, item_name, uses_left, effect_modifier)
         VALUES (?, ?, ?, ?, ?)
@@ -495,29 +1365,57 @@ async def add_user_item(user_id, item_id, item_name, uses_left=1, effect_modifie
 @log_db_call
 async def get_user_items(user_id):
     """Fetches all items a user owns."""
-    conn = await db.get_economy()
-    async with conn.execute("SELECT item_id, item_name, uses_left FROM user_items WHERE user_id = ?", (user_id,)) as cursor:
-        items = await cursor.fetchall()
-        return [{"item_id": row[0], "item_name": row[1], "uses_left": row[2]} for row in items] if items else []
+    conn = await db.get_economy(user_id)
+    items = await conn.execute_fetchall("SELECT item_id, item_name, uses_left FROM user_items WHERE user_id = ?", (user_id,))
+    return [{"item_id": row[0], "item_name": row[1], "uses_left": row[2]} for row in items]
+
+@log_db_call
+async def get_user_item(user_id, item_id):
+    """Fetches one item a user owns, or None."""
+    conn = await db.get_economy(user_id)
+    rows = await conn.execute_fetchall(
+        "SELECT item_id, item_name, uses_left FROM user_items WHERE user_id = ? AND item_id = ?", (user_id, item_id)
+    )
+    return {"item_id": rows[0][0], "item_name": rows[0][1], "uses_left": rows[0][2]} if rows else None
+
+@log_db_call
+async def take_item_uses(user_id, item_id, amount):
+    """
+    Removes `amount` uses of one item from a user's inventory, deleting the row when it runs out.
+    Fails (returns None) if the user owns fewer uses than that.
+
+    Returns:
+        dict | None: item_id, item_name and uses_left after the removal
+    """
+    conn = await db.get_economy(user_id)
+    row = await _execute_returning(conn, """
+        UPDATE user_items SET uses_left = uses_left - ?
+        WHERE user_id = ? AND item_id = ? AND uses_left >= ?
+        RETURNING item_name, uses_left
+    """, (amount, user_id, item_id, amount))
+    if row and row[1] <= 0:
+        await conn.execute("DELETE FROM user_items WHERE user_id = ? AND item_id = ? AND uses_left <= 0", (user_id, item_id))
+    await conn.commit()
+    return {"item_id": item_id, "item_name": row[0], "uses_left": row[1]} if row else None
 
 @log_db_call
 async def remove_item_from_user(user_id, item_id):
     """Removes an item completely from the user's inventory."""
-    conn = await db.get_economy()
+    conn = await db.get_economy(user_id)
     await conn.execute("DELETE FROM user_items WHERE user_id = ? AND item_id = ?", (user_id, item_id))
     await conn.commit()
 
 @log_db_call
 async def update_item_uses(user_id, item_id, uses_left):
     """Updates the number of uses left for a user's item."""
-    conn = await db.get_economy()
+    conn = await db.get_economy(user_id)
     await conn.execute("UPDATE user_items SET uses_left = ? WHERE user_id = ? AND item_id = ?", (uses_left, user_id, item_id))
     await conn.commit()
 
 @log_db_call
 async def add_item_to_user(user_id, item_id, item_name, uses_left=1, effect_modifier=0):
     """Adds an item to the user's inventory or updates uses if it exists."""
-    conn = await db.get_economy()
+    conn = await db.get_economy(user_id)
     await conn.execute("""
         INSERT INTO user_items (user_id, item_id, item_name, uses_left, effect_modifier)
         VALUES (?, ?, ?, ?, ?)
@@ -530,22 +1428,23 @@ async def add_item_to_user(user_id, item_id, item_name, uses_left=1, effect_modi
 async def buy_item(user_id, item_id, item_name, price, uses_left=1, effect_modifier=0):
     """Buys an item from the shop and deducts balance."""
     log.trace(f"User {user_id} is buying {item_name} for {price} coins")
-    conn = await db.get_economy()
-    async with conn.execute("SELECT balance FROM users WHERE user_id = ?", (user_id,)) as cursor:
-        user = await cursor.fetchone()
-        if not user:
-            return False
-    current_balance = user[0]
-    if current_balance < price:
-        return False
-    async with conn.execute("UPDATE users SET balance = balance - ? WHERE user_id = ?", (price, user_id)):
+    conn = await db.get_economy(user_id)
+    # The conditional UPDATE is the funds check; payment and item land in one commit
+    row = await _execute_returning(
+        conn, "UPDATE users SET balance = balance - ? WHERE user_id = ? AND balance >= ? RETURNING balance",
+        (price, user_id, price)
+    )
+    if not row:
         await conn.commit()
-    async with conn.execute("""
+        return False
+    await conn.execute("""
         INSERT INTO user_items (user_id, item_id, item_name, uses_left, effect_modifier)
         VALUES (?, ?, ?, ?, ?)
         ON CONFLICT(user_id, item_id) DO UPDATE SET uses_left = user_items.uses_left + ?
-    """, (user_id, item_id, item_name, uses_left, effect_modifier, uses_left)):
-        await conn.commit()
+    """, (user_id, item_id, item_name, uses_left, effect_modifier, uses_left))
+    await conn.commit()
+    leaderboard_cache.note_write(user_id, row[0])
+    ledger.record(user_id, -price, row[0], f"shop: {item_name}")
     return True
 
 # ===================== Special Item Effects =====================
@@ -562,33 +1461,39 @@ async def use_item(user_id, item_id):
     Returns:
         str: A message describing the result of using the item.
     """
-    conn = await db.get_economy()
-    async with conn.execute("SELECT uses_left FROM user_items WHERE user_id = ? AND item_id = ?", (user_id, item_id)) as cursor:
-        result = await cursor.fetchone()
-
-    if not result:
-        return "❌ You don't have this item!"
-
-    uses_left = result[0]
-    if uses_left <= 0:
-        return "❌ You have no uses left for this item!"
-
-    item_data = next((item for item in SHOP_ITEMS if item["id"] == item_id), None)
-    if not item_data:
+    conn = await db.get_economy(user_id)
+    item_data = CATALOG.by_id(item_id)
+
+    # Spend one use in a single statement; the follow-up SELECT only runs to explain a refusal
+    consumed = None
+    if item_data:
+        consumed = await _execute_returning(conn, """
+            UPDATE user_items SET uses_left = uses_left - 1
+            WHERE user_id = ? AND item_id = ? AND uses_left > 0
+            RETURNING uses_left
+        """, (user_id, item_id))
+    if not consumed:
+        await conn.commit()
+        owned = await conn.execute_fetchall(
+            "SELECT uses_left FROM user_items WHERE user_id = ? AND item_id = ?", (user_id, item_id)
+        )
+        if not owned:
+            return "❌ You don't have this item!"
+        if owned[0][0] <= 0:
+            return "❌ You have no uses left for this item!"
         return "❌ Failed to load item details."
 
+    # FIX: Decrement uses, removing exhausted items in the same commit
+    new_uses = consumed[0]
+    if new_uses <= 0:
+        await conn.execute("DELETE FROM user_items WHERE user_id = ? AND item_id = ? AND uses_left <= 0", (user_id, item_id))
+    await conn.commit()
+
     # Handle last use case
     last_use_warning = ""
-    if uses_left == 1:
+    if new_uses == 0:
         last_use_warning = f"⚠️ **This is the last use of your {item_data['name']}!**\n"
 
-    # FIX: Decrement uses
-    new_uses = uses_left - 1
-    if new_uses <= 0:
-        await remove_item_from_user(user_id, item_id)
-    else:
-        await update_item_uses(user_id, item_id, new_uses)
-
     # Apply effect if item has one
     effect_applied = f"Used **{item_data['name']}** ({new_uses} uses remaining)."
 
@@ -602,19 +1507,21 @@ async def use_item(user_id, item_id):
             await modify_robber_multiplier(user_id, mod_val, duration=duration)
             effect_applied = f"🔧 **Your robbery success rate changed!**"
 
-        # Apply temporary effects (like Resin Sample) — handled inside modify_robber_multiplier via duration
+        # Apply temporary effects (like Resin Sample) — persisted by modify_robber_multiplier via duration
         if "temporary_effect" in effect_data:
             effect_applied += f"\n⏳ *Effect will decay after {effect_data.get('duration', 0) // 60} minutes.*"
 
         # Apply defensive effects
         if effect_data.get("taser"):
-            await modify_robber_multiplier(user_id, effect_data["robbery_modifier"])
-            effect_applied = "⚡ **You are now protected from robbery for one attempt!**"
+            await modify_robber_multiplier(user_id, effect_data["robbery_modifier"], duration=effect_data.get("duration"))
+            effect_applied = f"⚡ **You are protected from robbery for the next {effect_data.get('duration', 0) // 60} minutes!**"
 
         if effect_data.get("gun_defense"):
             effect_applied = "🔫 **You are armed. Good luck, robber.**"
 
         if effect_data.get("drain_percent"):
+            await add_active_effect(user_id, "drain", effect_data["drain_percent"],
+                                    effect_data["duration"], interval=effect_data["interval"])
             effect_applied = "💸 **Financial Drain activated!** Your balance will slowly decay..."
 
         if effect_data.get("gambling_placebo"):
@@ -626,17 +1533,27 @@ async def use_item(user_id, item_id):
 @log_db_call
 async def check_gun_defense(victim_id):
     """Checks if a user has a gun defense item."""
-    conn = await db.get_economy()
+    conn = await db.get_economy(victim_id)
     async with conn.execute("SELECT uses_left FROM user_items WHERE user_id = ? AND item_id = 10", (victim_id,)) as cursor:
         result = await cursor.fetchone()
         return result[0] if result and result[0] > 0 else 0
 
 @log_db_call
 async def decrement_gun_use(victim_id):
-    """Decrements the uses left for a user's gun defense item."""
-    conn = await db.get_economy()
-    await conn.execute("UPDATE user_items SET uses_left = uses_left - 1 WHERE user_id = ? AND item_id = 10 AND uses_left > 0", (victim_id,))
+    """
+    Decrements the uses left for a user's gun defense item.
+
+    Returns:
+        int | None: Uses left after firing, or None if the user had no loaded gun
+    """
+    conn = await db.get_economy(victim_id)
+    row = await _execute_returning(conn, """
+        UPDATE user_items SET uses_left = uses_left - 1
+        WHERE user_id = ? AND item_id = 10 AND uses_left > 0
+        RETURNING uses_left
+    """, (victim_id,))
     await conn.commit()
+    return row[0] if row else None
 
 # ===================== Moderator Logging Functions =====================
 @log_mod_call
@@ -652,23 +1569,25 @@ async def insert_case(guild_id, user_id, username, reason, action_type, moderato
     if reason is None:
         reason = "No reason provided"
 
-    async with db._moderator_lock:
-        conn = await db.get_moderator()
-        await conn.execute("BEGIN IMMEDIATE")
-        try:
-            async with conn.execute("SELECT MAX(case_number) FROM cases WHERE guild_id = ?", (guild_id,)) as cursor:
-                row = await cursor.fetchone()
-            next_case_number = (row[0] or 0) + 1
-            await conn.execute("""
-                INSERT INTO cases (case_number, guild_id, user_id, username, reason, action_type, timestamp, moderator_id, expiry)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (next_case_number, guild_id, user_id, username, reason, action_type, timestamp, moderator_id, expiry))
-            await conn.commit()
-            return next_case_number
-        except Exception as e:
-            await conn.rollback()
-            log.error(f"Error in insert_case: {e}")
-            raise
+    # The counter row is read and bumped (via trg_cases_counter) inside one INSERT,
+    # so allocation is atomic per guild without holding a global lock.
+    conn = await db.get_moderator()
+    try:
+        row = await _execute_returning(conn, """
+            INSERT INTO cases (case_number, guild_id, user_id, username, reason, action_type, timestamp, moderator_id, expiry)
+            VALUES (
+                COALESCE((SELECT last_case_number FROM case_counters WHERE guild_id = ?), 0) + 1,
+                ?, ?, ?, ?, ?, ?, ?, ?
+            )
+            RETURNING case_number
+        """, (guild_id, guild_id, user_id, username, reason, action_type, timestamp, moderator_id, expiry))
+        await conn.commit()
+        return row[0]
+    except Exception as e:
+        # Don't leave a half-applied counter bump open for the next commit on the shared connection
+        await conn.rollback()
+        log.error(f"Error in insert_case: {e}")
+        raise
 
 @log_mod_call
 async def get_cases_for_guild(guild_id, limit=50, offset=0):
@@ -683,6 +1602,83 @@ async def get_cases_for_guild(guild_id, limit=50, offset=0):
     """, (guild_id, limit, offset)) as cursor:
         return await cursor.fetchall()
 
+@log_mod_call
+async def get_cases_page(guild_id, limit=10, before=None):
+    """
+    Gets one page of a guild's cases, newest first, using the (guild_id, case_number) index.
+
+    Args:
+        guild_id (int): Guild to list
+        limit (int): Cases per page
+        before (int): Only cases numbered below this (the last case_number of the previous page)
+
+    Returns:
+        list[tuple]: (case_number, user_id, username, reason, action_type, timestamp, moderator_id, expiry)
+    """
+    conn = await db.get_moderator()
+    async with conn.execute("""
+        SELECT case_number, user_id, username, reason, action_type, timestamp, moderator_id, expiry
+        FROM cases
+        WHERE guild_id = ? AND case_number < ?
+        ORDER BY case_number DESC
+        LIMIT ?
+    """, (guild_id, before if before is not None else 2**63 - 1, limit)) as cursor:
+        return await cursor.fetchall()
+
+CASE_EXPORT_BATCH = 500
+
+async def iter_guild_cases(guild_id, batch_size=CASE_EXPORT_BATCH):
+    """
+    Yields every case of a guild, newest first, one keyset batch at a time,
+    so exports never hold a guild's whole history in memory.
+    """
+    log.database(f"MOD DB CALL: iter_guild_cases called for guild {guild_id}")
+    before = None
+    while True:
+        rows = await get_cases_page.__wrapped__(guild_id, batch_size, before)
+        for row in rows:
+            yield row
+        if len(rows) < batch_size:
+            return
+        before = rows[-1][0]
+
+def _fts_query(text):
+    """
+    Turns free text into a safe FTS5 query: every word is quoted (so operators and
+    punctuation can't cause syntax errors) and all words must match. A trailing *
+    on a word keeps prefix matching.
+    """
+    terms = re.findall(r"\w+\*?", text)
+    return " ".join(f'"{term.rstrip("*")}"*' if term.endswith("*") else f'"{term}"' for term in terms)
+
+@log_mod_call
+async def search_cases(guild_id, text, limit=10, offset=0):
+    """
+    Full-text search over a guild's case reasons and usernames, best match first (bm25).
+
+    Args:
+        guild_id (int): Guild to search
+        text (str): Words to look for; append * to a word for prefix matching
+        limit (int): Results per page
+        offset (int): Results to skip (ranked results have no stable keyset)
+
+    Returns:
+        list[tuple]: (case_number, user_id, username, reason, action_type, timestamp, moderator_id, expiry)
+    """
+    query = _fts_query(text)
+    if not query:
+        return []
+    conn = await db.get_moderator()
+    async with conn.execute("""
+        SELECT c.case_number, c.user_id, c.username, c.reason, c.action_type, c.timestamp, c.moderator_id, c.expiry
+        FROM cases_fts
+        JOIN cases c ON c.case_id = cases_fts.rowid
+        WHERE cases_fts MATCH ? AND c.guild_id = ?
+        ORDER BY bm25(cases_fts, 1.0, 0.5), c.case_number DESC
+        LIMIT ? OFFSET ?
+    """, (query, guild_id, limit, offset)) as cursor:
+        return await cursor.fetchall()
+
 @log_mod_call
 async def get_cases_for_user(guild_id, user_id):
     """Get cases for a specific user in a guild."""
@@ -740,22 +1736,55 @@ async def get_expired_cases(guild_id, action_type, now=None):
         """, (guild_id, action_type, now)) as cursor:
             return await cursor.fetchall()
 
-# ===================== Periodic Backup =====================
-BACKUP_FOLDER_ID = BACKUP_GDRIVE_FOLDER_ID
+# Do not log either, the expiry scheduler reloads these in bulk
+async def get_pending_expiries(action_type, limit=500, min_expiry=0):
+    """
+    Get unresolved timed cases ordered by expiry, soonest first.
 
-async def periodic_backup(interval_hours=1):
-    """Periodically back up the economy and moderator databases to Google Drive."""
-    log.info("Started periodic_backup task")
-    while True:
-        try:
-            await backup_all_dbs_to_gdrive_env([
-                (ECONOMY_DB_PATH, "economy.db"),
-                (MODERATOR_DB_PATH, "moderator.db")
-            ], BACKUP_FOLDER_ID)
-        except Exception as e:
-            log.warning(f"Periodic backup fail: {e}")
-        log.success("Backup task completed.")
-        await asyncio.sleep(interval_hours * 3600)
+    Returns:
+        list[tuple]: (expiry, guild_id, case_number, user_id) rows
+    """
+    conn = await db.get_moderator()
+    async with conn.execute("""
+        SELECT expiry, guild_id, case_number, user_id FROM cases
+        WHERE action_type = ? AND expiry > 0 AND resolved = 0 AND expiry >= ?
+        ORDER BY expiry
+        LIMIT ?
+    """, (action_type, min_expiry, limit)) as cursor:
+        return await cursor.fetchall()
+
+@log_mod_call
+async def resolve_cases(cases):
+    """Mark timed cases as lifted so they are never processed again. Takes (guild_id, case_number) pairs."""
+    if not cases:
+        return
+    conn = await db.get_moderator()
+    await conn.executemany("UPDATE cases SET resolved = 1 WHERE guild_id = ? AND case_number = ?", cases)
+    await conn.commit()
+
+# ===================== Maintenance Stats =====================
+# Do not log, the maintenance task and metrics read these
+async def get_database_stats(conn, path):
+    """
+    Size and free-space figures of one open database.
+
+    Returns:
+        dict: file_bytes (main file + WAL), page_size, page_count, freelist_pages,
+              fragmentation (share of pages on the freelist) and auto_vacuum (0 none, 1 full, 2 incremental)
+    """
+    values = {}
+    for pragma in ("page_size", "page_count", "freelist_count", "auto_vacuum"):
+        async with conn.execute(f"PRAGMA {pragma}") as cursor:
+            values[pragma] = (await cursor.fetchone())[0]
+    file_bytes = sum(os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix))
+    return {
+        "file_bytes": file_bytes,
+        "page_size": values["page_size"],
+        "page_count": values["page_count"],
+        "freelist_pages": values["freelist_count"],
+        "fragmentation": round(values["freelist_count"] / values["page_count"], 4) if values["page_count"] else 0.0,
+        "auto_vacuum": values["auto_vacuum"],
+    }
 
 # ===================== Global Exception Hook =====================
 def _log_unhandled_exception(exc_type, exc_value, exc_tb):
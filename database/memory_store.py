@@ -0,0 +1,343 @@
+# database/memory_store.py
+# Opt-in in-memory economy (ECONOMY_IN_MEMORY=1). Each economy shard is loaded from its .db file
+# into an in-memory SQLite database; every committed transaction is first appended to a journal
+# next to the file, and the database is written back to the file on an interval and at shutdown.
+# On startup the journal is replayed on top of the last checkpoint.
+
+# Standard Library Imports
+import asyncio
+import functools
+import glob
+import json
+import os
+import re
+import sqlite3
+import time
+import uuid
+
+# Third-Party Imports
+import aiosqlite
+
+# Local Imports
+from logging_modules.custom_logger import get_logger
+
+log = get_logger()
+
+MEMORY_CHECKPOINT_INTERVAL = 300   # seconds between checkpoints back to the .db file
+JOURNAL_FSYNC_INTERVAL = 1.0       # seconds; journal lines reach the OS on every commit, the disk at most this late
+CHECKPOINT_IDLE_TIMEOUT = 5.0      # seconds a checkpoint waits for in-flight writes to commit
+
+_STATE_TABLE = "_journal_state"    # holds the journal sequence a checkpointed file is current to
+_SKIPPED = {"SELECT", "EXPLAIN", "ANALYZE", "VACUUM"}
+_CTE_WRITE = re.compile(r"\b(INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+_PRAGMA_WRITE = re.compile(r"^\s*PRAGMA\s+user_version\s*=", re.IGNORECASE)
+
+@functools.lru_cache(maxsize=1024)  # statements are module constants, classify each once
+def _is_logical_write(sql):
+    """Whether a statement changes content and must be journaled (not reads or physical upkeep)."""
+    words = sql.split(None, 1)
+    head = words[0].upper() if words else ""
+    if head in _SKIPPED:
+        return False
+    if head == "PRAGMA":
+        return bool(_PRAGMA_WRITE.match(sql))
+    if head == "WITH":
+        return bool(_CTE_WRITE.search(sql))
+    return True
+
+
+class _JournaledCall:
+    """aiosqlite's execute result (awaitable and async context manager), noting the statement once it succeeded."""
+
+    def __init__(self, conn, note, result):
+        self._conn = conn
+        self._note = note
+        self._result = result
+
+    def __await__(self):
+        return self._conn._run(self._note, self._result).__await__()
+
+    async def __aenter__(self):
+        return await self._conn._run(self._note, self._result.__aenter__())
+
+    async def __aexit__(self, *exc_info):
+        return await self._result.__aexit__(*exc_info)
+
+
+class JournaledConnection:
+    """
+    Drop-in for the aiosqlite connection of an in-memory shard.
+
+    A write is noted once the connection's worker thread has run it without error; the
+    worker runs statements in submission order and hands results back in that order, so
+    notes follow execution order. commit() appends everything noted since the last commit
+    to the journal as one record before committing in memory.
+    """
+
+    def __init__(self, conn, store):
+        self._conn = conn
+        self._store = store
+        self.pending = []
+        self.in_flight = 0  # statements handed to the worker and not yet noted (or failed)
+
+    def _noter(self, sql, parameters=None, many=False):
+        def note():
+            if _is_logical_write(sql):
+                self.pending.append([sql, parameters, 1] if many else [sql, list(parameters or ())])
+        return note
+
+    async def _run(self, note, call):
+        self.in_flight += 1
+        try:
+            result = await call
+            note()
+            return result
+        finally:
+            self.in_flight -= 1
+
+    def execute(self, sql, parameters=None):
+        return _JournaledCall(self, self._noter(sql, parameters), self._conn.execute(sql, parameters))
+
+    async def execute_fetchall(self, sql, parameters=None):
+        return await self._run(self._noter(sql, parameters), self._conn.execute_fetchall(sql, parameters))
+
+    async def executemany(self, sql, parameters):
+        rows = [list(row) for row in parameters]
+        return await self._run(self._noter(sql, rows, many=True), self._conn.executemany(sql, rows))
+
+    async def commit(self):
+        ops, self.pending = self.pending, []
+        if ops:
+            self._store.append(ops)
+        await self._conn.commit()
+
+    async def rollback(self):
+        self.pending = []
+        await self._conn.rollback()
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    async def close(self):
+        await self._store.close()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class MemoryEconomyStore:
+    """
+    One in-memory economy shard with its journal and checkpoints.
+
+    Usage:
+        store = MemoryEconomyStore(path)
+        conn = await store.open()   # loads path, replays its journal
+        ...
+        await store.checkpoint()    # on an interval
+        await store.close()         # checkpoints, then closes
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.seq = 0                 # last journaled transaction
+        self.checkpoint_seq = 0      # transaction the .db file is current to
+        self.conn = None
+        self._raw = None
+        self._journal = None
+        self._segment = None
+        self._last_fsync = 0.0
+        self._checkpoint_lock = asyncio.Lock()
+        self.replay = {}
+        self.last_checkpoint = {}
+
+    def _segments(self):
+        # Zero-padded first sequence in the name, so lexical order is replay order
+        return sorted(glob.glob(glob.escape(self.path) + "-journal-*"))
+
+    # ----- Startup -----
+    async def open(self):
+        # A named shared-cache memory database: the worker thread below loads and replays into it
+        # through its own connection while this one (idle until we return) keeps it alive
+        uri = f"file:economy-{uuid.uuid4().hex}?mode=memory&cache=shared"
+        self._raw = await aiosqlite.connect(uri, uri=True)
+        await self._raw.execute("PRAGMA foreign_keys = ON")
+        self.replay = await asyncio.to_thread(self._load_sync, uri)
+        self.checkpoint_seq = self.replay["base_seq"]
+        self.seq = self.replay["seq"]
+        self.conn = JournaledConnection(self._raw, self)
+        stale = self._segments()
+        self._open_segment()
+        if self.replay["records"] or stale:
+            log.database(
+                f"Replayed {self.replay['records']} journaled transaction(s) into {os.path.basename(self.path)} "
+                f"in {self.replay['seconds']:.3f}s" + (" (stopped early)" if self.replay["gap"] else "")
+            )
+            # Fold the replay into the file right away; this also drops the replayed segments
+            await self.checkpoint()
+        return self.conn
+
+    def _load_sync(self, uri):
+        work = sqlite3.connect(uri, uri=True)
+        try:
+            work.execute("PRAGMA foreign_keys = ON")
+            if os.path.exists(self.path):
+                disk = sqlite3.connect(self.path)
+                try:
+                    # Folds and removes a WAL left by disk mode, so checkpoints can replace the file cleanly
+                    disk.execute("PRAGMA journal_mode = DELETE")
+                    disk.backup(work)
+                finally:
+                    disk.close()
+            base = 0
+            if work.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (_STATE_TABLE,)).fetchone():
+                base = work.execute(f"SELECT seq FROM {_STATE_TABLE}").fetchone()[0]
+                work.execute(f"DROP TABLE {_STATE_TABLE}")
+                work.commit()
+            started = time.perf_counter()
+            seq, records, gap = self._replay_sync(work, base)
+            return {"base_seq": base, "seq": seq, "records": records, "gap": gap,
+                    "seconds": round(time.perf_counter() - started, 4)}
+        finally:
+            work.close()
+
+    def _replay_sync(self, work, base):
+        """
+        Applies journal records base+1, base+2, ... in order.
+        Returns (last seq, records applied, whether replay stopped at a gap or a failing record).
+        """
+        seq, records = base, 0
+        for segment in self._segments():
+            with open(segment, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn tail of a write cut off by the crash; nothing after it was acknowledged
+                        break
+                    if record["seq"] <= seq:
+                        continue
+                    if record["seq"] != seq + 1:
+                        # The file is older than the journal (e.g. restored from a backup): the rest doesn't apply
+                        log.error(f"Journal of {os.path.basename(self.path)} jumps from {seq} to {record['seq']}; "
+                                  "discarding the remainder.")
+                        return seq, records, True
+                    try:
+                        for op in record["ops"]:
+                            if len(op) == 3:
+                                work.executemany(op[0], op[1])
+                            else:
+                                work.execute(op[0], op[1])
+                    except sqlite3.Error as e:
+                        # Only statements that succeeded are journaled: the file and the journal disagree
+                        work.rollback()
+                        log.error(f"Journal record {record['seq']} of {os.path.basename(self.path)} failed to "
+                                  f"replay ({e}); discarding it and the remainder.")
+                        return seq, records, True
+                    work.commit()
+                    seq, records = record["seq"], records + 1
+        return seq, records, False
+
+    # ----- Journal -----
+    def _open_segment(self):
+        self._segment = f"{self.path}-journal-{self.seq + 1:012d}"
+        self._journal = open(self._segment, "a", encoding="utf-8")
+
+    def _close_segment(self):
+        if self._journal:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._journal.close()
+            self._journal = None
+
+    def append(self, ops):
+        """Writes one committed transaction. Synchronous on purpose: nothing else may interleave."""
+        self.seq += 1
+        self._journal.write(json.dumps({"seq": self.seq, "ops": ops}, separators=(",", ":")) + "\n")
+        self._journal.flush()
+        now = time.monotonic()
+        if now - self._last_fsync >= JOURNAL_FSYNC_INTERVAL:
+            os.fsync(self._journal.fileno())
+            self._last_fsync = now
+
+    # ----- Checkpoints -----
+    async def checkpoint(self):
+        """
+        Writes the in-memory database to its .db file and drops the journal it covers.
+
+        Returns:
+            dict | None: seq, bytes and seconds, or None if writes never settled
+        """
+        async with self._checkpoint_lock:
+            deadline = time.monotonic() + CHECKPOINT_IDLE_TIMEOUT
+            while self.conn.pending or self.conn.in_flight:
+                if time.monotonic() >= deadline:
+                    log.warning(f"Checkpoint of {os.path.basename(self.path)} skipped: writes did not settle.")
+                    return None
+                await asyncio.sleep(0.01)
+
+            # No await from here until the backup is queued: it sees exactly the journaled transactions up to seq
+            seq = self.seq
+            self._close_segment()
+            self._open_segment()
+            started = time.perf_counter()
+            tmp = self.path + ".checkpoint"
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            target = sqlite3.connect(tmp, check_same_thread=False)
+            try:
+                await self._raw.backup(target)
+                await asyncio.to_thread(self._finish_checkpoint_sync, target, tmp, seq)
+            finally:
+                target.close()
+            os.replace(tmp, self.path)
+            self._fsync_dir()
+            for segment in self._segments():
+                if segment != self._segment:
+                    os.remove(segment)
+            self.checkpoint_seq = seq
+            self.last_checkpoint = {
+                "at": int(time.time()),
+                "seq": seq,
+                "bytes": os.path.getsize(self.path),
+                "seconds": round(time.perf_counter() - started, 4),
+            }
+            return self.last_checkpoint
+
+    @staticmethod
+    def _finish_checkpoint_sync(target, tmp, seq):
+        target.execute(f"CREATE TABLE {_STATE_TABLE} (seq INTEGER NOT NULL)")
+        target.execute(f"INSERT INTO {_STATE_TABLE} (seq) VALUES (?)", (seq,))
+        target.commit()
+        with open(tmp, "rb") as f:
+            os.fsync(f.fileno())
+
+    def _fsync_dir(self):
+        # Makes the rename itself durable; not possible (or needed) on Windows
+        if os.name != "nt":
+            fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def metrics(self):
+        return {
+            "seq": self.seq,
+            "journaled_since_checkpoint": self.seq - self.checkpoint_seq,
+            "journal_bytes": sum(os.path.getsize(segment) for segment in self._segments()),
+            "last_checkpoint": self.last_checkpoint,
+            "replay": self.replay,
+        }
+
+    async def close(self):
+        if self._raw is None:
+            return
+        try:
+            await self.checkpoint()
+        finally:
+            self._close_segment()
+            raw, self._raw = self._raw, None
+            await raw.close()
+        if self.checkpoint_seq == self.seq and os.path.exists(self._segment):
+            os.remove(self._segment)  # Empty: the file has everything
@@ -0,0 +1,93 @@
+# database/shards.py
+# Offline tool for the sharded economy: splits an existing economy.db into one file per shard.
+# Stop the bot first, then set ECONOMY_SHARDS to the same count.
+#
+# Usage: python -m database.shards split 4 [--source data/economy.db] [--force]
+
+# Standard Library Imports
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+# Local Imports
+from logging_modules.custom_logger import get_logger
+from database.manager import ECONOMY_DB_PATH, economy_shard_path, shard_for
+
+log = get_logger()
+
+# (table, user column) pairs partitioned by user; anything else is copied to every shard
+SHARDED_TABLES = [
+    ("users", "user_id"),
+    ("user_items", "user_id"),
+    ("active_effects", "user_id"),
+    ("pending_transfers", "from_user"),
+    ("ledger", "user_id"),
+    ("ledger_daily", "user_id"),
+]
+
+def split_economy_db(source, shards, force=False):
+    """
+    Splits source into `shards` files next to it. Each shard starts as a full copy (schema,
+    triggers, user_version) and then drops the users hashed elsewhere; the aggregate
+    triggers keep economy_stats and the histogram correct while rows are deleted.
+
+    Returns:
+        list[tuple]: (path, users) per shard
+    """
+    if shards < 2:
+        raise ValueError("Splitting needs at least 2 shards.")
+    if not os.path.exists(source):
+        raise FileNotFoundError(source)
+    targets = [economy_shard_path(i, shards, base_path=source) for i in range(shards)]
+    existing = [path for path in targets if os.path.exists(path)]
+    if existing and not force:
+        raise FileExistsError(f"Shard files already exist: {', '.join(existing)} (use --force to overwrite)")
+
+    result = []
+    for index, target in enumerate(targets):
+        started = time.perf_counter()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(target + suffix):
+                os.remove(target + suffix)
+        src = sqlite3.connect(source)
+        dst = sqlite3.connect(target)
+        try:
+            src.backup(dst)
+            dst.create_function("shard_of", 1, lambda user_id: shard_for(user_id, shards), deterministic=True)
+            tables = {row[0] for row in dst.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            with dst:
+                for table, column in SHARDED_TABLES:
+                    if table in tables:
+                        dst.execute(f"DELETE FROM {table} WHERE shard_of({column}) != ?", (index,))
+            dst.execute("VACUUM")
+            users = dst.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        finally:
+            dst.close()
+            src.close()
+        log.database(f"Shard {index}: {users} users -> {target} ({time.perf_counter() - started:.2f}s)")
+        result.append((target, users))
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Economy shard tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    split = sub.add_parser("split", help="Split economy.db into N shard files")
+    split.add_argument("shards", type=int)
+    split.add_argument("--source", default=ECONOMY_DB_PATH)
+    split.add_argument("--force", action="store_true", help="Overwrite existing shard files")
+    args = parser.parse_args(argv)
+
+    if args.command == "split":
+        try:
+            shards = split_economy_db(args.source, args.shards, args.force)
+        except (ValueError, FileNotFoundError, FileExistsError) as e:
+            log.error(str(e))
+            return 1
+        total = sum(users for _, users in shards)
+        log.success(f"Split {total} users into {len(shards)} shards. Set ECONOMY_SHARDS={len(shards)} to use them.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
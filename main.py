@@ -33,18 +33,31 @@ import services.cloudflare_ping as cf
 import config
 from config import IS_ALPHA, get_activity
 from database import (
-    get_expired_cases,
-    periodic_backup,
+    run_scheduled_backup,
     init_databases,
     ECONOMY_DB_PATH,
     MODERATOR_DB_PATH,
     BACKUP_FOLDER_ID,
     backup_all_dbs_to_gdrive_env,
     restore_all_dbs_from_gdrive_env,
-    get_total_economy_sum,
+    get_economy_stats,
+    run_effects_scheduler,
+    flush_ledger,
+    compact_ledger,
+    ledger_command,
+    economy_locks,
+    db,
+    LEDGER_FLUSH_INTERVAL,
+    LEDGER_COMPACT_INTERVAL,
+    MEMORY_CHECKPOINT_INTERVAL,
 )
 from logging_modules.custom_logger import get_logger
 from status import StatusReporter, BotMonitor, ConfigSync
+from services.expiry_scheduler import ExpiryScheduler
+from services.db_maintenance import DatabaseMaintenance, MAINTENANCE_CHECK_INTERVAL
+from services.economy_analytics import EconomyAnalytics
+from services.scheduler import JobScheduler, MISSED_RUN_ONCE
+from utils.ratelimit import RateLimit, rate_limits
 
 reporter = StatusReporter(
     api_url=os.getenv("DASHBOARD_URL"),          # Railway internal link
@@ -82,42 +95,74 @@ class Main(commands.AutoShardedBot):
         self.start_time = time.time()
         self.http_session: Optional[aiohttp.ClientSession] = None
         self.cached_economy = 0
+        self.cached_economy_stats = {}
+        self.db_maintenance = DatabaseMaintenance()
+        self.economy_analytics = EconomyAnalytics()
+        # Owns every background loop; stopped first at shutdown
+        self.scheduler = JobScheduler()
 
     async def setup_hook(self):
         # Initialize shared HTTP session
         self.http_session = aiohttp.ClientSession()
         log.info("Initialized shared HTTP session")
-        
-        # Start Cloudflare ping loop with shared session
-        cf.ensure_started(session=self.http_session)
 
         log.info("Starting background tasks")
         # Flurazide is do-it-all, so we can add more metrics here later
         monitor = BotMonitor(
             reporter, 
             self,
-            custom_metrics_callback=lambda: {"economy": self.cached_economy}
+            custom_metrics_callback=lambda: {
+                "economy": self.cached_economy,
+                "economy_stats": self.cached_economy_stats,
+                "db_maintenance": self.db_maintenance.metrics(),
+                "economy_locks": economy_locks.metrics(),
+                "economy_analytics": self.economy_analytics.metrics(),
+                "economy_memory_store": db.memory_store_metrics(),
+                "scheduler": self.scheduler.metrics(),
+                "rate_limits": rate_limits.metrics(),
+                "config_sync": self.config_sync.metrics(),
+            }
         )
-        asyncio.create_task(monitor.run_forever())
-        
-        # Start config polling
+
+        # Config polling
         self.config_sync = ConfigSync(
             api_url=os.getenv("DASHBOARD_URL"),
             bot_id="flurazide",
             bot=self,
         )
-        asyncio.create_task(self.config_sync.run_forever())
 
         # Register global checks
         self.tree.interaction_check = global_blacklist_check
-        
-        # Dynamic cooldown tracking (user_id -> command_name -> timestamp)
-        self._custom_cooldowns = {}
 
-        asyncio.create_task(self.update_economy_metrics())
-        self.cycle_activities_task = asyncio.create_task(cycle_activities())
-        self.moderation_expiry_task = asyncio.create_task(moderation_expiry_task())
-        self.delayed_backup_starter_task = asyncio.create_task(delayed_backup_starter(BACKUP_DELAY_HOURS))
+        self.expiry_scheduler = ExpiryScheduler(self)
+
+        jobs = self.scheduler
+        jobs.every("status_report", monitor.interval, monitor.report_once, initial_delay=15)  # 15s warms the caches
+        jobs.every("config_sync", self.config_sync.interval, self.config_sync.sync_all, initial_delay=5)
+        jobs.every("cloudflare_ping", cf.CLOUD_FLARE_PING_INTERVAL, lambda: cf.refresh_cache(self.http_session), jitter=60)
+        jobs.every("economy_metrics", 60, self.refresh_economy_metrics)
+        jobs.every("rate_limit_sweep", 60, rate_limits.sweep)
+        # On the quarter hour, so the day/night switch lands right on the hour
+        jobs.cron("activities", "*/15 * * * *", sync_activity, run_at_start=True, start_after=self.wait_until_ready,
+                  missed=MISSED_RUN_ONCE, retry_delay=60)
+        jobs.service("moderation_expiry", self.expiry_scheduler.run_forever)
+        jobs.service("effects", run_effects_scheduler)
+        jobs.every("ledger_flush", LEDGER_FLUSH_INTERVAL, flush_ledger, initial_delay=LEDGER_FLUSH_INTERVAL)
+        jobs.every("ledger_compaction", LEDGER_COMPACT_INTERVAL, compact_ledger,
+                   initial_delay=LEDGER_FLUSH_INTERVAL, missed=MISSED_RUN_ONCE)
+        if db.in_memory:
+            jobs.every("memory_checkpoint", MEMORY_CHECKPOINT_INTERVAL, db.checkpoint_memory,
+                       initial_delay=MEMORY_CHECKPOINT_INTERVAL, missed=MISSED_RUN_ONCE)
+        jobs.every("db_maintenance", MAINTENANCE_CHECK_INTERVAL, self.db_maintenance.run_if_due,
+                   initial_delay=MAINTENANCE_CHECK_INTERVAL)
+        jobs.every("economy_analytics", self.economy_analytics.interval, self.economy_analytics.take_snapshot)
+        if IS_ALPHA:
+            log.warning("Skipping backup as this is an alpha version.")
+        else:
+            jobs.every("backup", BACKUP_DELAY_HOURS * 3600, run_scheduled_backup, initial_delay=BACKUP_DELAY_HOURS * 3600,
+                       start_after=self.wait_until_ready, jitter=300, missed=MISSED_RUN_ONCE)
+        jobs.start()
+
         
         commands_dir = os.path.join(os.path.dirname(__file__), "commands")
         failed = []
@@ -172,6 +217,9 @@ class Main(commands.AutoShardedBot):
 
         await self.tree.sync()
         await self.tree.sync(guild=discord.Object(id=test_server))
+        # Module names per command, so the interaction check doesn't derive them on every call
+        indexed = self.config_sync.index_commands(self.tree, guild_ids=[test_server])
+        log.info(f"Indexed modules for {indexed} app command(s)")
 
     async def change_activity_all(self, activity, status):
         """Force sync activities across all shards safely."""
@@ -187,15 +235,12 @@ class Main(commands.AutoShardedBot):
                 except Exception as e:
                     log.warning(f"[Shard {shard_id}] Failed to sync activity: {e}")
 
-    async def update_economy_metrics(self):
-        """Background task to update the economy cache every 5 minutes."""
-        while True:
-            try:
-                self.cached_economy = await get_total_economy_sum()
-                log.trace(f"Updated cached global economy: {self.cached_economy}")
-            except Exception as e:
-                log.error(f"Failed to update economy metrics: {e}")
-            await asyncio.sleep(300) # 5 minutes
+    async def refresh_economy_metrics(self):
+        """Refreshes the economy cache; scheduled every minute (aggregates are O(1) reads)."""
+        stats = await get_economy_stats()
+        self.cached_economy_stats = stats
+        self.cached_economy = stats["positive_total"]
+        log.trace(f"Updated cached global economy: {self.cached_economy}")
 
 bot = Main()
 bot.help_command = None
@@ -313,6 +358,12 @@ async def _safe_response(interaction, message, ephemeral=False):
 
 # yes i am this petty.
 async def global_blacklist_check(interaction: Interaction) -> bool:
+    # Tag the ledger entries this command's task writes with the command's name
+    if interaction.command:
+        ledger_command.set(interaction.command.qualified_name)
+    # Database maintenance waits for quiet periods
+    bot.db_maintenance.note_command()
+
     # Check if bot is shutting down/restarting
     if getattr(bot, "_is_shutting_down", False):
         await interaction.response.send_message(
@@ -342,160 +393,61 @@ async def global_blacklist_check(interaction: Interaction) -> bool:
         return False
 
     # Check dashboard config overrides (if in a guild and it's a command)
-    if guild_id and interaction.type == discord.InteractionType.application_command:
-        client = interaction.client
-        settings = getattr(client, "config_sync", None)
-        if settings:
-            guild_cfg = settings.get(guild_id)
-            if guild_cfg:
-                cmd = interaction.command
-                cmd_name = cmd.name if cmd else "unknown"
-                
-                # 1. Module Resolution
-                # We check root_parent, then the binding class name, then the cog name
-                module_names = []
-                if cmd:
-                    if cmd.root_parent:
-                        module_names.append(cmd.root_parent.name.lower())
-                    module_names.append(cmd.name.lower())
-                    
-                    # Check binding (Group or Cog)
-                    if hasattr(cmd, "binding"):
-                        binding_name = cmd.binding.__class__.__name__.lower()
-                        # Strip 'Commands', 'Cog', etc.
-                        for suffix in ["commands", "cog", "commandsgroup"]:
-                            if binding_name.endswith(suffix) and len(binding_name) > len(suffix):
-                                binding_name = binding_name[:-len(suffix)]
-                        module_names.append(binding_name)
-
-                enabled_modules = guild_cfg.get("enabled_modules", {})
-                
-                # Block if ANY resolved module name is disabled
-                blocked_module = None
-                for m in module_names:
-                    if enabled_modules.get(m) is False:
-                        blocked_module = m
-                        break
-                
-                if blocked_module:
-                    log.info(f"Blocking command /{cmd.qualified_name} in guild {guild_id}: module '{blocked_module}' is disabled.")
+    cmd = interaction.command
+    if guild_id and cmd and interaction.type == discord.InteractionType.application_command:
+        settings = getattr(interaction.client, "config_sync", None)
+        # Compiled when the guild's config arrived; the rest is set and dict lookups
+        policy = settings.policy(guild_id) if settings else None
+        if policy:
+            # 1. Module Resolution (root group, command name, binding class; indexed at tree sync)
+            blocked_module = policy.blocked_module(settings.modules_for(cmd))
+            if blocked_module:
+                log.info(f"Blocking command /{cmd.qualified_name} in guild {guild_id}: module '{blocked_module}' is disabled.")
+                await interaction.response.send_message(
+                    f"❌ The `{blocked_module}` module is disabled in this server.",
+                    ephemeral=True
+                )
+                return False
+
+            # 2. Command Overrides Check (Unified Toggles & Cooldowns)
+            cmd_name = cmd.name
+            override = policy.override_for(cmd.qualified_name, cmd_name)
+            if override:
+                cooldown_val = override.get("cooldown", 0)
+                if cooldown_val < 0:
+                    log.info(f"Blocking command /{cmd.qualified_name} in guild {guild_id}: command is explicitly disabled.")
                     await interaction.response.send_message(
-                        f"❌ The `{blocked_module}` module is disabled in this server.",
+                        f"❌ The `/{cmd.qualified_name}` command is disabled in this server.",
                         ephemeral=True
                     )
                     return False
-                
-                # 2. Command Overrides Check (Unified Toggles & Cooldowns)
-                overrides = guild_cfg.get("command_overrides", [])
-                # Check both base name and qualified name
-                override = next((o for o in overrides if o.get("name") in [cmd_name, cmd.qualified_name]), None)
-                
-                if override:
-                    cooldown_val = override.get("cooldown", 0)
-                    if cooldown_val < 0:
-                        log.info(f"Blocking command /{cmd.qualified_name} in guild {guild_id}: command is explicitly disabled.")
+
+                # Dynamic Cooldown Override (an optional "burst" makes it a token bucket)
+                if cooldown_val > 0:
+                    limit = RateLimit(cooldown_val, burst=max(1, int(override.get("burst", 1))))
+                    retry_after = rate_limits.acquire(user_id, cmd_name, limit, scope="override")
+                    if retry_after:
                         await interaction.response.send_message(
-                            f"❌ The `/{cmd.qualified_name}` command is disabled in this server.",
+                            f"⏳ You are on cooldown for `/{cmd_name}`. Try again in {retry_after:.1f}s.",
                             ephemeral=True
                         )
                         return False
-                    
-                    # Dynamic Cooldown Override
-                    if cooldown_val > 0:
-                        now = time.time()
-                        if user_id not in bot._custom_cooldowns:
-                            bot._custom_cooldowns[user_id] = {}
-                        
-                        last_use = bot._custom_cooldowns[user_id].get(cmd_name, 0)
-                        if now - last_use < cooldown_val:
-                            retry_after = cooldown_val - (now - last_use)
-                            await interaction.response.send_message(
-                                f"⏳ You are on cooldown for `/{cmd_name}`. Try again in {retry_after:.1f}s.",
-                                ephemeral=True
-                            )
-                            return False
-                            
-                        bot._custom_cooldowns[user_id][cmd_name] = now
 
     return True
 
-BACKUP_DELAY_HOURS = 1
-async def delayed_backup_starter(delay_hours):
-    """Waits for delay_hours then starts the periodic backup loop."""
-    if IS_ALPHA:
-        log.warning("Skipping backup as this is an alpha version.")
-        return
-    await bot.wait_until_ready()
-    await asyncio.sleep(delay_hours * 3600)
-    asyncio.create_task(periodic_backup(delay_hours))
-    log.info(f"Periodic backup started after {delay_hours}h delay.")
+BACKUP_DELAY_HOURS = 1  # hours between periodic backups, the first one included
 
-async def cycle_activities():
+async def sync_activity():
+    """Rolls a presence for the current hour and applies it if it changed; scheduled every quarter hour."""
     global last_activity_signature
-    await bot.wait_until_ready()
-    while not bot.is_closed():
-        try:
-            now_hour = time.localtime().tm_hour
-            act = get_activity(now_hour)
-            sig = (act.name, act.type)
-
-            if sig != last_activity_signature:
-                last_activity_signature = sig
-                status = random.choice([discord.Status.online, discord.Status.idle, discord.Status.dnd])
-                await bot.change_activity_all(activity=act, status=status)
-                log.event(f"Changed presence to: {act.name} ({act.type})")
-            else:
-                log.debug(f"Activity signature unchanged: {act.name} ({act.type})")
-
-            await asyncio.sleep(900)  # Sleep for 15 minutes before checking again
-        except Exception as e:
-            log.error(f"Error in cycle_activities: {e}", exc_info=True)
-            await asyncio.sleep(60) # Short sleep on error to prevent busy-looping
-
-async def moderation_expiry_task():
-    await bot.wait_until_ready()
-    log.event("Moderation expiry task started.")
-
-    while not bot.is_closed():
-        try:
-            now = int(time.time())
-            # Fetch all expired cases at once
-            expired_cases = await get_expired_cases(None, "ban", now)
-            # expected structure: [(guild_id, user_id), ...] when guild_id is None
-
-            if not expired_cases:
-                await asyncio.sleep(90 + random.randint(0, 10))  # no rush
-                continue
-
-            guild_map = {}
-            for guild_id, user_id in expired_cases:
-                guild_map.setdefault(guild_id, []).append(user_id)
-
-            for guild_id, user_ids in guild_map.items():
-                guild = bot.get_guild(guild_id)
-                if not guild:
-                    continue
-
-                for user_id in user_ids:
-                    try:
-                        user = await bot.fetch_user(user_id)
-                        await guild.unban(user, reason="Ban expired")
-                        log.trace(f"Unbanned {user} ({user_id}) from {guild.name}")
-                    except discord.NotFound:
-                        log.warning(f"User {user_id} not found when unbanning.")
-                    except Exception as e:
-                        log.critical(f"Failed to unban {user_id} in {guild_id}: {e}")
-
-            # sleep slightly randomized to desync ticks
-            await asyncio.sleep(60 + random.randint(5, 20))
-
-        except Exception as e:
-            log.critical(f"moderation_expiry_task crashed: {e}")
-            await asyncio.sleep(30) 
-
-async def kill_all_tasks():
-    current = asyncio.current_task()
-    for task in asyncio.all_tasks():
-        if task is current: continue
-        task.cancel()
-    await asyncio.sleep(1)
+    now_hour = time.localtime().tm_hour
+    act = get_activity(now_hour)
+    sig = (act.name, act.type)
+
+    if sig != last_activity_signature:
+        last_activity_signature = sig
+        status = random.choice([discord.Status.online, discord.Status.idle, discord.Status.dnd])
+        await bot.change_activity_all(activity=act, status=status)
+        log.event(f"Changed presence to: {act.name} ({act.type})")
+    else:
+        log.debug(f"Activity signature unchanged: {act.name} ({act.type})")
@@ -45,49 +45,52 @@ async def _ping_once(session: aiohttp.ClientSession, url: str) -> float:
     log.trace(f"Ping to {url} took {duration:.2f}ms")
     return duration
 
-async def _loop(interval: float, session: Optional[aiohttp.ClientSession] = None):
-    global _CACHE
-    log.info("Cloudflare ping loop started (interval=%s)", interval)
-    while True:
+async def refresh_cache(session: Optional[aiohttp.ClientSession] = None):
+    """Ping Cloudflare once and store the results in the cache. Never raises."""
+    try:
+        # Use provided session or create a temporary one
+        use_shared = session is not None and not session.closed
+        if use_shared:
+            ping_session = session
+        else:
+            ping_session = aiohttp.ClientSession()
+        
         try:
-            # Use provided session or create a temporary one
-            use_shared = session is not None and not session.closed
-            if use_shared:
-                ping_session = session
-            else:
-                ping_session = aiohttp.ClientSession()
-            
             try:
+                v4 = await _ping_once(ping_session, f"https://{CLOUD_FLARE_IPV4}/cdn-cgi/trace")
+            except Exception as e:
+                v4 = None
+                log.warning("CF IPv4 ping failed: %s", e)
+            v6 = None
+            if not IS_DOCKER:
                 try:
-                    v4 = await _ping_once(ping_session, f"https://{CLOUD_FLARE_IPV4}/cdn-cgi/trace")
+                    v6 = await _ping_once(ping_session, f"https://[{CLOUD_FLARE_IPV6}]/cdn-cgi/trace")
                 except Exception as e:
-                    v4 = None
-                    log.warning("CF IPv4 ping failed: %s", e)
-                v6 = None
-                if not IS_DOCKER:
-                    try:
-                        v6 = await _ping_once(ping_session, f"https://[{CLOUD_FLARE_IPV6}]/cdn-cgi/trace")
-                    except Exception as e:
-                        v6 = None
-                        log.warning("CF IPv6 ping failed: %s", e)
-                else:
-                    log.debug("Skipping IPv6 ping (unsupported in Docker).")
-                async with _CACHE_LOCK:
-                    _CACHE["ipv4"] = v4
-                    _CACHE["ipv6"] = v6
-                    _CACHE["ts"] = time.time()
-                    _CACHE["error"] = None
-                    v4_str = f"{v4:.2f}ms" if v4 is not None else "N/A"
-                    v6_str = f"{v6:.2f}ms" if v6 is not None else "N/A"
-                    log.successtrace(f"Updated CF cache: v4={v4_str}, v6={v6_str}")
-            finally:
-                # Only close if we created a temporary session
-                if not use_shared:
-                    await ping_session.close()
-        except Exception as e:
-            log.warning("Unexpected error in Cloudflare ping loop: %s", e)
+                    v6 = None
+                    log.warning("CF IPv6 ping failed: %s", e)
+            else:
+                log.debug("Skipping IPv6 ping (unsupported in Docker).")
             async with _CACHE_LOCK:
-                _CACHE["error"] = str(e)
+                _CACHE["ipv4"] = v4
+                _CACHE["ipv6"] = v6
+                _CACHE["ts"] = time.time()
+                _CACHE["error"] = None
+                v4_str = f"{v4:.2f}ms" if v4 is not None else "N/A"
+                v6_str = f"{v6:.2f}ms" if v6 is not None else "N/A"
+                log.successtrace(f"Updated CF cache: v4={v4_str}, v6={v6_str}")
+        finally:
+            # Only close if we created a temporary session
+            if not use_shared:
+                await ping_session.close()
+    except Exception as e:
+        log.warning("Unexpected error in Cloudflare ping loop: %s", e)
+        async with _CACHE_LOCK:
+            _CACHE["error"] = str(e)
+
+async def _loop(interval: float, session: Optional[aiohttp.ClientSession] = None):
+    log.info("Cloudflare ping loop started (interval=%s)", interval)
+    while True:
+        await refresh_cache(session)
         await asyncio.sleep(interval)
 
 def ensure_started(interval: int = CLOUD_FLARE_PING_INTERVAL, session: Optional[aiohttp.ClientSession] = None) -> asyncio.Task:
@@ -0,0 +1,207 @@
+# Scheduled SQLite upkeep for economy.db and moderator.db: ANALYZE, PRAGMA optimize and
+# incremental vacuum, run in small time-boxed steps and only while the bot is quiet.
+# Every pass records size, freelist and fragmentation before and after for the dashboard.
+
+# Standard Library Imports
+import asyncio
+import collections
+import time
+from typing import Optional
+
+# Local Imports
+from database import manager as db_module
+from database import get_database_stats
+from logging_modules.custom_logger import get_logger
+
+log = get_logger()
+
+MAINTENANCE_INTERVAL = 6 * 3600        # seconds between completed passes
+MAINTENANCE_CHECK_INTERVAL = 600       # seconds between checks for a due pass and a quiet bot
+MAINTENANCE_QUIET_WINDOW = 300         # seconds of command history the quiet check looks at
+MAINTENANCE_QUIET_RATE = 5.0           # commands per minute under which the bot counts as quiet
+MAINTENANCE_PASS_BUDGET = 30.0         # seconds of work per pass; whatever is left waits for the next one
+MAINTENANCE_STEP_BUDGET = 0.05         # target seconds for one incremental vacuum step
+MAINTENANCE_STEP_PAUSE = 0.25          # seconds yielded to commands between steps
+MAINTENANCE_ANALYSIS_LIMIT = 1000      # rows ANALYZE samples per index, keeps it bounded on big tables
+MAINTENANCE_VACUUM_PAGES = 128         # pages released by the first incremental vacuum step
+MAINTENANCE_VACUUM_MAX_PAGES = 4096
+MAINTENANCE_CONVERT_MAX_BYTES = 64 * 1024 * 1024  # files up to this size get the one-off VACUUM to incremental mode
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+class DatabaseMaintenance:
+    """
+    Keeps planner statistics fresh and hands free pages back to the filesystem.
+
+    Usage:
+        maintenance = DatabaseMaintenance()
+        scheduler.every("db_maintenance", MAINTENANCE_CHECK_INTERVAL, maintenance.run_if_due,
+                        initial_delay=MAINTENANCE_CHECK_INTERVAL)
+
+        # From the global interaction check, so passes wait for quiet periods:
+        maintenance.note_command()
+
+        # Dashboard metrics:
+        maintenance.metrics()
+    """
+
+    def __init__(self, *, interval: float = MAINTENANCE_INTERVAL, quiet_rate: float = MAINTENANCE_QUIET_RATE,
+                 quiet_window: float = MAINTENANCE_QUIET_WINDOW, pass_budget: float = MAINTENANCE_PASS_BUDGET):
+        self.interval = interval
+        self.quiet_rate = quiet_rate
+        self.quiet_window = quiet_window
+        self.pass_budget = pass_budget
+        self._commands = collections.deque()  # [second, count] buckets, at most quiet_window of them
+        self._last_completed: Optional[float] = None
+        self.last_report: dict = {}
+
+    # ----- Activity -----
+    def note_command(self, now: Optional[float] = None):
+        """Counts one command towards the recent command rate."""
+        second = int(time.monotonic() if now is None else now)
+        if self._commands and self._commands[-1][0] == second:
+            self._commands[-1][1] += 1
+        else:
+            self._commands.append([second, 1])
+        self._trim(second)
+
+    def _trim(self, now: float):
+        cutoff = now - self.quiet_window
+        while self._commands and self._commands[0][0] < cutoff:
+            self._commands.popleft()
+
+    def command_rate(self, now: Optional[float] = None) -> float:
+        """Commands per minute over the quiet window."""
+        self._trim(time.monotonic() if now is None else now)
+        return sum(count for _, count in self._commands) * 60 / self.quiet_window
+
+    def is_quiet(self) -> bool:
+        return self.command_rate() < self.quiet_rate
+
+    def is_due(self) -> bool:
+        return self._last_completed is None or time.monotonic() - self._last_completed >= self.interval
+
+    # ----- Passes -----
+    async def run_pass(self, *, force: bool = False) -> dict:
+        """
+        Maintains every open database until done, out of budget, or (unless force) the bot gets busy.
+
+        Returns:
+            dict: started_at, duration_s, completed and per-database before/after stats and steps.
+                  Also kept in last_report.
+        """
+        started = time.monotonic()
+        deadline = started + self.pass_budget
+        report = {"started_at": int(time.time()), "completed": True, "databases": {}}
+        for name, path, conn in db_module.db.open_connections():
+            if db_module.db.memory_store_of(conn):
+                continue  # In-memory shards are rewritten whole at every checkpoint, nothing to reclaim
+            before = await get_database_stats(conn, path)
+            steps = []
+            finished = await self._maintain(conn, before, steps, deadline, force)
+            after = await get_database_stats(conn, path)
+            report["databases"][name] = {"before": before, "after": after, "steps": steps}
+            freed = before["file_bytes"] - after["file_bytes"]
+            log.database(
+                f"Maintenance of {name}: {len(steps)} step(s), freelist {before['freelist_pages']} -> "
+                f"{after['freelist_pages']} pages, {freed / 1024:.1f} KiB released"
+            )
+            if not finished:
+                report["completed"] = False
+                break
+        report["duration_s"] = round(time.monotonic() - started, 3)
+        if report["completed"]:
+            self._last_completed = time.monotonic()
+        self.last_report = report
+        return report
+
+    async def _maintain(self, conn, stats, steps, deadline, force) -> bool:
+        """Runs the steps one database needs. Returns False when the pass was cut short."""
+        async def may_continue():
+            await asyncio.sleep(MAINTENANCE_STEP_PAUSE)
+            return time.monotonic() < deadline and (force or self.is_quiet())
+
+        # One-off switch of pre-existing files to incremental auto-vacuum; needs a full VACUUM,
+        # so only small files get it and only when no write is in flight on the shared connection
+        if (stats["auto_vacuum"] != AUTO_VACUUM_INCREMENTAL and stats["file_bytes"] <= MAINTENANCE_CONVERT_MAX_BYTES
+                and not conn.in_transaction):
+            await self._step(conn, steps, "convert_incremental", "PRAGMA auto_vacuum = INCREMENTAL", "VACUUM")
+            if not await may_continue():
+                return False
+
+        await conn.execute(f"PRAGMA analysis_limit = {int(MAINTENANCE_ANALYSIS_LIMIT)}")
+        async with conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'") as cursor:
+            analyzed = await cursor.fetchone()
+        if not analyzed:
+            # Never analyzed: optimize would skip tables without statistics
+            await self._step(conn, steps, "analyze", "ANALYZE")
+            if not await may_continue():
+                return False
+        await self._step(conn, steps, "optimize", "PRAGMA optimize")
+
+        async with conn.execute("PRAGMA auto_vacuum") as cursor:
+            incremental = (await cursor.fetchone())[0] == AUTO_VACUUM_INCREMENTAL
+        if not incremental:
+            return True
+        pages = MAINTENANCE_VACUUM_PAGES
+        vacuum = {"step": "incremental_vacuum", "seconds": 0.0, "pages": 0, "runs": 0}
+        try:
+            while True:
+                async with conn.execute("PRAGMA freelist_count") as cursor:
+                    free = (await cursor.fetchone())[0]
+                if not free:
+                    return True
+                if not await may_continue():
+                    return False
+                step_started = time.perf_counter()
+                # Every result row is one freed page; the pragma only runs as far as it is stepped
+                await conn.execute_fetchall(f"PRAGMA incremental_vacuum({int(min(pages, free))})")
+                elapsed = time.perf_counter() - step_started
+                vacuum["seconds"] = round(vacuum["seconds"] + elapsed, 4)
+                vacuum["pages"] += min(pages, free)
+                vacuum["runs"] += 1
+                # Size the next step so it stays around the step budget
+                if elapsed > MAINTENANCE_STEP_BUDGET:
+                    pages = max(pages // 2, 16)
+                elif elapsed < MAINTENANCE_STEP_BUDGET / 2:
+                    pages = min(pages * 2, MAINTENANCE_VACUUM_MAX_PAGES)
+        finally:
+            if vacuum["runs"]:
+                steps.append(vacuum)
+                # Freed pages sit in the WAL until a checkpoint truncates the main file
+                await self._step(conn, steps, "checkpoint", "PRAGMA wal_checkpoint(TRUNCATE)")
+
+    @staticmethod
+    async def _step(conn, steps, name, *statements):
+        started = time.perf_counter()
+        for statement in statements:
+            await conn.execute_fetchall(statement)
+        steps.append({"step": name, "seconds": round(time.perf_counter() - started, 4)})
+
+    def metrics(self) -> dict:
+        """Compact summary of the last pass for the status payload."""
+        databases = {
+            name: {
+                "file_bytes": entry["after"]["file_bytes"],
+                "freelist_pages": entry["after"]["freelist_pages"],
+                "fragmentation": entry["after"]["fragmentation"],
+                "released_bytes": entry["before"]["file_bytes"] - entry["after"]["file_bytes"],
+            }
+            for name, entry in self.last_report.get("databases", {}).items()
+        }
+        return {
+            "last_run": self.last_report.get("started_at"),
+            "duration_s": self.last_report.get("duration_s"),
+            "completed": self.last_report.get("completed"),
+            "command_rate": round(self.command_rate(), 2),
+            "databases": databases,
+        }
+
+    async def run_if_due(self):
+        """One scheduled check: runs a pass when one is due and the bot is quiet."""
+        if not self.is_due() or not self.is_quiet():
+            return
+        report = await self.run_pass()
+        if not report["completed"]:
+            log.info("Database maintenance paused (busy or out of budget); resuming at the next quiet check.")
@@ -0,0 +1,142 @@
+# Periodic distribution analytics over every balance for the dashboard: Gini coefficient,
+# percentiles, a log-bucketed histogram and debt figures, computed with NumPy from one
+# columnar read. Snapshots live in a fixed-size ring buffer for week-over-week deltas.
+
+# Standard Library Imports
+import asyncio
+import collections
+import time
+from typing import Optional
+
+# Third-Party Imports
+import numpy as np
+
+# Local Imports
+from database import get_balance_column
+from logging_modules.custom_logger import get_logger
+
+log = get_logger()
+
+ANALYTICS_INTERVAL = 3600                 # seconds between snapshots
+ANALYTICS_HISTORY = 8 * 24                # snapshots kept, a little over a week at the default interval
+ANALYTICS_WEEK = 7 * 86400
+ANALYTICS_PERCENTILES = (10, 25, 50, 75, 90, 99)
+ANALYTICS_TREND_POINTS = 24               # recent snapshots sent to the dashboard as a compact series
+
+
+def analyze_balances(balances: np.ndarray) -> dict:
+    """
+    Distribution figures for one balance column.
+
+    Gini is taken over non-negative wealth (debts count as zero), since the coefficient
+    is undefined for negative values. Histogram buckets are powers of ten: "debt", "0",
+    then "1" (1-9), "10" (10-99) and so on.
+    """
+    balances = np.asarray(balances, dtype=np.int64)
+    count = int(balances.size)
+    if not count:
+        return {"users": 0, "total": 0, "mean": 0.0, "gini": 0.0, "debtors": 0, "debt_total": 0,
+                "percentiles": {f"p{p}": 0 for p in ANALYTICS_PERCENTILES}, "histogram": {}}
+
+    # One sort serves everything: clipping keeps it ordered for Gini, and the
+    # debt / zero / positive ranges are contiguous slices found by binary search
+    ordered = np.sort(balances)
+    first_zero, first_positive = np.searchsorted(ordered, [0, 1])
+    wealth = np.clip(ordered, 0, None).astype(np.float64)
+    wealth_total = wealth.sum()
+    if wealth_total > 0:
+        # Sorted-rank form: G = 2 * sum(i * x_i) / (n * sum(x)) - (n + 1) / n, with i from 1
+        ranks = np.arange(1, count + 1, dtype=np.float64)
+        gini = float(2.0 * np.dot(ranks, wealth) / (count * wealth_total) - (count + 1) / count)
+    else:
+        gini = 0.0
+
+    histogram = {}
+    if first_zero:
+        histogram["debt"] = int(first_zero)
+    if first_positive > first_zero:
+        histogram["0"] = int(first_positive - first_zero)
+    decades = np.floor(np.log10(ordered[first_positive:])).astype(np.int64)
+    for decade, users in enumerate(np.bincount(decades)):
+        if users:
+            histogram[str(10 ** decade)] = int(users)
+
+    values = np.percentile(ordered, ANALYTICS_PERCENTILES)
+    return {
+        "users": count,
+        "total": int(balances.sum()),
+        "mean": round(float(balances.mean()), 2),
+        "gini": round(gini, 4),
+        "debtors": int(first_zero),
+        "debt_total": int(ordered[:first_zero].sum()),
+        "percentiles": {f"p{p}": round(float(v), 2) for p, v in zip(ANALYTICS_PERCENTILES, values)},
+        "histogram": histogram,
+    }
+
+
+class EconomyAnalytics:
+    """
+    Takes a distribution snapshot of the whole economy on an interval.
+
+    Usage:
+        analytics = EconomyAnalytics()
+        scheduler.every("economy_analytics", analytics.interval, analytics.take_snapshot)
+
+        # Status payload:
+        analytics.metrics()
+    """
+
+    def __init__(self, *, interval: float = ANALYTICS_INTERVAL, history: int = ANALYTICS_HISTORY):
+        self.interval = interval
+        self.snapshots = collections.deque(maxlen=history)
+
+    async def take_snapshot(self, now: Optional[float] = None) -> dict:
+        column = await get_balance_column()
+        balances = np.frombuffer(column, dtype=np.int64) if len(column) else np.empty(0, np.int64)
+        started = time.perf_counter()
+        # Tens of milliseconds at a million users; NumPy releases the GIL, so keep it off the event loop
+        snapshot = await asyncio.to_thread(analyze_balances, balances)
+        snapshot["compute_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        snapshot["ts"] = int(time.time() if now is None else now)
+        self.snapshots.append(snapshot)
+        log.trace(f"Economy analytics: {snapshot['users']} users, gini {snapshot['gini']}, "
+                  f"computed in {snapshot['compute_ms']} ms")
+        return snapshot
+
+    def week_over_week(self) -> Optional[dict]:
+        """Change since the newest snapshot at least a week older than the latest, or None without one."""
+        if not self.snapshots:
+            return None
+        latest = self.snapshots[-1]
+        cutoff = latest["ts"] - ANALYTICS_WEEK
+        baseline = None
+        for snapshot in self.snapshots:
+            if snapshot["ts"] > cutoff:
+                break
+            baseline = snapshot
+        if baseline is None:
+            return None
+        return {
+            "since": baseline["ts"],
+            "users": latest["users"] - baseline["users"],
+            "total": latest["total"] - baseline["total"],
+            "median": round(latest["percentiles"]["p50"] - baseline["percentiles"]["p50"], 2),
+            "gini": round(latest["gini"] - baseline["gini"], 4),
+            "debtors": latest["debtors"] - baseline["debtors"],
+        }
+
+    def metrics(self) -> dict:
+        """Latest snapshot, week-over-week deltas and a short trend series for the status payload."""
+        if not self.snapshots:
+            return {}
+        recent = list(self.snapshots)[-ANALYTICS_TREND_POINTS:]
+        return {
+            "latest": self.snapshots[-1],
+            "week_over_week": self.week_over_week(),
+            "trend": {
+                "ts": [s["ts"] for s in recent],
+                "gini": [s["gini"] for s in recent],
+                "median": [s["percentiles"]["p50"] for s in recent],
+                "total": [s["total"] for s in recent],
+            },
+        }
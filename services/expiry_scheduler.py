@@ -0,0 +1,187 @@
+# Deadline-driven scheduler for lifting timed moderation sanctions (bans).
+# Keeps the next pending expiries in a min-heap and sleeps until the soonest one,
+# instead of polling the cases table on a fixed interval.
+
+# Standard Library Imports
+import asyncio
+import heapq
+import math
+import time
+from typing import Optional
+
+# Third-Party Imports
+import discord
+
+# Local Imports
+from database import get_pending_expiries, resolve_cases
+from logging_modules.custom_logger import get_logger
+
+log = get_logger()
+
+EXPIRY_LOAD_BATCH = 500       # rows pulled from the DB per (re)load
+EXPIRY_MAX_BATCH = 25         # unbans processed per wake-up before yielding
+EXPIRY_GUILD_CONCURRENCY = 2  # parallel unban requests per guild
+EXPIRY_BATCH_PAUSE = 1.0      # seconds between consecutive full batches
+EXPIRY_RETRY_DELAY = 60       # seconds before retrying a failed unban or an unavailable guild
+EXPIRY_FORBIDDEN_RETRY = 900  # seconds before retrying where the bot lacked Ban Members
+EXPIRY_MAX_SLEEP = 3600       # re-check at least hourly to absorb clock jumps
+
+
+class ExpiryScheduler:
+    """
+    Lifts expired bans at their deadline.
+
+    Usage:
+        scheduler = ExpiryScheduler(bot)
+        asyncio.create_task(scheduler.run_forever())
+
+        # After inserting a timed case:
+        scheduler.schedule(guild_id, case_number, user_id, expiry)
+    """
+
+    def __init__(self, bot, *, action_type: str = "ban"):
+        self.bot = bot
+        self.action_type = action_type
+        self._heap: list[tuple[int, int, int, int]] = []  # (expiry, guild_id, case_number, user_id)
+        self._keys: set[tuple[int, int]] = set()
+        # Highest expiry loaded while the DB still had more rows; None means everything is in the heap
+        self._horizon: Optional[int] = None
+        self._loaded = False
+        self._next_reload = 0.0  # monotonic time of the next full re-read of the DB
+        self._wakeup = asyncio.Event()
+        self._guild_limits: dict[int, asyncio.Semaphore] = {}
+
+    def schedule(self, guild_id: int, case_number: int, user_id: int, expiry: int):
+        """Register a freshly inserted timed case and wake the loop if it is the new soonest."""
+        if not expiry or expiry <= 0:
+            return
+        if self._horizon is not None and expiry > self._horizon:
+            return  # The next (re)load picks it up from the DB
+        # Pushed even before (or during) the first load; _keys drops the duplicate the load brings
+        self._push(expiry, guild_id, case_number, user_id)
+        if self._heap[0][0] == expiry:
+            self._wakeup.set()
+
+    def _push(self, expiry, guild_id, case_number, user_id):
+        key = (guild_id, case_number)
+        if key in self._keys:
+            return
+        self._keys.add(key)
+        heapq.heappush(self._heap, (expiry, guild_id, case_number, user_id))
+
+    def _pop(self):
+        entry = heapq.heappop(self._heap)
+        self._keys.discard((entry[1], entry[2]))
+        return entry
+
+    async def _load(self, from_start: bool = False):
+        """
+        Fill the heap with the next batch of pending expiries from the DB.
+        from_start re-reads from the soonest pending row, picking up cases the
+        scheduler was never told about (inserted elsewhere, restored backups).
+        """
+        min_expiry = 0 if from_start else (self._horizon or 0)
+        rows = await get_pending_expiries(self.action_type, EXPIRY_LOAD_BATCH, min_expiry)
+        for expiry, guild_id, case_number, user_id in rows:
+            self._push(expiry, guild_id, case_number, user_id)
+        self._horizon = rows[-1][0] if len(rows) >= EXPIRY_LOAD_BATCH else None
+        self._loaded = True
+        self._next_reload = time.monotonic() + EXPIRY_MAX_SLEEP
+        log.trace(f"Expiry scheduler loaded {len(rows)} pending {self.action_type}(s)")
+
+    async def _sleep(self, timeout: Optional[float]):
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run_forever(self):
+        """Background loop. Never raises."""
+        await self.bot.wait_until_ready()
+        log.event("Moderation expiry scheduler started.")
+
+        while not self.bot.is_closed():
+            try:
+                if not self._loaded or time.monotonic() >= self._next_reload:
+                    await self._load(from_start=True)
+                elif self._horizon is not None and (not self._heap or self._heap[0][0] > self._horizon):
+                    # Nothing left inside the loaded range (retries can sit beyond it): read the next batch
+                    await self._load()
+
+                if not self._heap:
+                    await self._sleep(EXPIRY_MAX_SLEEP)
+                    continue
+
+                delay = self._heap[0][0] - time.time()
+                if delay > 0:
+                    await self._sleep(min(delay, EXPIRY_MAX_SLEEP))
+                    continue
+
+                now = time.time()
+                due = []
+                while self._heap and self._heap[0][0] <= now and len(due) < EXPIRY_MAX_BATCH:
+                    due.append(self._pop())
+                await self._process(due)
+
+                if self._heap and self._heap[0][0] <= time.time():
+                    await asyncio.sleep(EXPIRY_BATCH_PAUSE)
+
+            except Exception as e:
+                log.critical(f"Moderation expiry scheduler crashed: {e}")
+                await asyncio.sleep(30)
+
+    async def _process(self, due):
+        """Unban a batch of due entries, grouped per guild with bounded concurrency."""
+        by_guild: dict[int, list] = {}
+        for entry in due:
+            by_guild.setdefault(entry[1], []).append(entry)
+
+        resolved = []
+        retry = []
+        for guild_id, entries in by_guild.items():
+            guild = self.bot.get_guild(guild_id)
+            if not guild:
+                # Outage, shard reconnect or a temporary kick: the ban still has to be lifted later
+                log.warning(f"Guild {guild_id} is unavailable; retrying {len(entries)} expired "
+                            f"{self.action_type}(s) in {EXPIRY_RETRY_DELAY}s.")
+                retry.extend((e, EXPIRY_RETRY_DELAY) for e in entries)
+                continue
+            results = await asyncio.gather(*(self._unban(guild, e) for e in entries))
+            for entry, retry_delay in zip(entries, results):
+                if retry_delay is None:
+                    resolved.append((entry[1], entry[2]))
+                else:
+                    retry.append((entry, retry_delay))
+
+        await resolve_cases(resolved)
+        for (_, guild_id, case_number, user_id), retry_delay in retry:
+            self._push(math.ceil(time.time() + retry_delay), guild_id, case_number, user_id)
+
+    async def _unban(self, guild: discord.Guild, entry) -> Optional[float]:
+        """Returns None when the case is done with (unbanned or nothing to do), else seconds until a retry."""
+        _, guild_id, _, user_id = entry
+        limit = self._guild_limits.setdefault(guild_id, asyncio.Semaphore(EXPIRY_GUILD_CONCURRENCY))
+        async with limit:
+            try:
+                await guild.unban(discord.Object(id=user_id), reason="Ban expired")
+                log.trace(f"Unbanned {user_id} from {guild.name}")
+                return None
+            except discord.NotFound:
+                log.warning(f"User {user_id} was not banned in {guild_id} when the ban expired.")
+                return None
+            except discord.Forbidden:
+                log.warning(f"Missing permission to lift expired ban of {user_id} in {guild_id}; "
+                            f"retrying in {EXPIRY_FORBIDDEN_RETRY}s.")
+                return EXPIRY_FORBIDDEN_RETRY
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    # Rescheduled rather than slept on, so the guild's slot is free meanwhile
+                    retry_after = getattr(e, "retry_after", None) or 5
+                    log.warning(f"Rate limited while unbanning in {guild_id}, retrying in {retry_after}s.")
+                    return retry_after
+                log.critical(f"Failed to unban {user_id} in {guild_id}: {e}")
+                return EXPIRY_RETRY_DELAY
+            except Exception as e:
+                log.critical(f"Failed to unban {user_id} in {guild_id}: {e}")
+                return EXPIRY_RETRY_DELAY
@@ -0,0 +1,385 @@
+# One owner for every background loop. Periodic work is registered as interval or cron jobs
+# (jitter, overlap prevention, a missed-run policy, per-job runtime and failure metrics);
+# long-running event-driven loops are registered as supervised services. Shutdown stops
+# scheduling and lets in-flight runs finish before anything is cancelled.
+
+# Standard Library Imports
+import asyncio
+import datetime
+import inspect
+import random
+import time
+from typing import Awaitable, Callable, Optional
+
+# Local Imports
+from logging_modules.custom_logger import get_logger
+
+log = get_logger()
+
+SCHEDULER_MAX_SLEEP = 300          # seconds; long sleeps are re-checked this often to absorb clock jumps
+SCHEDULER_SHUTDOWN_TIMEOUT = 10    # seconds in-flight runs get to finish at shutdown before being cancelled
+SERVICE_RESTART_DELAY = 30         # seconds before a crashed service is started again
+
+MISSED_SKIP = "skip"               # slots that passed while the job could not run are dropped
+MISSED_RUN_ONCE = "run_once"       # ... or folded into a single run as soon as the job is free
+
+
+class IntervalSchedule:
+    """Fixed-rate slots every `seconds`, anchored at the first run."""
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError(f"Interval must be positive, got {seconds}")
+        self.seconds = seconds
+        self.expression = f"every {seconds:g}s"
+
+    def next_after(self, ts: float) -> float:
+        return ts + self.seconds
+
+    def catch_up(self, slot: float, now: float, coalesce: bool) -> tuple:
+        """
+        Moves a slot that is already in the past forward.
+
+        Returns:
+            tuple: (slot to run at, slots missed)
+        """
+        if slot > now:
+            return slot, 0
+        passed = int((now - slot) // self.seconds) + 1
+        if coalesce:
+            return slot + (passed - 1) * self.seconds, passed - 1
+        return slot + passed * self.seconds, passed
+
+
+class CronSchedule:
+    """
+    Five-field cron expression in local time: minute, hour, day of month, month, day of week.
+
+    Fields take *, numbers, a-b ranges, /n steps and comma lists ("*/15 * * * *",
+    "0 3 * * 1-5"); day of week 0 and 7 are Sunday. As in cron, when both day fields
+    are restricted a day matching either one runs.
+    """
+
+    _BOUNDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got {expression!r}")
+        self.expression = expression
+        try:
+            parsed = [self._parse(field, low, high) for field, (low, high) in zip(fields, self._BOUNDS)]
+        except ValueError as e:
+            raise ValueError(f"Invalid cron expression {expression!r}: {e}") from None
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = frozenset(day % 7 for day in weekdays)
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+        if not any(self._day_matches(datetime.date(2000 + year, month, 1) + datetime.timedelta(days=offset))
+                   for year in range(8) for month in self.months for offset in range(31)):
+            raise ValueError(f"Cron expression {expression!r} never matches")
+
+    @staticmethod
+    def _parse(field, low, high):
+        values = set()
+        for part in field.split(","):
+            body, slash, step = part.partition("/")
+            step = int(step) if slash else 1
+            if body == "*":
+                start, end = low, high
+            elif "-" in body:
+                start, end = (int(value) for value in body.split("-", 1))
+            else:
+                start = int(body)
+                end = high if slash else start
+            if step < 1 or not low <= start <= end <= high:
+                raise ValueError(f"{part!r} is outside {low}-{high}")
+            values.update(range(start, end + 1, step))
+        return frozenset(values)
+
+    def _day_matches(self, day):
+        weekday = (day.weekday() + 1) % 7  # Python counts from Monday, cron from Sunday
+        if self._any_day:
+            return weekday in self.weekdays
+        if self._any_weekday:
+            return day.day in self.days
+        return day.day in self.days or weekday in self.weekdays
+
+    def next_after(self, ts: float) -> float:
+        """First matching minute strictly after ts, as a Unix timestamp."""
+        moment = datetime.datetime.fromtimestamp(ts).replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        # Skips whole months, days and hours that cannot match, so a lookup is a few dozen steps
+        while True:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + datetime.timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + datetime.timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += datetime.timedelta(minutes=1)
+            else:
+                return moment.timestamp()
+
+    def catch_up(self, slot: float, now: float, coalesce: bool) -> tuple:
+        """Same contract as IntervalSchedule.catch_up."""
+        passed, last = 0, slot
+        while slot <= now:
+            passed, last = passed + 1, slot
+            slot = self.next_after(slot)
+        if coalesce and passed:
+            return last, passed - 1
+        return slot, passed
+
+
+class Job:
+    """A registered job or service and its counters. Only the scheduler mutates it."""
+
+    def __init__(self, name, func, schedule=None, *, initial_delay=None, jitter=0.0, missed=MISSED_SKIP,
+                 retry_delay=None, start_after=None, restart_delay=SERVICE_RESTART_DELAY):
+        if missed not in (MISSED_SKIP, MISSED_RUN_ONCE):
+            raise ValueError(f"Unknown missed-run policy {missed!r}")
+        self.name = name
+        self.func = func
+        self.schedule = schedule
+        self.initial_delay = initial_delay
+        self.jitter = jitter
+        self.missed_policy = missed
+        self.retry_delay = retry_delay
+        self.start_after = start_after
+        self.restart_delay = restart_delay
+        self.task: Optional[asyncio.Task] = None      # the driver (or the service itself)
+        self.run_task: Optional[asyncio.Task] = None  # the current run of a job
+        self.next_run: Optional[float] = None
+        self.runs = 0
+        self.failures = 0
+        self.overlaps = 0
+        self.missed = 0
+        self.last_run: Optional[float] = None
+        self.last_duration = 0.0
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+        self.last_error: Optional[str] = None
+        self.last_failed = False
+
+    @property
+    def kind(self):
+        if self.schedule is None:
+            return "service"
+        return "cron" if isinstance(self.schedule, CronSchedule) else "interval"
+
+    @property
+    def running(self):
+        task = self.task if self.schedule is None else self.run_task
+        return task is not None and not task.done()
+
+    def metrics(self) -> dict:
+        return {
+            "kind": self.kind,
+            "schedule": self.schedule.expression if self.schedule else None,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "overlaps": self.overlaps,
+            "missed": self.missed,
+            "last_run": int(self.last_run) if self.last_run else None,
+            "next_run": int(self.next_run) if self.next_run and self.schedule else None,
+            "last_duration_s": round(self.last_duration, 4),
+            "avg_duration_s": round(self.total_duration / self.runs, 4) if self.runs else 0.0,
+            "max_duration_s": round(self.max_duration, 4),
+            "last_error": self.last_error,
+        }
+
+
+class JobScheduler:
+    """
+    Runs every background job of the bot.
+
+    Usage:
+        scheduler = JobScheduler()
+        scheduler.every("ledger_flush", 5, flush_ledger, initial_delay=5)
+        scheduler.cron("activities", "0 * * * *", sync_activity, run_at_start=True)
+        scheduler.service("effects", run_effects_scheduler)
+        scheduler.start()
+        ...
+        await scheduler.shutdown()
+
+    Job slots are fixed-rate: a run that is still going when its next slot comes up is
+    never started twice. With MISSED_SKIP that slot is dropped (counted in "overlaps");
+    with MISSED_RUN_ONCE the job runs again as soon as the current run ends. Slots that
+    passed while the event loop stalled or the host slept follow the same policy
+    (counted in "missed"). Jitter delays each run by up to that many seconds without
+    moving the slots.
+    """
+
+    def __init__(self):
+        self.jobs: dict[str, Job] = {}
+        self._started = False
+        self._stopping = asyncio.Event()
+
+    # ----- Registration -----
+    def every(self, name: str, seconds: float, func: Callable[[], Awaitable], *, initial_delay: float = 0.0,
+              **options) -> Job:
+        """Runs func (a coroutine function, or a plain one for quick work) every `seconds`, the first time after initial_delay."""
+        return self._add(Job(name, func, IntervalSchedule(seconds), initial_delay=initial_delay, **options))
+
+    def cron(self, name: str, expression: str, func: Callable[[], Awaitable], *, run_at_start: bool = False,
+             **options) -> Job:
+        """Runs func at every minute matching a cron expression, plus once at start if asked."""
+        return self._add(Job(name, func, CronSchedule(expression), initial_delay=0.0 if run_at_start else None,
+                             **options))
+
+    def service(self, name: str, func: Callable[[], Awaitable], *, restart_delay: float = SERVICE_RESTART_DELAY,
+                start_after: Optional[Callable[[], Awaitable]] = None) -> Job:
+        """Runs a long-lived coroutine (its own loop), restarting it if it crashes."""
+        return self._add(Job(name, func, restart_delay=restart_delay, start_after=start_after))
+
+    def _add(self, job):
+        if job.name in self.jobs:
+            raise ValueError(f"Duplicate scheduled job: {job.name}")
+        self.jobs[job.name] = job
+        if self._started:
+            self._launch(job)
+        return job
+
+    def remove(self, name: str):
+        """Unregisters a job (e.g. when its cog unloads), cancelling it if it is running."""
+        job = self.jobs.pop(name, None)
+        if job is None:
+            return
+        for task in (job.task, job.run_task):
+            if task is not None:
+                task.cancel()
+
+    # ----- Lifecycle -----
+    def start(self):
+        """Starts every registered job; jobs added later start right away."""
+        if self._started:
+            return
+        self._started = True
+        for job in self.jobs.values():
+            self._launch(job)
+        log.event(f"Job scheduler started with {len(self.jobs)} job(s).")
+
+    def _launch(self, job):
+        driver = self._supervise(job) if job.schedule is None else self._drive(job)
+        job.task = asyncio.create_task(driver, name=f"scheduler:{job.name}")
+
+    async def shutdown(self, timeout: float = SCHEDULER_SHUTDOWN_TIMEOUT) -> dict:
+        """
+        Stops scheduling, gives in-flight runs `timeout` seconds to finish, then cancels
+        what is left along with every service.
+
+        Returns:
+            dict: names of the runs that "finished" and of the jobs that were "cancelled"
+        """
+        self._stopping.set()
+        drivers = [job.task for job in self.jobs.values() if job.task is not None]
+        runs = {job.run_task: name for name, job in self.jobs.items() if job.running and job.schedule is not None}
+        for job in self.jobs.values():
+            if job.schedule is not None and job.task is not None:
+                job.task.cancel()  # only ever sleeping or waiting on its run, never inside one
+
+        finished, cancelled = [], []
+        if runs:
+            log.info(f"Waiting up to {timeout}s for running job(s): {', '.join(runs.values())}")
+            done, pending = await asyncio.wait(runs, timeout=timeout)
+            finished = [runs[task] for task in done]
+            for task in pending:
+                task.cancel()
+                cancelled.append(runs[task])
+        for job in self.jobs.values():
+            if job.schedule is None and job.running:
+                job.task.cancel()
+                cancelled.append(job.name)
+        await asyncio.gather(*drivers, *runs, return_exceptions=True)
+        self._started = False
+        log.info(f"Job scheduler stopped ({len(finished)} run(s) finished, {len(cancelled)} cancelled).")
+        return {"finished": finished, "cancelled": cancelled}
+
+    async def _sleep_until(self, deadline):
+        """Sleeps until a wall-clock deadline. Returns False if shutdown began first."""
+        while not self._stopping.is_set():
+            delay = deadline - time.time()
+            if delay <= 0:
+                return True
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=min(delay, SCHEDULER_MAX_SLEEP))
+            except asyncio.TimeoutError:
+                pass
+        return False
+
+    # ----- Jobs -----
+    async def _drive(self, job):
+        if job.start_after:
+            await job.start_after()
+        now = time.time()
+        slot = now + job.initial_delay if job.initial_delay is not None else job.schedule.next_after(now)
+        due = slot
+        coalesce = job.missed_policy == MISSED_RUN_ONCE
+        while True:
+            job.next_run = due
+            if not await self._sleep_until(due + (random.uniform(0, job.jitter) if job.jitter else 0)):
+                return
+            run = job.run_task = asyncio.create_task(self._run(job), name=f"job:{job.name}")
+            retrying, due = due != slot, None
+            upcoming = slot if retrying else job.schedule.next_after(slot)
+
+            # Wait for the run, but only until the next slot comes up
+            while not (await asyncio.wait({run}, timeout=max(0.0, upcoming - time.time())))[0]:
+                if coalesce:
+                    await asyncio.wait({run})
+                    break
+                job.overlaps += 1
+                log.warning(f"Job '{job.name}' is still running at its next slot; skipping that run.")
+                upcoming = job.schedule.next_after(upcoming)
+
+            slot, missed = job.schedule.catch_up(upcoming, time.time(), coalesce)
+            if missed:
+                job.missed += missed
+                log.warning(f"Job '{job.name}' missed {missed} run(s).")
+            due = slot
+            if job.last_failed and job.retry_delay is not None and not retrying:
+                due = min(slot, time.time() + job.retry_delay)
+
+    async def _run(self, job):
+        job.last_run = time.time()
+        started = time.perf_counter()
+        try:
+            result = job.func()
+            if inspect.isawaitable(result):
+                await result
+            job.last_failed = False
+        except Exception as e:
+            job.failures += 1
+            job.last_failed = True
+            job.last_error = f"{type(e).__name__}: {e}"
+            log.error(f"Job '{job.name}' failed: {e}", exc_info=True)
+        finally:
+            elapsed = time.perf_counter() - started
+            job.runs += 1
+            job.last_duration = elapsed
+            job.total_duration += elapsed
+            job.max_duration = max(job.max_duration, elapsed)
+
+    # ----- Services -----
+    async def _supervise(self, job):
+        if job.start_after:
+            await job.start_after()
+        while True:
+            job.runs += 1  # starts, restarts included
+            job.last_run = time.time()
+            try:
+                await job.func()
+                log.info(f"Service '{job.name}' finished.")
+                return
+            except Exception as e:
+                job.failures += 1
+                job.last_error = f"{type(e).__name__}: {e}"
+                log.error(f"Service '{job.name}' crashed, restarting in {job.restart_delay}s: {e}", exc_info=True)
+            if not await self._sleep_until(time.time() + job.restart_delay):
+                return
+
+    def metrics(self) -> dict:
+        """Per-job counters for the status payload."""
+        return {name: job.metrics() for name, job in self.jobs.items()}
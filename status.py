@@ -27,7 +27,8 @@ import logging
 import platform
 import time
 import os
-from typing import TYPE_CHECKING, Any, Dict, Optional
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
 
 import aiohttp
 from cryptography.hazmat.primitives import hashes, serialization
@@ -138,14 +139,18 @@ class BotMonitor:
         self._start_time = time.monotonic()
         self.custom_metrics_callback = custom_metrics_callback
 
+    async def report_once(self):
+        """Collect and send one metrics payload. Never raises."""
+        try:
+            await self.reporter.send(self._collect_all())
+        except Exception as exc:
+            logger.error("Metric loop error: %s", exc)
+
     async def run_forever(self):
         """Launch the metric loop. Never raises."""
         await asyncio.sleep(15)  # Warm up cache
         while True:
-            try:
-                await self.reporter.send(self._collect_all())
-            except Exception as exc:
-                logger.error("Metric loop error: %s", exc)
+            await self.report_once()
             await asyncio.sleep(self.interval)
 
     def _collect_all(self) -> Dict[str, Any]:
@@ -205,6 +210,61 @@ class BotMonitor:
         return payload
 
 
+_BINDING_SUFFIXES = ("commands", "cog", "commandsgroup")
+
+
+def command_modules(cmd) -> Tuple[str, ...]:
+    """
+    Module names a command can be disabled under: its root group, its own name, and the
+    class it is bound to with "Commands"/"Cog" stripped (ShopCommands -> "shop").
+    """
+    names = []
+    if cmd.root_parent:
+        names.append(cmd.root_parent.name.lower())
+    names.append(cmd.name.lower())
+    binding = getattr(cmd, "binding", None)
+    if binding is not None:
+        binding_name = binding.__class__.__name__.lower()
+        for suffix in _BINDING_SUFFIXES:
+            if binding_name.endswith(suffix) and len(binding_name) > len(suffix):
+                binding_name = binding_name[:-len(suffix)]
+        names.append(binding_name)
+    return tuple(dict.fromkeys(names))
+
+
+class GuildPolicy:
+    """
+    One guild's dashboard settings compiled for the per-interaction check: a frozen set of
+    disabled modules and a read-only map from command name to its override. Built once
+    when the settings arrive, never mutated.
+    """
+
+    __slots__ = ("disabled_modules", "overrides")
+
+    def __init__(self, settings: Dict[str, Any]):
+        enabled = settings.get("enabled_modules") or {}
+        self.disabled_modules = frozenset(str(name).lower() for name, on in enabled.items() if on is False)
+        overrides = {}
+        for override in settings.get("command_overrides") or []:
+            name = override.get("name")
+            if name:
+                # First entry for a name wins, as with the old linear scan
+                overrides.setdefault(name, MappingProxyType(dict(override)))
+        self.overrides = MappingProxyType(overrides)
+
+    def blocked_module(self, modules: Tuple[str, ...]) -> Optional[str]:
+        """The first of a command's modules that is disabled here, if any."""
+        if self.disabled_modules:
+            for module in modules:
+                if module in self.disabled_modules:
+                    return module
+        return None
+
+    def override_for(self, qualified_name: str, name: str):
+        """The override naming the command, by qualified name first, then by its own name."""
+        return self.overrides.get(qualified_name) or self.overrides.get(name)
+
+
 class ConfigSync:
     """
     Pulls guild configs from the dashboard API on a periodic cadence.
@@ -220,6 +280,10 @@ class ConfigSync:
 
         # Later, in a command or event:
         settings = config_sync.get(guild_id)
+
+    Once the dashboard reports a config version, each sync asks only for the guilds
+    changed since it (`?since=<version>`), conditionally on the last ETag, and merges
+    them in place. Unversioned dashboards keep getting the full pull every time.
     """
 
     def __init__(
@@ -239,15 +303,21 @@ class ConfigSync:
         self.bot = bot
         self.interval = interval
         self._cache: Dict[str, Dict[str, Any]] = {}  # guild_id -> settings
+        self._policies: Dict[str, GuildPolicy] = {}  # guild_id -> compiled settings
+        self.command_modules: Dict[str, Tuple[str, ...]] = {}  # qualified name -> modules, see index_commands
         self._session: Optional[aiohttp.ClientSession] = None
         self._last_sync: float = 0
+        self._version: Optional[int] = None  # dashboard config version the cache is at (None: unversioned)
+        self._etag: Optional[str] = None
+        self.sync_stats = {"full": 0, "delta": 0, "not_modified": 0, "gaps": 0, "guilds_changed": 0, "bytes": 0}
         self.maintenance_mode: bool = False
         self._on_maintenance_cleared = on_maintenance_cleared
 
     async def _get_session(self) -> aiohttp.ClientSession:
         if self._session is None or self._session.closed:
             headers = {
-                "X-Bot-Token": os.getenv("DASHBOARD_BOT_SECRET", "molecular_internal_secret")
+                "X-Bot-Token": os.getenv("DASHBOARD_BOT_SECRET", "molecular_internal_secret"),
+                "Accept-Encoding": "gzip",
             }
             self._session = aiohttp.ClientSession(
                 headers=headers,
@@ -261,6 +331,38 @@ class ConfigSync:
             return {}
         return self._cache.get(str(guild_id), {})
 
+    def policy(self, guild_id: int | str) -> Optional[GuildPolicy]:
+        """Compiled config for a guild. None if it has none or in maintenance."""
+        if self.maintenance_mode:
+            return None
+        return self._policies.get(str(guild_id))
+
+    def _store(self, guild_id: int | str, settings: Dict[str, Any]):
+        self._cache[str(guild_id)] = settings
+        self._policies[str(guild_id)] = GuildPolicy(settings)
+
+    def index_commands(self, tree, guild_ids=()) -> int:
+        """
+        Resolves the modules of every global (and given guild's) app command once;
+        call after the tree is synced. Returns how many commands were indexed.
+        """
+        import discord
+
+        modules = {}
+        for guild in [None, *(discord.Object(id=guild_id) for guild_id in guild_ids)]:
+            for cmd in tree.walk_commands(guild=guild):
+                if isinstance(cmd, discord.app_commands.Command):
+                    modules[cmd.qualified_name] = command_modules(cmd)
+        self.command_modules = modules
+        return len(modules)
+
+    def modules_for(self, cmd) -> Tuple[str, ...]:
+        """A command's modules from the index, resolving (and remembering) commands added since."""
+        modules = self.command_modules.get(cmd.qualified_name)
+        if modules is None:
+            modules = self.command_modules[cmd.qualified_name] = command_modules(cmd)
+        return modules
+
     async def push_config(self, guild_id: int | str, settings: Dict[str, Any]):
         """Push internal state to the dashboard."""
         try:
@@ -270,7 +372,7 @@ class ConfigSync:
                 if resp.status == 200:
                     logger.info("ConfigSync: Successfully pushed state for guild %s", guild_id)
                     # Update local cache to match what we just pushed
-                    self._cache[str(guild_id)] = settings
+                    self._store(guild_id, settings)
                     return True
                 else:
                     logger.debug("Config push for guild %s returned %d", guild_id, resp.status)
@@ -292,8 +394,8 @@ class ConfigSync:
                     )
                     # Update local cache
                     for gid, settings in guilds_data.items():
-                        if gid not in self._cache:
-                            self._cache[str(gid)] = settings
+                        if str(gid) not in self._cache:
+                            self._store(gid, settings)
                     return True
                 else:
                     logger.debug("Bulk sync returned %d", resp.status)
@@ -310,7 +412,7 @@ class ConfigSync:
                 if resp.status == 200:
                     data = await resp.json()
                     settings = data.get("settings", {})
-                    self._cache[str(guild_id)] = settings
+                    self._store(guild_id, settings)
                     return settings
                 else:
                     logger.debug("Config pull for guild %s returned %d", guild_id, resp.status)
@@ -343,35 +445,117 @@ class ConfigSync:
                     self._last_sync = -1 
                 return
 
-            url = f"{self.api_url}/config/pull_all/{self.bot_id}"
-            async with session.get(url) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    # Keep local cache clean by replacing it entirely
-                    self._cache = data
-                    
-                    self._last_sync = time.monotonic()
-                    logger.info(
-                        "ConfigSync: Successfully synced config for %d guilds for bot '%s'",
-                        len(data), self.bot_id,
-                    )
-                    
-                    # If we just left maintenance, fire the callback so the bot
-                    # can re-seed any missing guilds into the dashboard.
-                    if was_in_maintenance and self._on_maintenance_cleared:
-                        logger.info("ConfigSync: Maintenance cleared — triggering re-seed.")
-                        try:
-                            asyncio.create_task(self._on_maintenance_cleared())
-                        except Exception as exc:
-                            logger.error("ConfigSync: Re-seed callback failed: %s", exc)
-
-                elif resp.status == 418:
-                    self.maintenance_mode = True
-                else:
-                    logger.debug("Bulk config pull returned %d", resp.status)
+            # A delta from our version when we have one; a full pull at first, after a gap,
+            # or when the dashboard can't serve the delta
+            synced = None
+            if self._version is not None:
+                synced = await self._pull_delta(session)
+            if synced is None:
+                synced = await self._pull_full(session)
+            if not synced:
+                return
+
+            self._last_sync = time.monotonic()
+            # If we just left maintenance, fire the callback so the bot
+            # can re-seed any missing guilds into the dashboard.
+            if was_in_maintenance and self._on_maintenance_cleared:
+                logger.info("ConfigSync: Maintenance cleared — triggering re-seed.")
+                try:
+                    asyncio.create_task(self._on_maintenance_cleared())
+                except Exception as exc:
+                    logger.error("ConfigSync: Re-seed callback failed: %s", exc)
         except Exception as exc:
             logger.warning("Bulk config pull failed: %s", exc)
 
+    def _conditional_headers(self) -> Dict[str, str]:
+        return {"If-None-Match": self._etag} if self._etag else {}
+
+    async def _read_json(self, resp):
+        body = await resp.read()
+        # Wire size: the gzip body when the dashboard compressed it, decoded size otherwise
+        self.sync_stats["bytes"] += resp.content_length or len(body)
+        return json.loads(body)
+
+    async def _pull_full(self, session) -> bool:
+        """Replaces the cache with every guild's config. Returns whether the dashboard answered."""
+        url = f"{self.api_url}/config/pull_all/{self.bot_id}"
+        async with session.get(url, headers=self._conditional_headers()) as resp:
+            if resp.status == 304:
+                self.sync_stats["not_modified"] += 1
+                return True
+            if resp.status == 418:
+                self.maintenance_mode = True
+                return False
+            if resp.status != 200:
+                logger.debug("Bulk config pull returned %d", resp.status)
+                return False
+            data = await self._read_json(resp)
+            etag = resp.headers.get("ETag")
+
+        # Versioned dashboards wrap the guilds; older ones send the bare guild map
+        if isinstance(data.get("guilds"), dict) and "version" in data:
+            guilds, self._version = data["guilds"], data["version"]
+        else:
+            guilds, self._version = data, None
+        self._etag = etag
+        # Keep local cache clean by replacing it entirely
+        self._cache = guilds
+        self._policies = {gid: GuildPolicy(settings) for gid, settings in guilds.items()}
+        self.sync_stats["full"] += 1
+        logger.info(
+            "ConfigSync: Successfully synced config for %d guilds for bot '%s'",
+            len(guilds), self.bot_id,
+        )
+        return True
+
+    async def _pull_delta(self, session) -> Optional[bool]:
+        """
+        Merges the guilds changed since our version into the cache.
+
+        Returns:
+            bool | None: whether the dashboard answered, or None when a full pull is needed
+            (no delta for that version, or the delta does not start where we are)
+        """
+        url = f"{self.api_url}/config/pull_all/{self.bot_id}"
+        async with session.get(url, params={"since": str(self._version)}, headers=self._conditional_headers()) as resp:
+            if resp.status == 304:
+                self.sync_stats["not_modified"] += 1
+                return True
+            if resp.status == 418:
+                self.maintenance_mode = True
+                return False
+            if resp.status != 200:
+                # 410 Gone: history no longer reaches our version; anything else: no delta support
+                logger.debug("Delta config pull since %s returned %d; pulling everything.", self._version, resp.status)
+                return None
+            data = await self._read_json(resp)
+            etag = resp.headers.get("ETag")
+
+        changed, removed = data.get("changed"), data.get("removed", [])
+        version = data.get("version")
+        if data.get("since") != self._version or not isinstance(changed, dict) or version is None or version < self._version:
+            logger.info("ConfigSync: Version gap (have %s, delta %s -> %s); pulling everything.",
+                        self._version, data.get("since"), version)
+            self.sync_stats["gaps"] += 1
+            return None
+
+        for gid, settings in changed.items():
+            self._store(gid, settings)
+        for gid in removed:
+            self._cache.pop(str(gid), None)
+            self._policies.pop(str(gid), None)
+        self._version, self._etag = version, etag
+        self.sync_stats["delta"] += 1
+        self.sync_stats["guilds_changed"] += len(changed) + len(removed)
+        if changed or removed:
+            logger.info("ConfigSync: Merged %d changed and %d removed guild config(s), now at version %s",
+                        len(changed), len(removed), version)
+        return True
+
+    def metrics(self) -> Dict[str, Any]:
+        """Sync counters for the status payload."""
+        return {"version": self._version, "guilds": len(self._cache), **self.sync_stats}
+
     async def run_forever(self):
         """Background loop. Never raises."""
         await asyncio.sleep(5)  # Wait for bot to be ready
@@ -5,3 +5,4 @@ import pytest
 def pytest_configure(config):
     """Set asyncio_mode to auto so all async tests/fixtures work without manual decoration."""
     config.addinivalue_line("markers", "asyncio: mark test as async")
+    config.addinivalue_line("markers", "disk: run on the on-disk SQLite files whatever TEST_DB_BACKEND says")
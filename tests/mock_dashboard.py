@@ -0,0 +1,110 @@
+# tests/mock_dashboard.py
+# Local stand-in for the dashboard's config endpoints, for ConfigSync tests.
+# Serves /config/maintenance and /config/pull_all/{bot_id} with versions, ETags,
+# `since` deltas and gzip bodies, and records every request it gets.
+
+import gzip
+import json
+
+from aiohttp import web
+
+
+class MockDashboard:
+    """
+    Usage:
+        dashboard = MockDashboard({"1": {...}})
+        await dashboard.start()
+        ... ConfigSync(api_url=dashboard.url, ...) ...
+        dashboard.update("1", {...})   # bumps the version
+        await dashboard.stop()
+
+    `history` limits how many versions back a delta can start; older `since`
+    values get 410 Gone. `versioned=False` serves the legacy bare guild map.
+    """
+
+    def __init__(self, guilds=None, history=50, versioned=True):
+        self.guilds = dict(guilds or {})
+        self.version = 1
+        self.history = history
+        self.versioned = versioned
+        self.maintenance = False
+        self.changes = []  # (version, guild_id, settings or None when removed)
+        self.requests = []  # (path, query dict, headers dict, status)
+        self._runner = None
+        self.url = None
+
+    def update(self, guild_id, settings):
+        self.version += 1
+        self.guilds[guild_id] = settings
+        self.changes.append((self.version, guild_id, settings))
+
+    def remove(self, guild_id):
+        self.version += 1
+        self.guilds.pop(guild_id, None)
+        self.changes.append((self.version, guild_id, None))
+
+    @property
+    def etag(self):
+        return f'"v{self.version}"'
+
+    def _respond(self, request, payload, status=200):
+        body = json.dumps(payload).encode()
+        headers = {"Content-Type": "application/json"}
+        if self.versioned:
+            headers["ETag"] = self.etag
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        return self._record(request, web.Response(body=body, status=status, headers=headers))
+
+    def _record(self, request, response):
+        self.requests.append((request.path, dict(request.query), dict(request.headers), response.status))
+        return response
+
+    async def _maintenance(self, request):
+        return self._record(request, web.json_response({"maintenance": self.maintenance}))
+
+    async def _pull_all(self, request):
+        if not self.versioned:
+            return self._respond(request, self.guilds)
+        if request.headers.get("If-None-Match") == self.etag:
+            return self._record(request, web.Response(status=304, headers={"ETag": self.etag}))
+
+        since = request.query.get("since")
+        if since is None:
+            return self._respond(request, {"version": self.version, "guilds": self.guilds})
+        since = int(since)
+        oldest = self.changes[-self.history][0] - 1 if len(self.changes) >= self.history else 0
+        if since < oldest or since > self.version:
+            return self._record(request, web.Response(status=410))
+        changed, removed = {}, []
+        for version, guild_id, settings in self.changes:
+            if version <= since:
+                continue
+            if settings is None:
+                changed.pop(guild_id, None)
+                removed.append(guild_id)
+            else:
+                changed[guild_id] = settings
+                if guild_id in removed:
+                    removed.remove(guild_id)
+        return self._respond(request, {"version": self.version, "since": since, "changed": changed, "removed": removed})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/config/maintenance", self._maintenance)
+        app.router.add_get("/config/pull_all/{bot_id}", self._pull_all)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    def pulls(self):
+        """(query, status) of every pull_all request so far."""
+        return [(query, status) for path, query, _, status in self.requests if path.startswith("/config/pull_all")]
@@ -3,8 +3,14 @@
 # Verifies economy operations, item effects, and the use_item fix.
 
 import asyncio
+import glob
+import json
 import os
+import shutil
+import sqlite3
 import sys
+import time
+import zipfile
 import pytest
 import aiosqlite
 
@@ -24,22 +30,37 @@ db_mod.MODERATOR_DB_PATH = os.path.join(_test_dir, "test_moderator.db")
 # Re-create the DatabaseManager with fresh connections
 db_mod.db = db_mod.DatabaseManager()
 
+import database.backup as backup_mod
+
+
+from database.backends import get_backend
+
+# Storage the tests run on: "memory" (in-memory SQLite through the same manager code) or
+# "sqlite" (the bot's files). Tests marked `disk` always get the files.
+TEST_DB_BACKEND = os.getenv("TEST_DB_BACKEND", "memory")
+
 
 @pytest.fixture(autouse=True)
-async def setup_db():
+async def setup_db(request):
     """Initialize clean test databases before each test."""
     # Close previous connections if any
     await db_mod.db.close()
     db_mod.db = db_mod.DatabaseManager()
+    db_mod.ledger = db_mod.LedgerBuffer()
+    db_mod.economy_locks = db_mod.UserLocks()
 
     # Remove old test files
     for path in [db_mod.ECONOMY_DB_PATH, db_mod.MODERATOR_DB_PATH]:
-        if os.path.exists(path):
-            os.remove(path)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    for segment in glob.glob(db_mod.ECONOMY_DB_PATH + "-journal-*"):
+        os.remove(segment)
 
-    await db_mod.init_databases()
+    backend = get_backend("sqlite" if request.node.get_closest_marker("disk") else TEST_DB_BACKEND)
+    await backend.init()
     yield
-    await db_mod.db.close()
+    await backend.close()
 
 
 # ===================== Economy Tests =====================
@@ -85,6 +106,40 @@ class TestEconomy:
         bal = await db_mod.get_balance(400)
         assert bal == 999
 
+    @pytest.mark.asyncio
+    async def test_add_user_reports_creation(self):
+        """add_user should say whether the upsert created the account."""
+        assert await db_mod.add_user(401, "Fresh") is True
+        assert await db_mod.add_user(401, "Fresh") is False
+
+    @pytest.mark.asyncio
+    async def test_atomic_deduct_refuses_debt(self):
+        """A conditional deduct should leave the balance untouched when funds are short."""
+        await db_mod.add_user(402, "Careful")
+        await db_mod.update_balance(402, 100)
+        assert await db_mod.atomic_deduct(402, 150) is False
+        assert await db_mod.atomic_deduct(402, 100) is True
+        assert await db_mod.get_balance(402) == 0
+        assert await db_mod.atomic_deduct(99998, 1) is False
+
+    @pytest.mark.asyncio
+    async def test_single_statement_helpers_survive_concurrent_commits(self):
+        """The RETURNING helpers must not be left in progress while another coroutine commits."""
+        conn = await db_mod.db.get_economy(403)
+
+        async def commit_loop():
+            for _ in range(60):
+                await conn.commit()
+                await asyncio.sleep(0)
+
+        async def account(user_id):
+            created = await db_mod.add_user(user_id, "Busy")
+            await db_mod.update_balance(user_id, 10)
+            return created, await db_mod.atomic_deduct(user_id, 10), await db_mod.decrement_gun_use(user_id)
+
+        results = await asyncio.gather(commit_loop(), *[account(403 + i) for i in range(20)])
+        assert results[1:] == [(True, True, None)] * 20
+
 
 # ===================== Shop & Item Tests =====================
 
@@ -118,6 +173,7 @@ class TestShopItems:
         await db_mod.add_user(501, "Broke")
         result = await db_mod.buy_item(501, 1, "Bragging Rights", 10000)
         assert result is False
+        assert await db_mod.get_user_items(501) == []
 
     @pytest.mark.asyncio
     async def test_buy_item_nonexistent_user(self):
@@ -126,6 +182,44 @@ class TestShopItems:
         assert result is False
 
 
+class TestItemCatalog:
+    def test_lookup_by_id_and_normalized_name(self):
+        """Names match case-, whitespace- and l33tspeak-insensitively."""
+        from database.items import CATALOG, get_item_by_id
+        assert get_item_by_id(10)["name"] == "Loaded Gun"
+        assert CATALOG.by_name("  L04DED   gun ")["id"] == 10
+        assert CATALOG.by_name("Hackatron 9900")["id"] == 8
+        assert CATALOG.by_name("nonexistent") is None
+        with pytest.raises(TypeError):
+            CATALOG.by_id(10)["price"] = 0
+
+    def test_duplicate_names_rejected(self):
+        """Two items that normalize to the same name would make lookups ambiguous."""
+        from database.items import ItemCatalog
+        with pytest.raises(ValueError):
+            ItemCatalog([{"id": 1, "name": "Taser"}, {"id": 2, "name": "t4ser"}])
+
+    def test_prefix_completion(self):
+        """Autocomplete matches the start of the name or of any word in it."""
+        from database.items import CATALOG
+        assert [item["name"] for item in CATALOG.complete("b")] == ["Bragging Rights", "Bolt Cutters"]
+        assert [item["id"] for item in CATALOG.complete("GU")] == [10]
+        assert CATALOG.complete("zzz") == []
+        assert len(CATALOG.complete("", limit=3)) == 3
+
+    @pytest.mark.asyncio
+    async def test_take_item_uses_single_row(self):
+        """Taking uses touches one row, refuses overdrafts and deletes exhausted items."""
+        await db_mod.add_user(560, "Giver")
+        await db_mod.add_user_item(560, 11, "Watermelon", uses_left=5)
+        assert await db_mod.take_item_uses(560, 11, 6) is None
+        assert (await db_mod.take_item_uses(560, 11, 2))["uses_left"] == 3
+        assert (await db_mod.get_user_item(560, 11))["uses_left"] == 3
+        assert (await db_mod.take_item_uses(560, 11, 3))["item_name"] == "Watermelon"
+        assert await db_mod.get_user_item(560, 11) is None
+        assert await db_mod.take_item_uses(560, 3, 1) is None
+
+
 # ===================== use_item Bug Fix Tests =====================
 
 class TestUseItem:
@@ -276,10 +370,18 @@ class TestGunDefense:
         await db_mod.add_user(702, "Shooter")
         await db_mod.add_user_item(702, 10, "Loaded Gun", uses_left=3)
 
-        await db_mod.decrement_gun_use(702)
+        assert await db_mod.decrement_gun_use(702) == 2
         remaining = await db_mod.check_gun_defense(702)
         assert remaining == 2
 
+    @pytest.mark.asyncio
+    async def test_decrement_gun_use_without_gun(self):
+        """Without a loaded gun there is nothing to fire."""
+        await db_mod.add_user(703, "Unarmed")
+        await db_mod.add_user_item(703, 10, "Loaded Gun", uses_left=0)
+        assert await db_mod.decrement_gun_use(703) is None
+        assert await db_mod.decrement_gun_use(704) is None
+
 
 # ===================== Moderation Tests =====================
 
@@ -320,3 +422,1448 @@ class TestModeration:
         await db_mod.edit_case_reason(4000, 1, "New Reason")
         case = await db_mod.get_case(4000, 1)
         assert case[3] == "New Reason"
+
+    @pytest.mark.asyncio
+    async def test_case_numbers_per_guild(self):
+        """Case counters are independent per guild."""
+        a1 = await db_mod.insert_case(5000, 100, "User1", "Reason", "warn", 200)
+        b1 = await db_mod.insert_case(5001, 100, "User1", "Reason", "warn", 200)
+        a2 = await db_mod.insert_case(5000, 101, "User2", "Reason", "warn", 200)
+        assert (a1, b1, a2) == (1, 1, 2)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_case_inserts_unique(self):
+        """Concurrent inserts across guilds must never collide on case numbers."""
+        results = await asyncio.gather(*[
+            db_mod.insert_case(6000 + (i % 3), i, f"User{i}", "Reason", "warn", 200)
+            for i in range(30)
+        ])
+        for guild in range(3):
+            numbers = sorted(r for i, r in enumerate(results) if i % 3 == guild)
+            assert numbers == list(range(1, 11))
+
+    @pytest.mark.asyncio
+    async def test_failed_insert_rolls_back(self):
+        """A failed insert must not leave a transaction open on the shared moderator connection."""
+        with pytest.raises(sqlite3.IntegrityError):
+            await db_mod.insert_case(6100, 100, "User1", "Reason", None, 200)
+        conn = await db_mod.db.get_moderator()
+        assert not conn.in_transaction
+        assert await db_mod.insert_case(6100, 100, "User1", "Reason", "warn", 200) == 1
+
+    @pytest.mark.asyncio
+    async def test_inserts_survive_concurrent_commits(self):
+        """INSERT ... RETURNING must not be left in progress while another coroutine commits."""
+        conn = await db_mod.db.get_moderator()
+
+        async def commit_loop():
+            for _ in range(50):
+                await conn.commit()
+                await asyncio.sleep(0)
+
+        results = await asyncio.gather(
+            commit_loop(),
+            *[db_mod.insert_case(6200, i, f"User{i}", "Reason", "warn", 200) for i in range(50)],
+        )
+        assert sorted(results[1:]) == list(range(1, 51))
+
+    @pytest.mark.asyncio
+    async def test_removed_case_number_not_reused(self):
+        """Deleting the newest case must not hand its number out again."""
+        await db_mod.insert_case(7000, 100, "User1", "Reason", "warn", 200)
+        await db_mod.insert_case(7000, 100, "User1", "Reason", "warn", 200)
+        await db_mod.remove_case(7000, 2)
+        c3 = await db_mod.insert_case(7000, 100, "User1", "Reason", "warn", 200)
+        assert c3 == 3
+
+    @pytest.mark.disk
+    @pytest.mark.asyncio
+    async def test_migration_upgrades_existing_db(self):
+        """An old moderator.db without counters/indexes gets migrated and seeded."""
+        await db_mod.db.close()
+        os.remove(db_mod.MODERATOR_DB_PATH)
+        with sqlite3.connect(db_mod.MODERATOR_DB_PATH) as legacy:
+            legacy.execute("""
+                CREATE TABLE cases (
+                    case_id INTEGER PRIMARY KEY AUTOINCREMENT, case_number INTEGER NOT NULL,
+                    guild_id INTEGER NOT NULL, user_id INTEGER NOT NULL, username TEXT,
+                    reason TEXT NOT NULL, action_type TEXT NOT NULL, timestamp INTEGER NOT NULL,
+                    moderator_id INTEGER NOT NULL, expiry INTEGER DEFAULT 0,
+                    UNIQUE (guild_id, case_number))
+            """)
+            legacy.execute("INSERT INTO cases (case_number, guild_id, user_id, username, reason, action_type, timestamp, moderator_id) VALUES (41, 8000, 1, 'u', 'r', 'warn', 0, 2)")
+        db_mod.db = db_mod.DatabaseManager()
+        await db_mod.init_databases()
+
+        conn = await db_mod.db.get_moderator()
+        async with conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'") as cursor:
+            indexes = {row[0] for row in await cursor.fetchall()}
+        assert {"idx_cases_guild_user", "idx_cases_expiry"} <= indexes
+        assert await db_mod.insert_case(8000, 1, "u", "r", "warn", 2) == 42
+
+
+# ===================== Expiry Scheduler Tests =====================
+
+class _FakeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+        self.name = f"Guild{guild_id}"
+        self.unbanned = []
+
+    async def unban(self, user, reason=None):
+        self.unbanned.append(user.id)
+
+
+class _FakeBot:
+    def __init__(self, guilds):
+        self._guilds = {g.id: g for g in guilds}
+
+    async def wait_until_ready(self):
+        return
+
+    def is_closed(self):
+        return False
+
+    def get_guild(self, guild_id):
+        return self._guilds.get(guild_id)
+
+
+class TestExpiryScheduler:
+    @pytest.mark.asyncio
+    async def test_pending_expiries_ordered_and_resolvable(self):
+        """Pending expiries come back soonest first and disappear once resolved."""
+        await db_mod.insert_case(9000, 1, "a", "r", "ban", 2, expiry=300)
+        await db_mod.insert_case(9000, 2, "b", "r", "ban", 2, expiry=100)
+        await db_mod.insert_case(9000, 3, "c", "r", "warn", 2)
+        rows = await db_mod.get_pending_expiries("ban")
+        assert [r[0] for r in rows] == [100, 300]
+
+        await db_mod.resolve_cases([(9000, 2)])
+        rows = await db_mod.get_pending_expiries("ban")
+        assert [r[3] for r in rows] == [1]
+
+    @pytest.mark.asyncio
+    async def test_scheduler_unbans_due_and_notified_cases(self):
+        """Due bans are lifted on load, newly scheduled ones wake the loop."""
+        from services.expiry_scheduler import ExpiryScheduler
+
+        guild = _FakeGuild(9100)
+        scheduler = ExpiryScheduler(_FakeBot([guild]))
+        await db_mod.insert_case(9100, 11, "a", "r", "ban", 2, expiry=int(time.time()) - 5)
+        await db_mod.insert_case(9100, 12, "b", "r", "ban", 2, expiry=int(time.time()) + 3600)
+
+        task = asyncio.create_task(scheduler.run_forever())
+        try:
+            for _ in range(50):
+                if guild.unbanned:
+                    break
+                await asyncio.sleep(0.02)
+            assert guild.unbanned == [11]
+
+            due_now = int(time.time()) - 1
+            case_num = await db_mod.insert_case(9100, 13, "c", "r", "ban", 2, expiry=due_now)
+            scheduler.schedule(9100, case_num, 13, due_now)
+            for _ in range(50):
+                if 13 in guild.unbanned:
+                    break
+                await asyncio.sleep(0.02)
+            assert guild.unbanned == [11, 13]
+        finally:
+            task.cancel()
+
+        rows = await db_mod.get_pending_expiries("ban")
+        assert [r[3] for r in rows] == [12]
+
+    @pytest.mark.asyncio
+    async def test_scheduler_rereads_db_and_keeps_early_schedules(self, monkeypatch):
+        """Cases the scheduler was never told about are found on the periodic re-read."""
+        import services.expiry_scheduler as expiry_mod
+        monkeypatch.setattr(expiry_mod, "EXPIRY_MAX_SLEEP", 0.1)
+
+        guild = _FakeGuild(9200)
+        scheduler = expiry_mod.ExpiryScheduler(_FakeBot([guild]))
+        # Scheduled before the first load: must not be dropped
+        scheduler.schedule(9200, 21, 21, int(time.time()) - 1)
+
+        task = asyncio.create_task(scheduler.run_forever())
+        try:
+            await asyncio.sleep(0.05)
+            await db_mod.insert_case(9200, 22, "b", "r", "ban", 2, expiry=int(time.time()) - 1)
+            for _ in range(50):
+                if 22 in guild.unbanned:
+                    break
+                await asyncio.sleep(0.02)
+            assert sorted(guild.unbanned) == [21, 22]
+        finally:
+            task.cancel()
+
+
+    @pytest.mark.asyncio
+    async def test_retries_do_not_hold_back_later_batches(self, monkeypatch):
+        """A failed unban retried past the loaded range must not stall the next batch, nor hold the guild's slot."""
+        from types import SimpleNamespace
+        import discord
+        import services.expiry_scheduler as expiry_mod
+        monkeypatch.setattr(expiry_mod, "EXPIRY_LOAD_BATCH", 2)
+        monkeypatch.setattr(expiry_mod, "EXPIRY_GUILD_CONCURRENCY", 1)
+
+        class _FlakyGuild(_FakeGuild):
+            async def unban(self, user, reason=None):
+                if user.id == 31:
+                    error = discord.HTTPException(SimpleNamespace(status=429, reason="Too Many Requests"), "slow down")
+                    error.retry_after = 30
+                    raise error
+                await super().unban(user, reason)
+
+        guild = _FlakyGuild(9300)
+        scheduler = expiry_mod.ExpiryScheduler(_FakeBot([guild]))
+        now = int(time.time())
+        for user_id, ago in ((31, 30), (32, 20), (33, 10)):
+            await db_mod.insert_case(9300, user_id, "u", "r", "ban", 2, expiry=now - ago)
+
+        task = asyncio.create_task(scheduler.run_forever())
+        try:
+            for _ in range(100):
+                if 33 in guild.unbanned:
+                    break
+                await asyncio.sleep(0.02)
+            assert sorted(guild.unbanned) == [32, 33]
+            assert scheduler._heap[0][2] == 1 and scheduler._heap[0][0] >= now + 30
+        finally:
+            task.cancel()
+
+    @pytest.mark.asyncio
+    async def test_unavailable_guild_and_missing_permission_are_retried(self):
+        """Neither an unavailable guild nor a Forbidden unban may resolve the case without lifting the ban."""
+        from types import SimpleNamespace
+        import discord
+        import services.expiry_scheduler as expiry_mod
+
+        class _LockedGuild(_FakeGuild):
+            async def unban(self, user, reason=None):
+                raise discord.Forbidden(SimpleNamespace(status=403, reason="Forbidden"), "Missing Permissions")
+
+        scheduler = expiry_mod.ExpiryScheduler(_FakeBot([_LockedGuild(9401)]))
+        now = int(time.time())
+        gone = await db_mod.insert_case(9400, 41, "u", "r", "ban", 2, expiry=now - 5)
+        locked = await db_mod.insert_case(9401, 42, "u", "r", "ban", 2, expiry=now - 5)
+        await scheduler._process([(now - 5, 9400, gone, 41), (now - 5, 9401, locked, 42)])
+
+        assert sorted(r[3] for r in await db_mod.get_pending_expiries("ban")) == [41, 42]
+        retries = {entry[3]: entry[0] for entry in scheduler._heap}
+        assert retries[41] >= now + expiry_mod.EXPIRY_RETRY_DELAY
+        assert retries[42] >= now + expiry_mod.EXPIRY_FORBIDDEN_RETRY
+
+# ===================== Timed Effects Tests =====================
+
+class TestTimedEffects:
+    @pytest.mark.asyncio
+    async def test_temporary_modifier_persisted_and_reverted(self):
+        """Resin Sample's boost is stored in active_effects and reverted in bulk on expiry."""
+        await db_mod.add_user(1100, "Resin")
+        await db_mod.add_user_item(1100, 11, "Watermelon", uses_left=5)
+        await db_mod.add_user_item(1100, 9, "Resintantoinem Sample", uses_left=1)
+
+        await db_mod.use_item(1100, 9)
+        assert await db_mod.get_robbery_modifier(1100) == 50
+        effects = await db_mod.get_active_effects(1100)
+        assert [e["kind"] for e in effects] == ["robbery_modifier"]
+
+        await db_mod.process_due_effects(now=effects[0]["expires_at"])
+        assert await db_mod.get_robbery_modifier(1100) == 0
+        assert await db_mod.get_active_effects(1100) == []
+
+    @pytest.mark.asyncio
+    async def test_temporary_modifier_reverted_with_several_items(self):
+        """The boost counts once and wears off no matter how many inventory rows the user has."""
+        await db_mod.add_user(1101, "Hoarder")
+        await db_mod.add_user_item(1101, 11, "Watermelon", uses_left=5)
+        await db_mod.add_user_item(1101, 1, "Bragging Rights", uses_left=1)
+        await db_mod.add_user_item(1101, 9, "Resintantoinem Sample", uses_left=2)
+
+        await db_mod.use_item(1101, 9)
+        assert await db_mod.get_robbery_modifier(1101) == 50
+        await db_mod.modify_robber_multiplier(1101, 20)
+        assert await db_mod.get_robbery_modifier(1101) == 70
+
+        effects = await db_mod.get_active_effects(1101)
+        await db_mod.process_due_effects(now=effects[0]["expires_at"])
+        assert await db_mod.get_robbery_modifier(1101) == 20
+
+    @pytest.mark.asyncio
+    async def test_financial_drain_ticks_hourly_until_expiry(self):
+        """Financial Drain removes 1% per elapsed hour and stops once expired."""
+        await db_mod.add_user(1101, "Drained")
+        await db_mod.update_balance(1101, 10000)
+        await db_mod.add_user_item(1101, 2, "Financial Drain", uses_left=1)
+        await db_mod.use_item(1101, 2)
+
+        start = int(time.time())
+        await db_mod.process_due_effects(now=start + 2 * 3600)
+        assert await db_mod.get_balance(1101) == 9801  # two compounded 1% ticks
+
+        await db_mod.process_due_effects(now=start + 48 * 3600)
+        balance_after_expiry = await db_mod.get_balance(1101)
+        assert await db_mod.get_active_effects(1101) == []
+        await db_mod.process_due_effects(now=start + 72 * 3600)
+        assert await db_mod.get_balance(1101) == balance_after_expiry
+
+    @pytest.mark.asyncio
+    async def test_next_due_reported(self):
+        """process_due_effects reports the next deadline, or None when idle."""
+        assert await db_mod.process_due_effects() is None
+        await db_mod.add_active_effect(1102, "drain", 1, 7200, interval=3600)
+        next_due = await db_mod.process_due_effects()
+        assert next_due is not None and next_due <= int(time.time()) + 3600
+
+
+# ===================== Economy Aggregate Tests =====================
+
+class TestEconomyAggregates:
+    async def _scan(self):
+        conn = await db_mod.db.get_economy()
+        async with conn.execute("""
+            SELECT COUNT(*), COALESCE(SUM(CASE WHEN balance > 0 THEN balance END), 0),
+                   COALESCE(SUM(CASE WHEN balance < 0 THEN balance END), 0),
+                   COUNT(CASE WHEN balance < 0 THEN 1 END)
+            FROM users
+        """) as cursor:
+            return await cursor.fetchone()
+
+    @pytest.mark.asyncio
+    async def test_aggregates_track_balance_changes(self):
+        """Trigger-maintained totals must always match a full-table scan."""
+        for uid, delta in [(1200, 500), (1201, -300), (1202, 12345), (1203, 0)]:
+            await db_mod.add_user(uid, f"User{uid}")
+            await db_mod.update_balance(uid, delta)
+        await db_mod.update_balance(1200, -900)   # crosses into debt
+        await db_mod.update_balance(1201, 5000)   # climbs out of debt
+        assert await db_mod.atomic_deduct(1202, 345)
+        conn = await db_mod.db.get_economy()
+        await conn.execute("DELETE FROM users WHERE user_id = 1203")
+        await conn.commit()
+
+        stats = await db_mod.get_economy_stats()
+        scan = await self._scan()
+        assert (stats["user_count"], stats["positive_total"], stats["debt_total"], stats["debtor_count"]) == tuple(scan)
+        assert await db_mod.get_total_economy_sum() == scan[1]
+        assert sum(stats["histogram"].values()) == stats["user_count"]
+        assert stats["histogram"] == {0: 1, 4: 1, 5: 1}
+
+
+class TestUserLocks:
+    @pytest.mark.asyncio
+    async def test_same_user_serialized(self):
+        """Read-decide-write sequences on one user must not interleave."""
+        locks = db_mod.UserLocks(stripes=8)
+        trace = []
+
+        async def critical(tag):
+            async with locks.hold(42):
+                trace.append(f"{tag}-in")
+                await asyncio.sleep(0.01)
+                trace.append(f"{tag}-out")
+
+        await asyncio.gather(critical("a"), critical("b"))
+        assert trace in (["a-in", "a-out", "b-in", "b-out"], ["b-in", "b-out", "a-in", "a-out"])
+        metrics = locks.metrics()
+        assert metrics["acquisitions"] == 2 and metrics["contended"] == 1
+        assert metrics["wait_max_ms"] > 0 and metrics["held"] == 0
+
+    @pytest.mark.asyncio
+    async def test_opposite_order_pairs_do_not_deadlock(self):
+        """Pairs taken in either argument order acquire stripes in the same order."""
+        locks = db_mod.UserLocks(stripes=64)
+        a, b = 1, 2
+        assert locks.stripe(a) != locks.stripe(b)
+
+        async def pair(first, second):
+            for _ in range(20):
+                async with locks.hold(first, second):
+                    await asyncio.sleep(0)
+
+        await asyncio.wait_for(asyncio.gather(pair(a, b), pair(b, a)), timeout=2)
+
+    @pytest.mark.asyncio
+    async def test_reentrant_for_holding_task(self):
+        """A command holding both users can still call transfer_balance, which holds them too."""
+        await db_mod.add_user(570, "Robber")
+        await db_mod.add_user(571, "Victim")
+        await db_mod.update_balance(571, 500)
+        async with db_mod.economy_locks.hold(570, 571):
+            assert await db_mod.transfer_balance(571, 570, 200) is True
+        assert await db_mod.get_balance(570) == 200
+        assert db_mod.economy_locks.metrics()["held"] == 0
+
+
+class TestLedger:
+    @pytest.mark.asyncio
+    async def test_writes_are_recorded_in_batches(self):
+        db_mod.ledger = db_mod.LedgerBuffer(batch_size=4)
+        await db_mod.add_user(1250, "Gambler")
+        await db_mod.add_user(1251, "Friend")
+        await db_mod.update_balance(1250, 500, reason="work")
+        assert await db_mod.atomic_deduct(1250, 100, reason="slots bet")
+        assert not await db_mod.atomic_deduct(1250, 10**6)  # failed deducts leave no entry
+        assert len(db_mod.ledger) == 2
+
+        conn = await db_mod.db.get_economy()
+        token = db_mod.ledger_command.set("economy transfer")
+        try:
+            assert await db_mod.transfer_balance(1250, 1251, 150)
+        finally:
+            db_mod.ledger_command.reset(token)
+        # The fourth entry filled the batch and started writing it without waiting for the ledger job
+        await db_mod.ledger._flush_task
+        assert len(db_mod.ledger) == 0
+        async with conn.execute("SELECT COUNT(*) FROM ledger") as cursor:
+            assert (await cursor.fetchone())[0] == 4
+
+        await db_mod.update_balance(1250, -10**6, reason="crime")
+        entries = await db_mod.get_ledger_entries(1250)
+        assert [(delta, balance, reason) for _, delta, balance, reason, _, _ in entries] == [
+            (-10**6, db_mod.DEBT_FLOOR, "crime"),
+            (-150, 250, "transfer to 1251"),
+            (-100, 400, "slots bet"),
+            (500, 500, "work"),
+        ]
+        assert entries[1][4] == "economy transfer"
+        received = await db_mod.get_ledger_entries(1251)
+        assert [(delta, reason) for _, delta, _, reason, _, _ in received] == [(150, "transfer from 1250")]
+
+        page = await db_mod.get_ledger_entries(1250, limit=2)
+        rest = await db_mod.get_ledger_entries(1250, limit=10, before=(page[-1][5], page[-1][0]))
+        assert page + rest == entries
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_does_not_fail_the_balance_update(self):
+        """A committed balance update reports success even when its ledger batch can't be written."""
+        db_mod.ledger = db_mod.LedgerBuffer(batch_size=1)
+        await db_mod.add_user(1255, "Unlucky")
+        conn = await db_mod.db.get_economy()
+        await conn.execute("ALTER TABLE ledger RENAME TO ledger_offline")
+        await conn.commit()
+        assert await db_mod.update_balance(1255, 50, reason="work") == 50
+        await db_mod.ledger._flush_task
+        assert len(db_mod.ledger) == 1  # kept for the next flush
+
+        await conn.execute("ALTER TABLE ledger_offline RENAME TO ledger")
+        await conn.commit()
+        assert await db_mod.flush_ledger() == 1
+        assert [row[1] for row in await db_mod.get_ledger_entries(1255)] == [50]
+
+    @pytest.mark.asyncio
+    async def test_compaction_rolls_old_entries_into_daily_rows(self):
+        await db_mod.add_user(1260, "Old")
+        conn = await db_mod.db.get_economy()
+        day = 86400
+        now = 100 * day
+        await conn.executemany(
+            "INSERT INTO ledger (user_id, delta, balance, reason, ts) VALUES (1260, ?, ?, 'x', ?)",
+            [(10, 10, 50 * day), (-4, 6, 50 * day + 60), (7, 13, 51 * day), (1, 14, now - 60)]
+        )
+        await conn.commit()
+
+        assert await db_mod.compact_ledger(now=now, retention_days=30) == 3
+        assert await db_mod.compact_ledger(now=now, retention_days=30) == 0
+        assert await db_mod.get_ledger_daily(1260) == [(51 * day, 7, 1, 13), (50 * day, 6, 2, 6)]
+        assert [row[1] for row in await db_mod.get_ledger_entries(1260)] == [1]
+
+        # A late entry for an already compacted day is merged into its summary
+        await conn.execute("INSERT INTO ledger (user_id, delta, balance, reason, ts) VALUES (1260, 5, 18, 'late', ?)", (51 * day + 5,))
+        await conn.commit()
+        await db_mod.compact_ledger(now=now, retention_days=30)
+        assert (await db_mod.get_ledger_daily(1260, limit=1))[0] == (51 * day, 12, 2, 18)
+
+    @pytest.mark.asyncio
+    async def test_drain_ticks_are_recorded(self):
+        await db_mod.add_user(1270, "Drained")
+        await db_mod.update_balance(1270, 1000)
+        await db_mod.add_active_effect(1270, "drain", 10, duration=100, interval=10)
+        await db_mod.process_due_effects(now=int(time.time()) + 10)
+        entries = await db_mod.get_ledger_entries(1270)
+        assert (entries[0][1], entries[0][2], entries[0][3]) == (-100, 900, "financial drain")
+        assert await db_mod.get_balance(1270) == 900
+
+
+@pytest.mark.disk
+class TestDatabaseMaintenance:
+    async def _bloat(self):
+        conn = await db_mod.db.get_economy()
+        await conn.executemany(
+            "INSERT INTO users (user_id, username, balance) VALUES (?, ?, 0)",
+            [(10_000 + i, "x" * 500) for i in range(2000)]
+        )
+        await conn.commit()
+        await conn.execute("DELETE FROM users WHERE user_id >= 10000")
+        await conn.commit()
+        await db_mod.db.checkpoint()
+        return conn
+
+    @pytest.mark.asyncio
+    async def test_pass_releases_free_pages_and_reports_stats(self, monkeypatch):
+        from services import db_maintenance
+        monkeypatch.setattr(db_maintenance, "MAINTENANCE_STEP_PAUSE", 0)
+        conn = await self._bloat()
+        await db_mod.db.get_moderator()
+        maintenance = db_maintenance.DatabaseMaintenance()
+
+        report = await maintenance.run_pass(force=True)
+        assert report["completed"]
+        economy = report["databases"]["economy"]
+        assert economy["before"]["freelist_pages"] > 0 and economy["after"]["freelist_pages"] == 0
+        assert economy["after"]["page_count"] < economy["before"]["page_count"]
+        assert [step["step"] for step in economy["steps"]] == ["analyze", "optimize", "incremental_vacuum", "checkpoint"]
+        async with conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'sqlite_stat1'") as cursor:
+            assert (await cursor.fetchone())[0] == 1
+        assert maintenance.metrics()["databases"]["economy"]["released_bytes"] > 0
+        assert not maintenance.is_due()
+
+    @pytest.mark.asyncio
+    async def test_old_files_converted_to_incremental_vacuum(self, monkeypatch):
+        from services import db_maintenance
+        monkeypatch.setattr(db_maintenance, "MAINTENANCE_STEP_PAUSE", 0)
+        conn = await db_mod.db.get_economy()
+        await conn.execute("PRAGMA auto_vacuum = NONE")
+        await conn.execute("VACUUM")
+        assert (await db_mod.get_database_stats(conn, db_mod.ECONOMY_DB_PATH))["auto_vacuum"] == 0
+
+        report = await db_maintenance.DatabaseMaintenance().run_pass(force=True)
+        assert report["databases"]["economy"]["steps"][0]["step"] == "convert_incremental"
+        assert report["databases"]["economy"]["after"]["auto_vacuum"] == db_maintenance.AUTO_VACUUM_INCREMENTAL
+
+    @pytest.mark.asyncio
+    async def test_busy_bot_pauses_the_pass(self, monkeypatch):
+        from services import db_maintenance
+        monkeypatch.setattr(db_maintenance, "MAINTENANCE_STEP_PAUSE", 0)
+        await self._bloat()
+        maintenance = db_maintenance.DatabaseMaintenance(quiet_rate=1, quiet_window=60)
+        for _ in range(5):
+            maintenance.note_command()
+        assert maintenance.command_rate() == 5.0 and not maintenance.is_quiet()
+
+        report = await maintenance.run_pass()
+        assert not report["completed"]
+        assert report["databases"]["economy"]["after"]["freelist_pages"] > 0
+        assert maintenance.is_due()
+        assert maintenance.command_rate(now=time.monotonic() + 120) == 0
+
+
+class TestMemoryStore:
+    @staticmethod
+    async def _crash(manager):
+        """Drops an in-memory manager the way a killed process would: no checkpoint."""
+        for store in manager._memory_stores.values():
+            store._close_segment()
+            raw, store._raw = store._raw, None
+            await raw.close()
+
+    @pytest.mark.asyncio
+    async def test_journal_replay_after_crash(self):
+        """Committed writes survive a crash through the journal and are folded into the file on reopen."""
+        memory = db_mod.DatabaseManager(in_memory=True)
+        db_mod.db = memory
+        await db_mod.init_databases()
+        await db_mod.add_user(590, "Volatile")
+        await db_mod.update_balance(590, 750)
+        await db_mod.add_user_item(590, 11, "Watermelon", uses_left=3)
+        await db_mod.flush_ledger()
+        store = memory._memory_stores[0]
+        assert store.seq > store.checkpoint_seq
+        await self._crash(memory)
+
+        reopened = db_mod.DatabaseManager(in_memory=True)
+        db_mod.db = reopened
+        assert await db_mod.get_balance(590) == 750
+        assert (await db_mod.get_user_item(590, 11))["uses_left"] == 3
+        store = reopened._memory_stores[0]
+        assert store.replay["records"] > 0 and not store.replay["gap"]
+        assert store.checkpoint_seq == store.seq  # replay was checkpointed straight away
+        await reopened.close()
+
+        # The checkpointed file is a regular database for disk mode
+        db_mod.db = db_mod.DatabaseManager()
+        assert await db_mod.get_balance(590) == 750
+
+    @pytest.mark.asyncio
+    async def test_checkpoint_truncates_journal(self):
+        """A checkpoint writes the file and drops the journal segments it covers."""
+        memory = db_mod.DatabaseManager(in_memory=True)
+        db_mod.db = memory
+        await db_mod.init_databases()
+        await db_mod.add_user(591, "Saver")
+        await db_mod.update_balance(591, 40)
+        store = memory._memory_stores[0]
+        report = await store.checkpoint()
+        assert report["seq"] == store.seq and report["bytes"] > 0
+        assert store.metrics()["journaled_since_checkpoint"] == 0
+        assert store.metrics()["journal_bytes"] == 0
+        with sqlite3.connect(db_mod.ECONOMY_DB_PATH) as conn:
+            assert conn.execute("SELECT balance FROM users WHERE user_id = 591").fetchone() == (40,)
+        await db_mod.update_balance(591, 2)
+        assert store.metrics()["journaled_since_checkpoint"] == 1
+        await memory.close()
+
+    @pytest.mark.asyncio
+    async def test_journal_gap_is_discarded(self):
+        """A file older than the journal (e.g. restored from a backup) must not get later records replayed."""
+        memory = db_mod.DatabaseManager(in_memory=True)
+        db_mod.db = memory
+        await db_mod.init_databases()
+        await db_mod.add_user(592, "Restored")
+        await memory.checkpoint_memory()
+        shutil.copy(db_mod.ECONOMY_DB_PATH, db_mod.ECONOMY_DB_PATH + ".old")
+        await db_mod.update_balance(592, 10)
+        await memory.checkpoint_memory()
+        await db_mod.update_balance(592, 5)
+        await self._crash(memory)
+        os.replace(db_mod.ECONOMY_DB_PATH + ".old", db_mod.ECONOMY_DB_PATH)
+
+        reopened = db_mod.DatabaseManager(in_memory=True)
+        db_mod.db = reopened
+        assert await db_mod.get_balance(592) == 0
+        assert reopened._memory_stores[0].replay["gap"]
+        await reopened.close()
+
+
+    @pytest.mark.asyncio
+    async def test_only_successful_writes_are_journaled(self):
+        """A failed statement stays out of the journal; a record that fails on replay stops the replay."""
+        memory = db_mod.DatabaseManager(in_memory=True)
+        db_mod.db = memory
+        await db_mod.init_databases()
+        await db_mod.add_user(593, "Twice")
+        conn = await memory.get_economy(593)
+        with pytest.raises(sqlite3.IntegrityError):
+            await conn.execute("INSERT INTO users (user_id, username, balance) VALUES (593, 'Twice', 0)")
+        await db_mod.update_balance(593, 20)
+        store = memory._memory_stores[0]
+        seq = store.seq
+        await self._crash(memory)
+        with open(store._segment, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"seq": seq + 1, "ops": [["UPDATE missing_table SET x = 1", []]]}) + "\n")
+            f.write(json.dumps({"seq": seq + 2, "ops": [["UPDATE users SET balance = 99 WHERE user_id = 593", []]]}) + "\n")
+
+        reopened = db_mod.DatabaseManager(in_memory=True)
+        db_mod.db = reopened
+        assert await db_mod.get_balance(593) == 20
+        assert reopened._memory_stores[0].replay["gap"]
+        assert reopened._memory_stores[0].seq == seq
+        await reopened.close()
+
+class TestEconomyAnalytics:
+    def test_distribution_figures(self):
+        """Gini, debt and decade buckets on a hand-checkable column."""
+        import numpy as np
+        from services.economy_analytics import analyze_balances
+        assert analyze_balances(np.array([5, 5, 5]))["gini"] == 0.0
+        stats = analyze_balances(np.array([-50, 0, 0, 7, 40, 1000]))
+        assert stats["users"] == 6 and stats["total"] == 997
+        assert stats["debtors"] == 1 and stats["debt_total"] == -50
+        assert stats["histogram"] == {"debt": 1, "0": 2, "1": 1, "10": 1, "1000": 1}
+        assert stats["percentiles"]["p50"] == 3.5
+        assert analyze_balances(np.array([0, 0, 0, 100]))["gini"] == 0.75
+
+    @pytest.mark.asyncio
+    async def test_snapshots_and_week_over_week(self):
+        """Snapshots read every shard's balances; deltas appear once a week-old snapshot exists."""
+        from services.economy_analytics import EconomyAnalytics, ANALYTICS_WEEK
+        analytics = EconomyAnalytics(history=4)
+        assert analytics.metrics() == {}
+        await db_mod.add_user(580, "A")
+        await db_mod.update_balance(580, 100)
+        first = await analytics.take_snapshot(now=1_000_000)
+        assert first["users"] == 1 and first["total"] == 100
+        assert analytics.week_over_week() is None
+
+        await db_mod.add_user(581, "B")
+        await db_mod.update_balance(581, -20)
+        await analytics.take_snapshot(now=1_000_000 + ANALYTICS_WEEK)
+        delta = analytics.metrics()["week_over_week"]
+        assert delta == {"since": 1_000_000, "users": 1, "total": -20, "median": -60.0, "gini": 0.5, "debtors": 1}
+
+        for step in range(4):
+            await analytics.take_snapshot(now=2_000_000 + step)
+        assert len(analytics.snapshots) == 4
+
+
+class TestJobScheduler:
+    def test_schedules(self):
+        """Cron slots skip non-matching days; late interval slots are dropped or folded into one run."""
+        import datetime
+        from services.scheduler import CronSchedule, IntervalSchedule
+        friday = datetime.datetime(2026, 10, 16, 22, 7).timestamp()
+        quarter = CronSchedule("*/15 * * * *")
+        assert datetime.datetime.fromtimestamp(quarter.next_after(friday)) == datetime.datetime(2026, 10, 16, 22, 15)
+        weekdays = CronSchedule("0 3 * * 1-5")
+        assert datetime.datetime.fromtimestamp(weekdays.next_after(friday)) == datetime.datetime(2026, 10, 19, 3, 0)
+        for bad in ("* * * *", "61 * * * *", "0 0 31 2 *"):
+            with pytest.raises(ValueError):
+                CronSchedule(bad)
+
+        every = IntervalSchedule(10)
+        assert every.catch_up(100, 95, coalesce=False) == (100, 0)
+        assert every.catch_up(100, 125, coalesce=False) == (130, 3)
+        assert every.catch_up(100, 125, coalesce=True) == (120, 2)
+
+    @pytest.mark.asyncio
+    async def test_overlap_failures_and_shutdown(self):
+        """A slow run is never started twice, failures are counted, shutdown waits for runs and stops services."""
+        from services.scheduler import JobScheduler
+        scheduler = JobScheduler()
+        active, peak, calls = 0, 0, []
+
+        async def slow():
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.12)
+            active -= 1
+
+        async def flaky():
+            calls.append(time.monotonic())
+            raise RuntimeError("boom")
+
+        async def service():
+            await asyncio.Event().wait()
+
+        scheduler.every("slow", 0.05, slow)
+        scheduler.every("flaky", 0.05, flaky)
+        scheduler.service("service", service)
+        scheduler.start()
+        await asyncio.sleep(0.3)
+        while not active:
+            await asyncio.sleep(0.005)
+        report = await scheduler.shutdown(timeout=1)
+
+        metrics = scheduler.metrics()
+        assert peak == 1 and metrics["slow"]["overlaps"] >= 2 and metrics["slow"]["runs"] >= 2
+        assert metrics["flaky"]["failures"] == len(calls) >= 4
+        assert metrics["flaky"]["last_error"] == "RuntimeError: boom"
+        assert report["cancelled"] == ["service"] and not metrics["service"]["running"]
+        assert "slow" in report["finished"] and active == 0
+
+
+class TestRateLimits:
+    @staticmethod
+    def _clock(start=1000.0):
+        now = [start]
+        return now, lambda: now[0]
+
+    def test_cooldowns_and_token_buckets(self):
+        """A plain cooldown allows one use per window; a bucket allows a burst, then refills one use at a time."""
+        from utils.ratelimit import RateLimit, RateLimiter
+        now, clock = self._clock()
+        limits = RateLimiter(clock=clock)
+        assert limits.acquire(1, "slots", 5) == 0.0
+        now[0] += 2
+        assert limits.acquire(1, "slots", 5) == pytest.approx(3.0)
+        assert limits.acquire(2, "slots", 5) == 0.0  # per user
+        assert limits.acquire(1, "slots", 5, scope="override") == 0.0  # per scope
+        now[0] += 3
+        assert limits.acquire(1, "slots", 5) == 0.0
+
+        bucket = RateLimit(10, burst=3)
+        assert [limits.acquire(3, "daily", bucket) for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert limits.acquire(3, "daily", bucket) == pytest.approx(10.0)
+        now[0] += 10
+        assert limits.retry_after(3, "daily", bucket) == 0.0
+        assert limits.acquire(3, "daily", bucket) == 0.0
+        assert limits.acquire(3, "daily", bucket) == pytest.approx(10.0)
+
+        # Full buckets are not stored
+        now[0] += 31
+        assert limits.sweep() == 0 and limits.metrics()["entries"] == 0
+
+    def test_failure_counters_expire(self):
+        from utils.ratelimit import RateLimiter
+        now, clock = self._clock()
+        limits = RateLimiter(clock=clock)
+        assert [limits.count_failure(7, "rob", window=60) for _ in range(2)] == [1, 2]
+        limits.clear_failures(7, "rob")
+        assert limits.count_failure(7, "rob", window=60) == 1
+        now[0] += 61
+        assert limits.count_failure(7, "rob", window=60) == 1
+
+    def test_wheel_drops_entries_at_their_expiry(self):
+        """Entries spread over every wheel level leave exactly when their time passes."""
+        import random
+        from utils.ratelimit import TimingWheel
+        now, clock = self._clock(start=12345.0)
+        wheel = TimingWheel(clock=clock)
+        rng = random.Random(7)
+        expiries = {key: now[0] + rng.choice([0.5, 1, 63, 64, 65, 4095, 4097, 300000]) + rng.random() * 100
+                    for key in range(2000)}
+        for key, expires_at in expiries.items():
+            wheel.set(key, key, expires_at)
+        full = wheel.memory_bytes()
+        for step in (30, 70, 4100, 5000, 400000):
+            now[0] = 12345.0 + step
+            wheel.advance()
+            alive = {key for key, expires_at in expiries.items() if expires_at > now[0]}
+            assert len(wheel) == len(alive)
+            assert all(wheel.get(key) == key for key in list(alive)[:50])
+        assert len(wheel) == 0 and wheel.expired == 2000 and wheel.memory_bytes() < full
+
+
+class TestGuildPolicy:
+    def test_compiled_policy_matches_settings(self):
+        """Disabled modules and overrides resolve from the compiled policy; maintenance hides it."""
+        from types import SimpleNamespace
+        from status import ConfigSync, command_modules
+
+        class ShopCommands:
+            pass
+
+        group = SimpleNamespace(name="Shop")
+        use = SimpleNamespace(name="use", qualified_name="shop use", root_parent=group, binding=ShopCommands())
+        ping = SimpleNamespace(name="ping", qualified_name="ping", root_parent=None, binding=None)
+        assert command_modules(use) == ("shop", "use")
+        assert command_modules(ping) == ("ping",)
+
+        settings = ConfigSync("localhost:1", "test", bot=None)
+        settings._store(42, {
+            "enabled_modules": {"Shop": False, "ping": True},
+            "command_overrides": [
+                {"name": "ping", "cooldown": 5},
+                {"name": "ping", "cooldown": -1},
+                {"name": "use", "cooldown": 2},
+                {"name": "shop use", "cooldown": 9},
+            ],
+        })
+        policy = settings.policy("42")
+        assert policy.blocked_module(settings.modules_for(use)) == "shop"
+        assert policy.blocked_module(settings.modules_for(ping)) is None
+        assert settings.command_modules == {"shop use": ("shop", "use"), "ping": ("ping",)}
+        assert policy.override_for("ping", "ping")["cooldown"] == 5  # first entry wins
+        assert policy.override_for("shop use", "use")["cooldown"] == 9  # qualified name first
+        with pytest.raises(TypeError):
+            policy.overrides["ping"]["cooldown"] = 0
+
+        assert settings.policy(7) is None
+        settings.maintenance_mode = True
+        assert settings.policy(42) is None
+
+
+
+class TestConfigSyncDelta:
+    @pytest.fixture
+    async def dashboard(self):
+        from tests.mock_dashboard import MockDashboard
+        dashboard = MockDashboard({"1": {"prefix": "!"}, "2": {"prefix": "?"}}, history=3)
+        await dashboard.start()
+        yield dashboard
+        await dashboard.stop()
+
+    @pytest.fixture
+    async def config_sync(self, dashboard):
+        from types import SimpleNamespace
+        from status import ConfigSync
+        sync = ConfigSync(dashboard.url, "test", bot=SimpleNamespace(is_ready=lambda: True))
+        yield sync
+        await sync.close()
+
+    @pytest.mark.asyncio
+    async def test_full_then_delta_then_not_modified(self, dashboard, config_sync):
+        """Only changed guilds are pulled and recompiled; an unchanged version costs a 304."""
+        await config_sync.sync_all()
+        assert config_sync.get(2) == {"prefix": "?"}
+        assert dashboard.pulls()[-1] == ({}, 200)
+        assert dashboard.requests[-1][2]["Accept-Encoding"] == "gzip"
+        untouched = config_sync.policy(2)
+
+        dashboard.update("1", {"prefix": "$"})
+        dashboard.update("3", {"prefix": "%"})
+        await config_sync.sync_all()
+        assert dashboard.pulls()[-1] == ({"since": "1"}, 200)
+        assert config_sync.get(1) == {"prefix": "$"} and config_sync.get(3) == {"prefix": "%"}
+        assert config_sync.policy(2) is untouched
+
+        await config_sync.sync_all()
+        assert dashboard.pulls()[-1] == ({"since": "3"}, 304)
+
+        dashboard.remove("3")
+        await config_sync.sync_all()
+        assert config_sync.get(3) == {} and config_sync.policy(3) is None
+        assert config_sync.metrics() == {
+            "version": 4, "guilds": 2, "full": 1, "delta": 2, "not_modified": 1,
+            "gaps": 0, "guilds_changed": 3, "bytes": config_sync.sync_stats["bytes"],
+        }
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_full_pull(self, dashboard, config_sync):
+        """Expired history (410) and a delta that doesn't start at our version both re-pull everything."""
+        await config_sync.sync_all()
+        for version in range(5):
+            dashboard.update("1", {"prefix": str(version)})
+        await config_sync.sync_all()
+        assert dashboard.pulls()[-2:] == [({"since": "1"}, 410), ({}, 200)]
+        assert config_sync.get(1) == {"prefix": "4"} and config_sync.metrics()["version"] == 6
+
+        # Dashboard restored from an older backup: our version is ahead of it
+        config_sync._version, config_sync._etag = 9, None
+        dashboard.update("2", {"prefix": "#"})
+        await config_sync.sync_all()
+        assert dashboard.pulls()[-2:] == [({"since": "9"}, 410), ({}, 200)]
+        assert config_sync.get(2) == {"prefix": "#"} and config_sync.metrics()["version"] == 7
+
+        # Unversioned dashboards keep working with a full pull each time
+        dashboard.versioned = False
+        dashboard.update("2", {"prefix": "&"})
+        await config_sync.sync_all()
+        assert config_sync.get(2) == {"prefix": "&"} and config_sync.metrics()["version"] is None
+
+
+class TestLeaderboard:
+    async def _seed(self):
+        db_mod.leaderboard_cache = db_mod.LeaderboardCache()
+        balances = {1300 + i: (i * 37) % 11 * 100 for i in range(25)}  # plenty of ties
+        for uid, balance in balances.items():
+            await db_mod.add_user(uid, f"User{uid}")
+            conn = await db_mod.db.get_economy()
+            await conn.execute("UPDATE users SET balance = ? WHERE user_id = ?", (balance, uid))
+        await conn.commit()
+        return sorted(balances.items(), key=lambda kv: (kv[1], kv[0]), reverse=True)
+
+    @pytest.mark.asyncio
+    async def test_keyset_pages_cover_everyone_once(self):
+        expected = await self._seed()
+        seen, after = [], None
+        while True:
+            page = await db_mod.get_leaderboard_page(limit=7, after=after)
+            seen.extend((uid, balance) for uid, _, balance in page)
+            if len(page) < 7:
+                break
+            after = (page[-1][2], page[-1][0])
+        assert seen == expected
+
+    @pytest.mark.asyncio
+    async def test_user_rank_matches_order(self):
+        expected = await self._seed()
+        for position, (uid, balance) in enumerate(expected, start=1):
+            assert await db_mod.get_user_rank(uid) == (position, balance)
+        assert await db_mod.get_user_rank(999999) is None
+
+    @pytest.mark.asyncio
+    async def test_guild_page_filters_members(self, monkeypatch):
+        expected = await self._seed()
+        members = [uid for uid, _ in expected[::3]]
+        page = await db_mod.get_guild_leaderboard_page(members, limit=5)
+        assert [row[0] for row in page] == members[:5]
+        # Large guilds are split into several IN (...) lookups, which must merge into the same order
+        monkeypatch.setattr(db_mod, "LEADERBOARD_IN_QUERY_MAX", 2)
+        page = await db_mod.get_guild_leaderboard_page(members, limit=5)
+        assert [row[0] for row in page] == members[:5]
+        after = (page[-1][2], page[-1][0])
+        page = await db_mod.get_guild_leaderboard_page(members, limit=5, after=after)
+        assert [row[0] for row in page] == members[5:10]
+
+    @pytest.mark.asyncio
+    async def test_server_view_pages_end_exactly(self):
+        """A guild with a multiple of the page size gets no empty last page, and members are read once."""
+        from types import SimpleNamespace
+        import commands.economy as economy_mod
+        expected = await self._seed()
+        members = [SimpleNamespace(id=uid, bot=False) for uid, _ in expected[:20]]
+        reads = []
+
+        class Guild:
+            name = "Test"
+
+            @property
+            def members(self):
+                reads.append(1)
+                return members
+
+        view = economy_mod.LeaderboardView(1, "server", Guild())
+        await view.load()
+        assert [row[0] for row in view.rows] == [uid for uid, _ in expected[:10]]
+        assert not view.next_page.disabled
+        view.cursors.append((view.rows[-1][2], view.rows[-1][0]))
+        await view.load()
+        assert [row[0] for row in view.rows] == [uid for uid, _ in expected[10:20]]
+        assert view.next_page.disabled
+        assert len(reads) == 1
+
+    @pytest.mark.asyncio
+    async def test_cached_top_invalidated_by_balance_write(self):
+        expected = await self._seed()
+        top = await db_mod.get_leaderboard_page(limit=3)
+        assert [row[0] for row in top] == [uid for uid, _ in expected[:3]]
+        underdog = expected[-1][0]
+        await db_mod.update_balance(underdog, 100000)
+        top = await db_mod.get_leaderboard_page(limit=3)
+        assert top[0][0] == underdog
+
+    @pytest.mark.asyncio
+    async def test_full_cache_invalidated_by_climber_outside_top(self):
+        """Once the cached page is full, only writes reaching its floor (or touching cached users) drop it."""
+        db_mod.leaderboard_cache = db_mod.LeaderboardCache()
+        size = db_mod.LEADERBOARD_CACHE_SIZE
+        conn = await db_mod.db.get_economy()
+        await conn.executemany(
+            "INSERT INTO users (user_id, username, balance) VALUES (?, ?, ?)",
+            [(5000 + i, f"User{i}", 1000 + i) for i in range(size + 20)]
+        )
+        await conn.commit()
+        await db_mod.get_leaderboard_page(limit=10)
+        assert db_mod.leaderboard_cache.get() is not None
+
+        outsider = 5000  # poorest user, well below the cached floor
+        await db_mod.update_balance(outsider, 5)
+        assert db_mod.leaderboard_cache.get() is not None
+        await db_mod.atomic_deduct(outsider, 5)
+        assert db_mod.leaderboard_cache.get() is not None
+
+        await db_mod.update_balance(outsider, 100000)
+        top = await db_mod.get_leaderboard_page(limit=1)
+        assert top[0][0] == outsider and top[0][2] == 101000
+
+
+@pytest.mark.disk
+class TestSnapshots:
+    @pytest.mark.asyncio
+    async def test_snapshot_of_live_db_is_consistent(self, tmp_path):
+        for uid in range(1400, 1450):
+            await db_mod.add_user(uid, f"User{uid}")
+        conn = await db_mod.db.get_economy()
+        # Open, uncommitted write on the live connection must not leak into the snapshot
+        await conn.execute("UPDATE users SET balance = 777 WHERE user_id = 1400")
+
+        dest = str(tmp_path / "economy_snapshot.db")
+        report = await asyncio.to_thread(backup_mod.snapshot_db_sync, db_mod.ECONOMY_DB_PATH, dest, 1)
+        await conn.rollback()
+
+        assert report["bytes"] == os.path.getsize(dest) > 0
+        assert report["seconds"] >= 0
+        snap = sqlite3.connect(dest)
+        try:
+            assert snap.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+            assert snap.execute("SELECT COUNT(*) FROM users WHERE user_id BETWEEN 1400 AND 1449").fetchone()[0] == 50
+            assert snap.execute("SELECT balance FROM users WHERE user_id = 1400").fetchone()[0] != 777
+        finally:
+            snap.close()
+
+    @pytest.mark.asyncio
+    async def test_snapshot_completes_under_concurrent_writes(self, tmp_path):
+        """Commits from other connections during the copy neither restart nor corrupt it."""
+        conn = await db_mod.db.get_economy()
+        await conn.executemany(
+            "INSERT INTO users (user_id, username, balance) VALUES (?, ?, ?)",
+            [(7000 + i, "x" * 200, i) for i in range(3000)]
+        )
+        await conn.commit()
+        stop = asyncio.Event()
+        writes = 0
+
+        async def writer():
+            nonlocal writes
+            while not stop.is_set():
+                await db_mod.update_balance(7000 + writes % 3000, 1)
+                writes += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(writer())
+        try:
+            await asyncio.sleep(0.01)
+            dest = str(tmp_path / "busy_snapshot.db")
+            report = await asyncio.to_thread(backup_mod.snapshot_db_sync, db_mod.ECONOMY_DB_PATH, dest)
+        finally:
+            stop.set()
+            await task
+        assert writes > 0 and report["seconds"] < 10
+        snap = sqlite3.connect(dest)
+        try:
+            assert snap.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+            assert snap.execute("SELECT COUNT(*) FROM users WHERE user_id >= 7000").fetchone()[0] == 3000
+            stats = snap.execute("SELECT positive_total FROM economy_stats").fetchone()[0]
+            assert stats == snap.execute("SELECT SUM(MAX(balance, 0)) FROM users").fetchone()[0]
+        finally:
+            snap.close()
+
+    @pytest.mark.asyncio
+    async def test_pipeline_skips_unchanged_and_restores(self, tmp_path):
+        dbs = [(db_mod.ECONOMY_DB_PATH, "economy.db"), (db_mod.MODERATOR_DB_PATH, "moderator.db")]
+        pipeline = backup_mod.BackupPipeline(backup_mod.LocalDirBackend(str(tmp_path / "remote")), dbs)
+        await db_mod.add_user(1500, "User1500")
+
+        first = await asyncio.to_thread(pipeline.run)
+        assert first["uploaded"] and first["archive_bytes"] > 0
+        assert os.path.exists(tmp_path / "remote" / backup_mod.ARCHIVE_NAME)
+
+        second = await asyncio.to_thread(pipeline.run)
+        assert not second["uploaded"]
+
+        await db_mod.update_balance(1500, 250)
+        third = await asyncio.to_thread(pipeline.run)
+        assert third["uploaded"]
+
+        restored = {"economy.db": str(tmp_path / "economy.db"), "moderator.db": str(tmp_path / "moderator.db")}
+        assert await asyncio.to_thread(pipeline.restore, restored)
+        snap = sqlite3.connect(restored["economy.db"])
+        try:
+            assert snap.execute("SELECT balance FROM users WHERE user_id = 1500").fetchone()[0] == await db_mod.get_balance(1500)
+        finally:
+            snap.close()
+        # What was just restored is what the backend holds, so the next run has nothing to upload
+        restored_pipeline = backup_mod.BackupPipeline(pipeline.backend, [(restored["economy.db"], "economy.db"), (restored["moderator.db"], "moderator.db")])
+        assert await asyncio.to_thread(restored_pipeline.restore, restored)
+        assert not (await asyncio.to_thread(restored_pipeline.run))["uploaded"]
+
+    @pytest.mark.asyncio
+    async def test_snapshot_store_rotates(self, tmp_path):
+        store = backup_mod.SnapshotStore(str(tmp_path / "snapshots"), keep=3)
+        pipeline = backup_mod.BackupPipeline(
+            backup_mod.LocalDirBackend(str(tmp_path / "remote")),
+            [(db_mod.ECONOMY_DB_PATH, "economy.db")],
+            store=store,
+        )
+        for uid in range(1600, 1605):
+            await db_mod.add_user(uid, f"User{uid}")
+            await asyncio.to_thread(pipeline.run)
+        assert [os.path.basename(p) for p in store.archives()] == ["gen-00000003.zip", "gen-00000004.zip", "gen-00000005.zip"]
+        manifest = store.read_manifest()
+        assert manifest["generation"] == 5 and manifest["uploaded"]
+        assert pipeline.fetch_remote_manifest()["generation"] == 5
+
+    @pytest.mark.asyncio
+    async def test_sync_restores_only_strictly_newer_remote(self, tmp_path):
+        remote = backup_mod.LocalDirBackend(str(tmp_path / "remote"))
+        source = backup_mod.BackupPipeline(
+            remote, [(db_mod.ECONOMY_DB_PATH, "economy.db")], store=backup_mod.SnapshotStore(str(tmp_path / "a"))
+        )
+        await db_mod.add_user(1700, "User1700")
+        await asyncio.to_thread(source.run)
+
+        target = {"economy.db": str(tmp_path / "economy.db")}
+        node = backup_mod.BackupPipeline(remote, [(target["economy.db"], "economy.db")], store=backup_mod.SnapshotStore(str(tmp_path / "b")))
+        # No local files: always restore
+        assert await asyncio.to_thread(node.sync_from_remote, target)
+        assert node.store.read_manifest()["generation"] == 1
+        # Same generation: nothing to do
+        assert not await asyncio.to_thread(node.sync_from_remote, target)
+
+        await db_mod.update_balance(1700, 40)
+        await asyncio.to_thread(source.run)
+        assert await asyncio.to_thread(node.sync_from_remote, target)
+        restored = sqlite3.connect(target["economy.db"])
+        try:
+            assert restored.execute("SELECT balance FROM users WHERE user_id = 1700").fetchone()[0] == await db_mod.get_balance(1700)
+        finally:
+            restored.close()
+
+    @pytest.mark.asyncio
+    async def test_connections_wait_for_startup_gate(self):
+        await db_mod.db.close()
+        db_mod.db = db_mod.DatabaseManager()
+        order = []
+
+        async def prepare():
+            await asyncio.sleep(0.05)
+            order.append("prepared")
+            await db_mod.db.get_economy()  # the gate task itself is let through
+
+        db_mod.db.hold(asyncio.create_task(prepare()))
+        await db_mod.db.get_economy()
+        order.append("connected")
+        assert order == ["prepared", "connected"]
+
+    @pytest.mark.asyncio
+    async def test_shutdown_snapshot_uploaded_on_next_boot(self, tmp_path):
+        dbs = [(db_mod.ECONOMY_DB_PATH, "economy.db")]
+        remote = backup_mod.LocalDirBackend(str(tmp_path / "remote"))
+        remote_name = backup_mod.ARCHIVE_NAME
+        store_dir = str(tmp_path / "snapshots")
+        pipeline = backup_mod.BackupPipeline(remote, dbs, store=backup_mod.SnapshotStore(store_dir))
+
+        await db_mod.add_user(1800, "User1800")
+        conn = await db_mod.db.get_economy()
+        async with conn.execute("PRAGMA journal_mode") as cursor:
+            assert (await cursor.fetchone())[0] == "wal"
+        assert (await db_mod.db.checkpoint())["economy"][0] == 0
+
+        report = await asyncio.to_thread(pipeline.snapshot_local)
+        assert report["generation"] == 1 and not report["uploaded"]
+        assert pipeline.fetch_remote_manifest() is None
+        # Shutdown skips compression; the upload deflates it instead
+        with zipfile.ZipFile(pipeline.store.path_for(1)) as zipf:
+            assert {info.compress_type for info in zipf.infolist()} == {zipfile.ZIP_STORED}
+        # Nothing changed, so a second shutdown snapshot adds no generation
+        assert (await asyncio.to_thread(pipeline.snapshot_local))["generation"] == 1
+
+        # "Next boot": a fresh pipeline finds the pending snapshot and uploads it
+        rebooted = backup_mod.BackupPipeline(remote, dbs, store=backup_mod.SnapshotStore(store_dir))
+        assert await asyncio.to_thread(rebooted.upload_pending)
+        assert rebooted.fetch_remote_manifest()["generation"] == 1
+        with zipfile.ZipFile(os.path.join(str(tmp_path / "remote"), remote_name)) as zipf:
+            assert {info.compress_type for info in zipf.infolist()} == {zipfile.ZIP_DEFLATED}
+            assert zipf.testzip() is None
+        assert not await asyncio.to_thread(rebooted.upload_pending)
+        assert not (await asyncio.to_thread(rebooted.run))["uploaded"]
+
+
+class TestCaseBrowsing:
+    async def _seed(self, guild_id=900, count=23):
+        for i in range(count):
+            await db_mod.insert_case(guild_id, 100 + i, f"User{i}", f"reason {i}", "warn", 1000 + i, 1)
+
+    @pytest.mark.asyncio
+    async def test_keyset_pages_reach_oldest_case(self):
+        await self._seed()
+        await self._seed(guild_id=901, count=3)
+        seen, before = [], None
+        while True:
+            page = await db_mod.get_cases_page(900, limit=10, before=before)
+            seen.extend(row[0] for row in page)
+            if len(page) < 10:
+                break
+            before = page[-1][0]
+        assert seen == list(range(23, 0, -1))
+
+    @pytest.mark.asyncio
+    async def test_iter_guild_cases_streams_in_batches(self):
+        await self._seed()
+        rows = [row async for row in db_mod.iter_guild_cases(900, batch_size=5)]
+        assert [row[0] for row in rows] == list(range(23, 0, -1))
+        assert rows[-1][3] == "reason 0"
+
+    @pytest.mark.asyncio
+    async def test_export_splits_into_standalone_parts(self, monkeypatch):
+        """Exports over the upload limit become several gzip files, each a complete CSV."""
+        import gzip
+        import io
+        import commands.moderator as moderator_mod
+        for i in range(300):
+            await db_mod.insert_case(900, 100 + i, f"User{i}", os.urandom(64).hex(), "warn", 1000 + i, 1)
+        monkeypatch.setattr(moderator_mod, "EXPORT_FLUSH_BYTES", 1024)
+        monkeypatch.setattr(moderator_mod, "EXPORT_PART_HEADROOM", 2048)
+        monkeypatch.setattr(moderator_mod, "EXPORT_BATCH_ROWS", 64)  # several worker-thread batches
+
+        count, parts = await moderator_mod.write_case_export(
+            db_mod.iter_guild_cases(900), io.BytesIO, "csv", part_size=16 * 1024
+        )
+        assert count == 300 and len(parts) > 1
+        numbers = []
+        for part in parts:
+            assert len(part.getvalue()) <= 16 * 1024
+            lines = gzip.decompress(part.getvalue()).decode().splitlines()
+            assert lines[0].startswith("case_number,")
+            numbers.extend(int(line.split(",")[0]) for line in lines[1:])
+        assert numbers == list(range(300, 0, -1))
+
+    @pytest.mark.asyncio
+    async def test_search_cases_ranked_and_synced(self):
+        await db_mod.insert_case(900, 1, "Spammer", "posting spam links in general", "warn", 1, 1)
+        await db_mod.insert_case(900, 2, "Other", "rude to staff", "warn", 2, 1)
+        await db_mod.insert_case(900, 3, "Linky", "spam spam spam links", "ban", 3, 1)
+        await db_mod.insert_case(901, 4, "Elsewhere", "spam links", "warn", 4, 1)
+
+        results = await db_mod.search_cases(900, "spam links")
+        assert [row[0] for row in results] == [3, 1]  # denser match ranks first, other guild excluded
+        assert [row[0] for row in await db_mod.search_cases(900, "spamz*")] == []
+        assert [row[0] for row in await db_mod.search_cases(900, "spa*")] == [3, 1]
+        assert [row[0] for row in await db_mod.search_cases(900, "linky")] == [3]  # usernames are indexed
+        assert await db_mod.search_cases(900, '") OR "') == []  # operators can't break the query
+
+        await db_mod.edit_case_reason(900, 2, "shared spam links in DMs")
+        await db_mod.remove_case(900, 1)
+        assert sorted(row[0] for row in await db_mod.search_cases(900, "spam")) == [2, 3]
+        assert await db_mod.search_cases(900, "rude") == []
+
+
+class TestSharding:
+    @pytest.fixture
+    async def sharded(self):
+        """Swaps in a 3-shard manager for the test, restoring the default one afterwards."""
+        previous = db_mod.db
+        await previous.close()
+        for i in range(3):
+            path = db_mod.economy_shard_path(i, 3)
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        db_mod.db = db_mod.DatabaseManager(shards=3)
+        db_mod.leaderboard_cache = db_mod.LeaderboardCache()
+        await db_mod.init_databases()
+        yield db_mod.db
+        await db_mod.db.close()
+        db_mod.db = previous
+
+    def _users_on_distinct_shards(self):
+        by_shard = {}
+        for uid in range(2000, 2100):
+            by_shard.setdefault(db_mod.shard_for(uid, 3), uid)
+        return list(by_shard.values())
+
+    @pytest.mark.asyncio
+    async def test_cross_shard_transfer_and_aggregates(self, sharded):
+        a, b, c = self._users_on_distinct_shards()
+        for uid in (a, b, c):
+            await db_mod.add_user(uid, f"User{uid}")
+        await db_mod.update_balance(a, 500)
+        assert await db_mod.transfer_balance(a, b, 200)
+        assert not await db_mod.transfer_balance(a, c, 301)
+        assert (await db_mod.get_balance(a), await db_mod.get_balance(b), await db_mod.get_balance(c)) == (300, 200, 0)
+
+        stats = await db_mod.get_economy_stats()
+        assert stats["user_count"] == 3 and stats["positive_total"] == 500
+        assert [row[0] for row in await db_mod.get_leaderboard_page(limit=2)] == [a, b]
+        assert await db_mod.get_user_rank(b) == (2, 200)
+        for conn in await sharded.get_economy_shards():
+            async with conn.execute("SELECT COUNT(*) FROM pending_transfers") as cursor:
+                assert (await cursor.fetchone())[0] == 0
+
+    @pytest.mark.asyncio
+    async def test_interrupted_transfer_recovered_once(self, sharded):
+        a, b, _ = self._users_on_distinct_shards()
+        await db_mod.add_user(a, "A")
+        await db_mod.add_user(b, "B")
+        await db_mod.update_balance(a, 100)
+        # Simulate a crash after phase one: debit and intent committed, credit never applied
+        src = await sharded.get_economy(a)
+        await src.execute("UPDATE users SET balance = balance - 40 WHERE user_id = ?", (a,))
+        await src.execute("INSERT INTO pending_transfers VALUES ('t1', ?, ?, 40, 0)", (a, b))
+        await src.commit()
+
+        assert await db_mod.recover_pending_transfers() == 1
+        assert await db_mod.recover_pending_transfers() == 0
+        assert (await db_mod.get_balance(a), await db_mod.get_balance(b)) == (60, 40)
+
+    @pytest.mark.asyncio
+    async def test_transfer_to_missing_account_keeps_funds(self, sharded):
+        a, b, _ = self._users_on_distinct_shards()
+        same = next(uid for uid in range(a + 1, a + 1000) if db_mod.shard_for(uid, 3) == db_mod.shard_for(a, 3))
+        await db_mod.add_user(a, "A")
+        await db_mod.update_balance(a, 100)
+        assert not await db_mod.transfer_balance(a, same, 50)
+        assert not await db_mod.transfer_balance(a, b, 50)
+        assert await db_mod.get_balance(a) == 100
+
+        # Exactly the whole balance, on one shard and across shards
+        await db_mod.add_user(same, "Same")
+        await db_mod.add_user(b, "B")
+        assert await db_mod.transfer_balance(a, same, 100)
+        assert await db_mod.transfer_balance(same, b, 100)
+        assert [await db_mod.get_balance(uid) for uid in (a, same, b)] == [0, 0, 100]
+
+    @pytest.mark.asyncio
+    async def test_recovery_refunds_transfer_without_recipient(self, sharded):
+        a, b, _ = self._users_on_distinct_shards()
+        await db_mod.add_user(a, "A")
+        await db_mod.update_balance(a, 100)
+        src = await sharded.get_economy(a)
+        await src.execute("UPDATE users SET balance = balance - 40 WHERE user_id = ?", (a,))
+        await src.execute("INSERT INTO pending_transfers VALUES ('t2', ?, ?, 40, 0)", (a, b))
+        await src.commit()
+
+        assert await db_mod.recover_pending_transfers() == 0
+        assert await db_mod.get_balance(a) == 100
+        async with src.execute("SELECT COUNT(*) FROM pending_transfers") as cursor:
+            assert (await cursor.fetchone())[0] == 0
+
+    @pytest.mark.disk
+    @pytest.mark.asyncio
+    async def test_split_tool_partitions_existing_db(self, tmp_path):
+        from database.shards import split_economy_db
+        for uid in range(2200, 2260):
+            await db_mod.add_user(uid, f"User{uid}")
+            await db_mod.update_balance(uid, uid - 2230)
+        before = await db_mod.get_economy_stats()
+        await db_mod.db.checkpoint()
+
+        shards = split_economy_db(db_mod.ECONOMY_DB_PATH, 3, force=True)
+        assert sum(users for _, users in shards) == 60
+        totals = [0, 0, 0, 0]
+        for index, (path, _) in enumerate(shards):
+            conn = sqlite3.connect(path)
+            try:
+                user_ids = [row[0] for row in conn.execute("SELECT user_id FROM users")]
+                assert all(db_mod.shard_for(uid, 3) == index for uid in user_ids)
+                row = conn.execute("SELECT user_count, positive_total, debt_total, debtor_count FROM economy_stats").fetchone()
+                totals = [t + v for t, v in zip(totals, row)]
+            finally:
+                conn.close()
+        assert totals == [before["user_count"], before["positive_total"], before["debt_total"], before["debtor_count"]]
+
+
+class TestStorageBackends:
+    @pytest.fixture(params=[pytest.param("sqlite", marks=pytest.mark.disk), "memory", "mysql"])
+    async def backend(self, request):
+        if request.param == "mysql":
+            if not os.getenv("MYSQL_TEST_DATABASE"):
+                pytest.skip("set MYSQL_TEST_DATABASE (and MYSQL_HOST/USER/PASSWORD) to run against a local server")
+            backend = get_backend("mysql", db=os.getenv("MYSQL_TEST_DATABASE"))
+            await backend.init()
+            for table in ("users", "user_items", "cases", "case_counters"):
+                await backend._run(f"DELETE FROM {table}")
+        else:
+            backend = get_backend(request.param)
+            await backend.init()
+        yield backend
+        await backend.close()
+
+    @pytest.mark.asyncio
+    async def test_economy_contract(self, backend):
+        await backend.add_user(1, "A")
+        await backend.add_user(2, "B")
+        await backend.add_user(1, "A again")
+        assert await backend.update_balance(1, 500) == 500
+        assert await backend.update_balance(3, 10) is None
+        assert not await backend.atomic_deduct(2, 1)
+        assert await backend.atomic_deduct(1, 100)
+        assert await backend.transfer_balance(1, 2, 150)
+        assert not await backend.transfer_balance(1, 2, 251)
+        assert (await backend.get_balance(1), await backend.get_balance(2)) == (250, 150)
+        assert await backend.update_balance(2, -10**6) == db_mod.DEBT_FLOOR
+
+        page = await backend.get_leaderboard_page(limit=1)
+        assert [row[0] for row in page] == [1]
+        page = await backend.get_leaderboard_page(limit=5, after=(page[-1][2], page[-1][0]))
+        assert [row[0] for row in page] == [2]
+
+        await backend.add_user_item(1, 9, "Resin", uses_left=1)
+        await backend.add_user_item(1, 9, "Resin", uses_left=1)
+        assert await backend.get_user_items(1) == [{"item_id": 9, "item_name": "Resin", "uses_left": 2}]
+        assert await backend.consume_item(1, 9) == 1
+        assert await backend.consume_item(1, 9) == 0
+        assert await backend.consume_item(1, 9) is None
+        assert await backend.get_user_items(1) == []
+
+    @pytest.mark.asyncio
+    async def test_moderation_contract(self, backend):
+        numbers = [await backend.insert_case(50, 100 + i, "u", f"r{i}", "warn", 1, timestamp=i) for i in range(5)]
+        assert numbers == [1, 2, 3, 4, 5]
+        assert await backend.insert_case(51, 1, "u", None, "ban", 1, timestamp=0, expiry=10) == 1
+        assert (await backend.get_case(51, 1))[3] == "No reason provided"
+
+        await backend.remove_case(50, 5)
+        assert await backend.get_case(50, 5) is None
+        page = await backend.get_cases_page(50, limit=2)
+        assert [row[0] for row in page] == [4, 3]
+        page = await backend.get_cases_page(50, limit=5, before=page[-1][0])
+        assert [row[0] for row in page] == [2, 1]
+
+
+class TestLoadHarness:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("backend_name", [pytest.param("sqlite", marks=pytest.mark.disk), "memory"])
+    async def test_concurrent_mix_runs_clean_and_reproducible(self, backend_name):
+        """Concurrent RETURNING writes on the shared connection must not trip each other's commits."""
+        from benchmarks.loadtest import DEFAULT_MIX, parse_mix, run_load
+        backend = get_backend(backend_name)
+        await backend.init()
+        try:
+            report = await run_load(backend, users=200, ops=2000, mix=parse_mix(DEFAULT_MIX), seed=7)
+        finally:
+            await backend.close()
+        assert report["errors"] == {"busy": 0, "other": 0}
+        assert report["ops"] == 2000
+        counts = {name: stats["count"] for name, stats in report["latency_ms"].items()}
+
+        again_backend = get_backend("memory")
+        await again_backend.init()
+        try:
+            again = await run_load(again_backend, users=200, ops=2000, mix=parse_mix(DEFAULT_MIX), seed=7)
+        finally:
+            await again_backend.close()
+        assert {name: stats["count"] for name, stats in again["latency_ms"].items()} == counts
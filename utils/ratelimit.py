@@ -0,0 +1,224 @@
+# utils/ratelimit.py
+# Per-user command rate limits: fixed cooldowns and token buckets (burst plus refill), and the
+# failure counters of the cooldown decorator. Entries live in a hierarchical timing wheel and
+# drop out once their window has passed, so memory follows the users active within the
+# longest window instead of every user ever seen.
+
+# Standard Library Imports
+import math
+import sys
+import time
+from typing import Callable, Hashable, Union
+
+WHEEL_RESOLUTION = 1.0   # seconds per tick
+WHEEL_BITS = 6           # 64 slots per level
+WHEEL_LEVELS = 4         # levels span 64 s, ~68 min, ~3 days and ~194 days
+FAILURE_WINDOW = 3600    # seconds a command failure keeps counting towards the owner alert
+
+
+class TimingWheel:
+    """
+    Key -> value store where every entry carries an expiry time.
+
+    Level 0 has one slot per tick, and each level above covers 64 times the span of the
+    one below; a higher slot is cascaded into the lower levels when time reaches it.
+    Setting, replacing and removing a key is O(1), and every call first advances the
+    wheel, dropping whatever expired. Reads also check the expiry itself, so a wheel
+    that has not been advanced in a while never returns stale values.
+    """
+
+    def __init__(self, resolution: float = WHEEL_RESOLUTION, clock: Callable[[], float] = time.monotonic):
+        self.resolution = resolution
+        self._clock = clock
+        self._mask = (1 << WHEEL_BITS) - 1
+        self._levels = [[set() for _ in range(1 << WHEEL_BITS)] for _ in range(WHEEL_LEVELS)]
+        self._entries = {}  # key -> [value, expires_at, expiry tick, slot holding the key]
+        self._tick = int(clock() // resolution)
+        self._peak = 0  # most entries since the index was last rebuilt
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable, default=None):
+        now = self.advance()
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= now:
+            return default
+        return entry[0]
+
+    def set(self, key: Hashable, value, expires_at: float):
+        self.advance()
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[3].discard(key)
+        record = [value, expires_at, math.ceil(expires_at / self.resolution), None]
+        self._entries[key] = record
+        self._peak = max(self._peak, len(self._entries))
+        self._place(key, record)
+
+    def pop(self, key: Hashable, default=None):
+        self.advance()
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return default
+        entry[3].discard(key)
+        return entry[0]
+
+    def _place(self, key, record):
+        tick = record[2]
+        for level in range(WHEEL_LEVELS):
+            shift = WHEEL_BITS * level
+            ahead = (tick >> shift) - (self._tick >> shift)
+            if ahead <= self._mask:
+                index = (tick >> shift) & self._mask
+                break
+        else:
+            # Further out than the top level reaches: park it in the last top slot and re-place it from there
+            index = ((self._tick >> shift) + self._mask) & self._mask
+        slot = self._levels[level][index]
+        slot.add(key)
+        record[3] = slot
+
+    def advance(self) -> float:
+        """Moves the wheel up to the current time, dropping expired entries. Returns the time."""
+        now = self._clock()
+        target = int(now // self.resolution)
+        if not self._entries:
+            self._tick = max(self._tick, target)
+            return now
+        while self._tick < target:
+            self._tick += 1
+            tick = self._tick
+            # Higher levels first, so entries cascade all the way down within one tick
+            for level in range(WHEEL_LEVELS - 1, 0, -1):
+                shift = WHEEL_BITS * level
+                if not tick & ((1 << shift) - 1):
+                    self._drain(level, (tick >> shift) & self._mask, tick)
+            self._drain(0, tick & self._mask, tick)
+        if self._peak > 1024 and len(self._entries) < self._peak // 4:
+            # Dicts never shrink on delete; rebuild the index once a burst has drained
+            self._entries = dict(self._entries)
+            self._peak = len(self._entries)
+        return now
+
+    def _drain(self, level, index, tick):
+        keys = self._levels[level][index]
+        if not keys:
+            return
+        self._levels[level][index] = set()
+        for key in keys:
+            record = self._entries[key]
+            if record[2] <= tick:
+                del self._entries[key]
+                self.expired += 1
+            else:
+                self._place(key, record)
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by the index, the slots and the entries themselves."""
+        size = sys.getsizeof(self._entries) + sys.getsizeof(self._levels)
+        size += sum(sys.getsizeof(level) + sum(sys.getsizeof(slot) for slot in level) for level in self._levels)
+        for key, record in self._entries.items():
+            size += sys.getsizeof(key) + sys.getsizeof(record) + sys.getsizeof(record[0])
+        return size
+
+
+class RateLimit:
+    """
+    `burst` uses, refilled at one every `per` seconds (a token bucket).
+
+    RateLimit(5) is a plain 5 second cooldown; RateLimit(10, burst=3) allows three
+    quick uses, then one every 10 seconds.
+    """
+
+    __slots__ = ("per", "burst")
+
+    def __init__(self, per: float, burst: int = 1):
+        if per <= 0 or burst < 1:
+            raise ValueError(f"Invalid rate limit: {burst} per {per}s")
+        self.per = per
+        self.burst = burst
+
+    def __repr__(self):
+        return f"RateLimit({self.per!r}, burst={self.burst!r})"
+
+
+class RateLimiter:
+    """
+    The one place command rate limits are kept.
+
+    Usage:
+        retry_after = rate_limits.acquire(user_id, "slots", 5)                  # 5s cooldown
+        retry_after = rate_limits.acquire(user_id, "daily", RateLimit(60, burst=3))
+        if retry_after:
+            ...  # limited, try again in retry_after seconds
+
+        rate_limits.count_failure(user_id, "slots")  # -> failures within FAILURE_WINDOW
+        rate_limits.clear_failures(user_id, "slots")
+
+    Buckets are keyed by (scope, user, name), so the same command can be limited
+    independently by the decorator and by a dashboard override. A bucket is stored
+    only while it is not full; a missing entry means every use is available.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._wheel = TimingWheel(clock=clock)
+
+    def _tokens(self, key, limit, now):
+        state = self._wheel.get(key)
+        if state is None:
+            return float(limit.burst)
+        tokens, updated = state
+        return min(float(limit.burst), tokens + (now - updated) / limit.per)
+
+    def acquire(self, user_id: int, name: str, limit: Union[RateLimit, float], *, scope: str = "command") -> float:
+        """
+        Takes one use if one is available.
+
+        Returns:
+            float: 0.0 if the use was taken, else seconds until the next one is available
+        """
+        if not isinstance(limit, RateLimit):
+            limit = RateLimit(limit)
+        key = (scope, user_id, name)
+        now = self._clock()
+        tokens = self._tokens(key, limit, now)
+        if tokens < 1:
+            return (1 - tokens) * limit.per
+        tokens -= 1
+        self._wheel.set(key, (tokens, now), now + (limit.burst - tokens) * limit.per)
+        return 0.0
+
+    def retry_after(self, user_id: int, name: str, limit: Union[RateLimit, float], *, scope: str = "command") -> float:
+        """Seconds until acquire() would succeed, without taking a use."""
+        if not isinstance(limit, RateLimit):
+            limit = RateLimit(limit)
+        tokens = self._tokens((scope, user_id, name), limit, self._clock())
+        return 0.0 if tokens >= 1 else (1 - tokens) * limit.per
+
+    def count_failure(self, user_id: int, name: str, window: float = FAILURE_WINDOW) -> int:
+        """Records a failure and returns how many happened without a gap longer than `window`."""
+        key = ("failures", user_id, name)
+        count = self._wheel.get(key, 0) + 1
+        self._wheel.set(key, count, self._clock() + window)
+        return count
+
+    def clear_failures(self, user_id: int, name: str):
+        self._wheel.pop(("failures", user_id, name))
+
+    def sweep(self) -> int:
+        """Drops expired entries even when no command arrives. Returns how many entries remain."""
+        self._wheel.advance()
+        return len(self._wheel)
+
+    def metrics(self) -> dict:
+        return {
+            "entries": len(self._wheel),
+            "bytes": self._wheel.memory_bytes(),
+            "expired": self._wheel.expired,
+        }
+
+
+rate_limits = RateLimiter()